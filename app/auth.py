@@ -1,10 +1,17 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 import os
+import time
 from dotenv import load_dotenv
+from app import models
+from app.cache import TTLCache
+from app.invalidation import invalidation_channel
 
 load_dotenv()
 
@@ -12,16 +19,48 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+# Текущая стоимость bcrypt; хэши с меньшим числом раундов пересчитываются при входе
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+
+class InvalidToken(Exception):
+    """Подпись, срок действия или формат токена не прошли проверку."""
+
+# passlib/bcrypt и jose импортируются при первом хэшировании или работе с токеном,
+# а не при старте приложения
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+    )
+
+def __getattr__(name):
+    # Совместимость: from app.auth import pwd_context
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def verify_and_update_password(plain_password, hashed_password):
+    """(верен ли пароль, новый хэш или None, если текущий соответствует политике)."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -29,4 +68,62 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+# ========== ТЕКУЩИЙ ПОЛЬЗОВАТЕЛЬ ==========
+@dataclass(frozen=True)
+class Principal:
+    """Лёгкое представление аутентифицированного пользователя (вместо ORM User)."""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.username, user.email, user.is_active, user.created_at)
+
+# Проверенный токен -> Principal; запись живёт не дольше самого токена
+principal_cache = TTLCache(max_size=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+def decode_access_token(token: str) -> dict:
+    """Проверяет подпись и срок действия; бросает InvalidToken."""
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError as exc:
+        raise InvalidToken(str(exc)) from exc
+
+def cache_principal(token: str, principal: Principal, expires_at: Optional[float] = None):
+    ttl = None if expires_at is None else expires_at - time.time()
+    principal_cache.set(token, principal, ttl=ttl)
+
+def _forget_user(user_id: int) -> int:
+    return principal_cache.delete_where(lambda token, principal: principal.id == user_id)
+
+def invalidate_user(user_id: int) -> int:
+    """Сбрасывает токены пользователя в кэше этого и остальных воркеров."""
+    invalidation_channel.publish("user", user_id)
+    return _forget_user(user_id)
+
+invalidation_channel.handler("user")(_forget_user)
+invalidation_channel.on_resync(principal_cache.clear)
+
+# Смена is_active сбрасывает кэш токенов пользователя — после commit: раньше параллельный
+# запрос успел бы закэшировать ещё активного пользователя, а rollback оставил бы лишний сброс
+@event.listens_for(Session, "after_flush")
+def _collect_active_changes(session, flush_context):
+    for target in session.dirty:
+        if isinstance(target, models.User) and inspect(target).attrs.is_active.history.has_changes():
+            session.info.setdefault("users_active_changed", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_active_changes(session):
+    for user_id in session.info.pop("users_active_changed", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_active_changes(session):
+    session.info.pop("users_active_changed", None)
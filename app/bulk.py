@@ -0,0 +1,276 @@
+# app/bulk.py
+# Массовый импорт и экспорт игр и обзоров в NDJSON/CSV.
+#
+# Импорт читает вход потоком, проверяет строки схемами GameCreate/ReviewImport,
+# пишет пачками (один executemany на пачку) и фиксирует каждую пачку отдельно.
+# Повторный импорт обновляет записи по естественному ключу: игра — title,
+# обзор — (game_id, user_id). Ошибки строк не прерывают импорт, а попадают в отчёт.
+# Экспорт идёт серверным курсором и не держит таблицу в памяти.
+import csv
+import io
+import json
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, events, models, schemas
+from app.events import event_bus
+from app.response_cache import invalidate_all
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "100"))
+
+EXPORT_COLUMNS = {
+    "games": ["id", *schemas.GameCreate.model_fields, "created_at"],
+    "reviews": ["id", "game_id", "user_id", "rating", "content", "created_at"],
+}
+EXPORT_TABLES = {"games": models.Game.__table__, "reviews": models.Review.__table__}
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def add_error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+
+# ========== Чтение входа ==========
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Режет поток байтов на строки (UTF-8), не дожидаясь конца входа."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+async def _ndjson_records(lines: AsyncIterable[str]):
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield row, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "expected a JSON object"
+            continue
+        yield row, data, None
+
+
+async def _csv_records(lines: AsyncIterable[str]):
+    header, pending, row = None, [], 0
+    async for line in lines:
+        pending.append(line)
+        text = "\n".join(pending)
+        # Запись в кавычках может занимать несколько строк: ждём, пока кавычки закроются
+        if text.count('"') % 2:
+            continue
+        pending = []
+        if not text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        # Пустая ячейка CSV — отсутствующее значение
+        yield row, {name: value if value != "" else None for name, value in zip(header, values)}, None
+    if pending:
+        yield row + 1, None, "unterminated quoted field"
+
+
+def iter_records(lines: AsyncIterable[str], fmt: str):
+    """Асинхронный итератор (номер строки, данные, ошибка разбора)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    return _ndjson_records(lines) if fmt == "ndjson" else _csv_records(lines)
+
+
+def describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+async def _collect(records, schema, key, report: ImportReport, batch_size: int, flush, overrides=None):
+    # В пачке ключ встречается один раз: при повторе побеждает последняя строка
+    batch: Dict[tuple, Tuple[int, dict]] = {}
+    async for row, data, error in records:
+        report.processed += 1
+        if error is not None:
+            report.add_error(row, error)
+            continue
+        try:
+            item: BaseModel = schema.model_validate({**data, **(overrides or {})})
+        except ValidationError as exc:
+            report.add_error(row, describe_validation_error(exc))
+            continue
+        values = item.model_dump()
+        batch[key(values)] = (row, values)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = {}
+    if batch:
+        await flush(batch)
+
+
+# ========== Импорт ==========
+async def import_games(db: AsyncSession, records, batch_size: int = BULK_BATCH_SIZE) -> ImportReport:
+    report = ImportReport()
+
+    async def flush(batch):
+        titles = [title for (title,) in batch]
+        existing = dict(
+            (await db.execute(select(models.Game.title, models.Game.id).where(models.Game.title.in_(titles)))).all()
+        )
+        new = [values for (title,), (_, values) in batch.items() if title not in existing]
+        changed = [{"id": existing[title], **values} for (title,), (_, values) in batch.items() if title in existing]
+        if new:
+            await db.execute(insert(models.Game), new)
+        if changed:
+            await db.execute(update(models.Game), changed)
+        await db.commit()
+        report.inserted += len(new)
+        report.updated += len(changed)
+
+    try:
+        await _collect(records, schemas.GameCreate, lambda values: (values["title"],), report, batch_size, flush)
+    finally:
+        invalidate_all()
+    return report
+
+
+async def import_reviews(
+    db: AsyncSession, records, batch_size: int = BULK_BATCH_SIZE, user_id: Optional[int] = None
+) -> ImportReport:
+    """Импорт обзоров; user_id задаёт автора всех строк (для импорта через API)."""
+    report = ImportReport()
+    review = models.Review
+
+    async def flush(batch):
+        game_ids = {game_id for game_id, _ in batch}
+        user_ids = {author_id for _, author_id in batch}
+        known_games = await crud.existing_ids(db, models.Game, game_ids)
+        known_users = await crud.existing_ids(db, models.User, user_ids)
+        for (game_id, author_id), (row, _) in list(batch.items()):
+            if game_id not in known_games or author_id not in known_users:
+                missing = f"game {game_id}" if game_id not in known_games else f"user {author_id}"
+                report.add_error(row, f"{missing} not found")
+                del batch[(game_id, author_id)]
+        if not batch:
+            return
+
+        existing = {
+            (game_id, author_id): (id, rating)
+            for game_id, author_id, id, rating in await db.execute(
+                select(review.game_id, review.user_id, review.id, review.rating)
+                .where(tuple_(review.game_id, review.user_id).in_(list(batch)))
+            )
+        }
+        new = [values for key, (_, values) in batch.items() if key not in existing]
+        changed = [{"id": existing[key][0], **values} for key, (_, values) in batch.items() if key in existing]
+        new_ids = []
+        if new:
+            new_ids = (
+                await db.scalars(insert(review).returning(review.id, sort_by_parameter_order=True), new)
+            ).all()
+        if changed:
+            await db.execute(update(review), changed)
+
+        # Агрегаты и счётчики игр меняются на разницу пачки (без пересчёта всех обзоров игры),
+        # в той же транзакции, что и сами обзоры
+        histograms: Dict[int, Counter] = defaultdict(Counter)
+        added: Counter = Counter()
+        for key, (_, values) in batch.items():
+            game_id = key[0]
+            histograms[game_id][values["rating"]] += 1
+            if key in existing:
+                histograms[game_id][existing[key][1]] -= 1
+            else:
+                added[game_id] += 1
+        await crud.apply_imported_reviews(db, histograms, added)
+
+        # Индекс поиска, рейтинги и рекомендации каждого воркера обновятся из outbox; событие
+        # фиксируется вместе со статистикой игр, из которой читают рейтинги
+        events.publish(db, events.ReviewsImported(
+            review_ids=[*new_ids, *(values["id"] for values in changed)],
+            game_ids=sorted(histograms),
+            user_ids=sorted({author_id for _, author_id in batch}),
+        ))
+        await db.commit()
+        event_bus.notify()
+        report.inserted += len(new)
+        report.updated += len(changed)
+
+    try:
+        await _collect(
+            records, schemas.ReviewImport, lambda values: (values["game_id"], values["user_id"]),
+            report, batch_size, flush, overrides={"user_id": user_id} if user_id is not None else None,
+        )
+    finally:
+        invalidate_all()
+    return report
+
+
+# ========== Экспорт ==========
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(
+        value.isoformat() if isinstance(value, (datetime, date)) else value for value in values
+    )
+    return buffer.getvalue()
+
+
+async def export_rows(db: AsyncSession, entity: str, fmt: str, batch_size: int = BULK_BATCH_SIZE) -> AsyncIterator[str]:
+    """Строки выгрузки по пачкам из серверного курсора (yield_per)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    columns = EXPORT_COLUMNS[entity]
+    table = EXPORT_TABLES[entity]
+    query = (
+        select(*(table.c[name] for name in columns))
+        .order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if fmt == "csv":
+        yield _csv_line(columns)
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        if fmt == "csv":
+            yield "".join(_csv_line(row) for row in partition)
+        else:
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + "\n"
+                for row in partition
+            )
@@ -0,0 +1,122 @@
+# app/cli.py
+# Служебные команды: python -m app.cli <команда>
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+
+from app import bulk, crud, game_search, recommendations, review_index
+from app.database import AsyncSessionLocal, async_engine, create_tables
+
+
+async def rebuild_stats(args):
+    async with AsyncSessionLocal() as db:
+        games = await crud.rebuild_game_statistics(db, game_id=args.game_id)
+    print(f"Rating statistics rebuilt for {games} game(s)")
+
+
+async def rebuild_search(args):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(game_search.rebuild_index)
+    print("Game search index rebuilt")
+
+
+async def build_review_index(args):
+    async with AsyncSessionLocal() as db:
+        index = await review_index.build_from_db(db, path=args.path)
+    print(f"Review index with {len(index)} document(s) written to {args.path}")
+
+
+async def build_recommendations(args):
+    async with AsyncSessionLocal() as db:
+        model = await recommendations.build_snapshot(db, path=args.path, full=args.full)
+    print(f"Neighbour lists for {len(model)} game(s) written to {args.path}")
+
+
+def _guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if path and os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+
+
+async def _read_chunks(path, size=1 << 16):
+    with (open(path, "rb") if path != "-" else contextlib.nullcontext(sys.stdin.buffer)) as source:
+        while chunk := source.read(size):
+            yield chunk
+
+
+async def import_data(args):
+    fmt = _guess_format(args.path, args.format)
+    records = bulk.iter_records(bulk.iter_lines(_read_chunks(args.path)), fmt)
+    importer = bulk.import_games if args.entity == "games" else bulk.import_reviews
+    async with AsyncSessionLocal() as db:
+        report = await importer(db, records, batch_size=args.batch_size)
+    print(
+        f"Processed {report.processed} row(s): {report.inserted} inserted, "
+        f"{report.updated} updated, {report.failed} failed"
+    )
+    for error in report.errors:
+        print(f"  row {error['row']}: {error['error']}", file=sys.stderr)
+
+
+async def export_data(args):
+    fmt = _guess_format(args.output, args.format)
+    with (open(args.output, "w", encoding="utf-8", newline="") if args.output else contextlib.nullcontext(sys.stdout)) as target:
+        async with AsyncSessionLocal() as db:
+            async for chunk in bulk.export_rows(db, args.entity, fmt, batch_size=args.batch_size):
+                target.write(chunk)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="GameReviews maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-stats", help="Пересчитать агрегаты оценок по таблице reviews")
+    rebuild.add_argument("--game-id", type=int, default=None, help="Только для одной игры")
+    rebuild.set_defaults(handler=rebuild_stats)
+
+    search = commands.add_parser("rebuild-search", help="Перестроить полнотекстовый индекс игр (SQLite FTS5)")
+    search.set_defaults(handler=rebuild_search)
+
+    reviews = commands.add_parser("build-review-index", help="Построить снимок индекса текста обзоров")
+    reviews.add_argument("--path", default=review_index.REVIEW_INDEX_PATH)
+    reviews.set_defaults(handler=build_review_index)
+
+    similar = commands.add_parser("build-recommendations", help="Обновить снимок списков похожих игр")
+    similar.add_argument("--path", default=recommendations.RECOMMENDATIONS_PATH)
+    similar.add_argument("--full", action="store_true", help="Пересобрать с нуля, а не догонять снимок по outbox")
+    similar.set_defaults(handler=build_recommendations)
+
+    importer = commands.add_parser("import", help="Импортировать игры или обзоры из NDJSON/CSV")
+    importer.add_argument("entity", choices=("games", "reviews"))
+    importer.add_argument("path", help="Файл или - для stdin")
+    importer.add_argument("--format", choices=bulk.FORMATS, default=None, help="По умолчанию — по расширению")
+    importer.add_argument("--batch-size", type=int, default=bulk.BULK_BATCH_SIZE)
+    importer.set_defaults(handler=import_data)
+
+    exporter = commands.add_parser("export", help="Выгрузить игры или обзоры в NDJSON/CSV")
+    exporter.add_argument("entity", choices=("games", "reviews"))
+    exporter.add_argument("--output", default=None, help="Файл (по умолчанию stdout)")
+    exporter.add_argument("--format", choices=bulk.FORMATS, default=None, help="По умолчанию — по расширению")
+    exporter.add_argument("--batch-size", type=int, default=bulk.BULK_BATCH_SIZE)
+    exporter.set_defaults(handler=export_data)
+
+    return parser
+
+
+async def run(args):
+    await create_tables()
+    try:
+        await args.handler(args)
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
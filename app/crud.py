@@ -1,175 +1,610 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
-from app import models, schemas
-from app.auth import get_password_hash, verify_password
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import DateTime, case, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload, subqueryload
+from typing import Dict, Iterable, List, Optional, Set
+from app import game_search, models, schemas, serializers
+from app.pagination import Cursor, Page, paginate, stream_page
+from app import events
+from app.events import event_bus
+from app.password_hasher import password_hasher
+from app.response_cache import invalidate_all, invalidate_game, invalidate_review
+from collections import Counter, defaultdict
 from datetime import datetime
+import os
+
+# ========== LOADER STRATEGIES ==========
+# Автор нужен в ReviewResponse/CommentResponse; в async-режиме ленивая
+# загрузка при сериализации невозможна, поэтому подгружаем его явно:
+# selectin — второй запрос WHERE id IN (...), joined — LEFT JOIN в том же запросе.
+# Страницы списков читаются строками с JOIN на users (get_review_rows / get_comment_rows),
+# так что стратегия действует на запросы ORM: ?stream=, поиск, загрузчики, отдельный обзор.
+LOADER_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "subquery": subqueryload,
+}
+DEFAULT_LOADER_STRATEGY = os.getenv("DB_LOADER_STRATEGY", "selectin")
+# Переопределения по эндпоинтам (read_reviews, read_review_comments, search_reviews,
+# load_reviews), например: DB_LOADER_STRATEGIES="read_reviews=joined,search_reviews=selectin"
+ENDPOINT_LOADER_STRATEGIES = {
+    endpoint.strip(): strategy.strip()
+    for endpoint, _, strategy in (
+        item.partition("=") for item in os.getenv("DB_LOADER_STRATEGIES", "").split(",")
+    )
+    if endpoint.strip() and strategy.strip()
+}
+
+def loader_strategy(endpoint: str) -> str:
+    return ENDPOINT_LOADER_STRATEGIES.get(endpoint, DEFAULT_LOADER_STRATEGY)
+
+def load_related(relationship, strategy: Optional[str] = None):
+    strategy = strategy or DEFAULT_LOADER_STRATEGY
+    if strategy not in LOADER_STRATEGIES:
+        raise ValueError(f"Unknown loader strategy: {strategy}")
+    return LOADER_STRATEGIES[strategy](relationship)
+
+def _streaming_loader(strategy: Optional[str]) -> str:
+    # subqueryload несовместим с yield_per: для потоковой выдачи берём selectin (по пачке)
+    strategy = strategy or DEFAULT_LOADER_STRATEGY
+    return "selectin" if strategy == "subquery" else strategy
+
+async def existing_ids(db: AsyncSession, model, ids: Iterable[int]) -> Set[int]:
+    """Какие из ids есть в таблице модели — одним запросом."""
+    ids = set(ids)
+    if not ids:
+        return set()
+    return set((await db.scalars(select(model.id).where(model.id.in_(ids)))).all())
 
 # ========== USER CRUD ==========
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+async def get_users_by_ids(db: AsyncSession, user_ids):
+    if not user_ids:
+        return {}
+    result = await db.scalars(select(models.User).where(models.User.id.in_(user_ids)))
+    return {user.id: user for user in result.all()}
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[Cursor] = None):
+    return await paginate(db, select(models.User), models.User, skip=skip, limit=limit, cursor=cursor)
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    # bcrypt нагружает CPU — считается в отдельном пуле процессов
+    hashed_password = await password_hasher.hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Хэш устарел (например, меньше раундов bcrypt) — сохраняем пересчитанный
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 # ========== GAME CRUD ==========
-def get_game(db: Session, game_id: int):
-    return db.query(models.Game).filter(models.Game.id == game_id).first()
+async def get_game(db: AsyncSession, game_id: int):
+    return await db.scalar(select(models.Game).where(models.Game.id == game_id))
 
-def get_games(db: Session, skip: int = 0, limit: int = 100, search: str = None):
-    query = db.query(models.Game)
+async def get_games_by_ids(db: AsyncSession, game_ids):
+    if not game_ids:
+        return {}
+    result = await db.scalars(select(models.Game).where(models.Game.id.in_(game_ids)))
+    return {game.id: game for game in result.all()}
+
+async def get_games(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    search: str = None,
+    cursor: Optional[Cursor] = None
+):
     if search:
-        query = query.filter(
-            or_(
-                models.Game.title.ilike(f"%{search}%"),
-                models.Game.genre.ilike(f"%{search}%"),
-                models.Game.developer.ilike(f"%{search}%")
-            )
-        )
-    return query.offset(skip).limit(limit).all()
+        # Результаты поиска упорядочены по релевантности, курсоры к ним не применяются
+        return Page(await game_search.search_games(db, search, skip=skip, limit=limit))
+    return await paginate(db, select(models.Game), models.Game, skip=skip, limit=limit, cursor=cursor)
+
+async def get_game_rows(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[Cursor] = None):
+    """Страница игр в виде Row с колонками serializers.GAME."""
+    query = serializers.GAME.select()
+    return await paginate(db, query, models.Game, skip=skip, limit=limit, cursor=cursor, columns=True)
 
-def create_game(db: Session, game: schemas.GameCreate, user_id: int):
+def stream_games(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[Cursor] = None):
+    return stream_page(db, select(models.Game), models.Game, skip=skip, limit=limit, cursor=cursor)
+
+async def create_game(db: AsyncSession, game: schemas.GameCreate, user_id: int):
     db_game = models.Game(**game.model_dump())
     db.add(db_game)
-    db.commit()
-    db.refresh(db_game)
+    await db.commit()
+    await db.refresh(db_game)
     return db_game
 
-def update_game(db: Session, game_id: int, game_update: schemas.GameBase):
-    db_game = get_game(db, game_id)
+async def update_game(db: AsyncSession, game_id: int, game_update: schemas.GameBase):
+    db_game = await get_game(db, game_id)
     if not db_game:
         return None
-    
+
     update_data = game_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_game, field, value)
-    
-    db.commit()
-    db.refresh(db_game)
+
+    events.publish(db, events.GameUpdated(game_id=game_id))
+    await db.commit()
+    invalidate_game(game_id)
+    event_bus.notify()
+    await db.refresh(db_game)
     return db_game
 
-def delete_game(db: Session, game_id: int):
-    db_game = get_game(db, game_id)
+async def delete_game(db: AsyncSession, game_id: int):
+    db_game = await get_game(db, game_id)
     if db_game:
-        db.delete(db_game)
-        db.commit()
+        await db.execute(delete(models.GameRatingStats).where(models.GameRatingStats.game_id == game_id))
+        await db.delete(db_game)
+        events.publish(db, events.GameDeleted(game_id=game_id))
+        await db.commit()
+        invalidate_game(game_id)
+        event_bus.notify()
         return True
     return False
 
 # ========== REVIEW CRUD ==========
-def get_review(db: Session, review_id: int):
-    return db.query(models.Review).filter(models.Review.id == review_id).first()
+async def get_review(db: AsyncSession, review_id: int, loader: Optional[str] = None):
+    return await db.scalar(
+        select(models.Review)
+        .options(load_related(models.Review.author, loader))
+        .where(models.Review.id == review_id)
+    )
+
+async def get_reviews(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    game_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    loader: Optional[str] = None,
+    cursor: Optional[Cursor] = None
+):
+    query = _reviews_query(game_id, user_id, loader)
+    return await paginate(db, query, models.Review, skip=skip, limit=limit, cursor=cursor)
 
-def get_reviews(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100, 
+async def get_review_rows(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
     game_id: Optional[int] = None,
-    user_id: Optional[int] = None
+    cursor: Optional[Cursor] = None
 ):
-    query = db.query(models.Review)
+    """Страница обзоров с автором (JOIN) в виде Row с колонками serializers.REVIEW."""
+    query = serializers.REVIEW.select().join(models.User, models.Review.user_id == models.User.id)
     if game_id:
-        query = query.filter(models.Review.game_id == game_id)
+        query = query.where(models.Review.game_id == game_id)
+    return await paginate(db, query, models.Review, skip=skip, limit=limit, cursor=cursor, columns=True)
+
+def stream_reviews(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    game_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    loader: Optional[str] = None,
+    cursor: Optional[Cursor] = None
+):
+    query = _reviews_query(game_id, user_id, _streaming_loader(loader))
+    return stream_page(db, query, models.Review, skip=skip, limit=limit, cursor=cursor)
+
+def _reviews_query(game_id: Optional[int], user_id: Optional[int], loader: Optional[str]):
+    query = select(models.Review).options(load_related(models.Review.author, loader))
+    if game_id:
+        query = query.where(models.Review.game_id == game_id)
     if user_id:
-        query = query.filter(models.Review.user_id == user_id)
-    
-    return query.offset(skip).limit(limit).all()
+        query = query.where(models.Review.user_id == user_id)
+    return query
+
+async def get_reviews_by_ids(db: AsyncSession, review_ids, loader: Optional[str] = None):
+    if not review_ids:
+        return {}
+    result = await db.scalars(
+        select(models.Review)
+        .options(load_related(models.Review.author, loader))
+        .where(models.Review.id.in_(review_ids))
+    )
+    return {review.id: review for review in result.all()}
 
-def create_review(db: Session, review: schemas.ReviewCreate, user_id: int):
+async def create_review(db: AsyncSession, review: schemas.ReviewCreate, user_id: int):
     db_review = models.Review(
         **review.model_dump(),
         user_id=user_id
     )
     db.add(db_review)
-    db.commit()
-    db.refresh(db_review)
+    await db.flush()
+    await _apply_rating_delta(db, review.game_id, added=review.rating)
+    await _bump_game(db, review.game_id, reviews=1, activity_at=db_review.created_at)
+    events.publish(db, events.ReviewCreated(
+        review_id=db_review.id, game_id=review.game_id, user_id=user_id, rating=review.rating
+    ))
+    await db.commit()
+    invalidate_review(db_review.id, review.game_id)
+    event_bus.notify()
+    await db.refresh(db_review, attribute_names=["author"])
     return db_review
 
-def update_review(db: Session, review_id: int, review_update: schemas.ReviewBase, user_id: int):
-    db_review = get_review(db, review_id)
+async def create_reviews(db: AsyncSession, reviews: List[schemas.ReviewCreate], user_id: int):
+    """Создаёт обзоры одной транзакцией; существование игр проверяет вызывающий."""
+    db_reviews = [models.Review(**review.model_dump(), user_id=user_id) for review in reviews]
+    db.add_all(db_reviews)
+    await db.flush()
+    histograms = defaultdict(Counter)
+    latest: Dict[int, datetime] = {}
+    for db_review in db_reviews:
+        histograms[db_review.game_id][db_review.rating] += 1
+        latest[db_review.game_id] = max(latest.get(db_review.game_id, db_review.created_at), db_review.created_at)
+        events.publish(db, events.ReviewCreated(
+            review_id=db_review.id, game_id=db_review.game_id, user_id=user_id, rating=db_review.rating
+        ))
+    for game_id, delta in histograms.items():
+        await _apply_rating_histogram(db, game_id, delta)
+        await _bump_game(db, game_id, reviews=sum(delta.values()), activity_at=latest[game_id])
+    await db.commit()
+    for db_review in db_reviews:
+        invalidate_review(db_review.id, db_review.game_id)
+    event_bus.notify()
+    return db_reviews
+
+async def update_review(db: AsyncSession, review_id: int, review_update: schemas.ReviewBase, user_id: int):
+    db_review = await get_review(db, review_id)
     if not db_review or db_review.user_id != user_id:
         return None
-    
+
+    old_rating = db_review.rating
     update_data = review_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_review, field, value)
-    
-    db.commit()
-    db.refresh(db_review)
+
+    await _apply_rating_delta(db, db_review.game_id, added=db_review.rating, removed=old_rating)
+    events.publish(db, events.ReviewUpdated(
+        review_id=review_id, game_id=db_review.game_id, rating=db_review.rating, old_rating=old_rating,
+        user_id=user_id
+    ))
+    await db.commit()
+    invalidate_review(review_id, db_review.game_id)
+    event_bus.notify()
     return db_review
 
-def delete_review(db: Session, review_id: int, user_id: int):
-    db_review = get_review(db, review_id)
+async def delete_review(db: AsyncSession, review_id: int, user_id: int):
+    db_review = await get_review(db, review_id)
     if db_review and db_review.user_id == user_id:
-        db.delete(db_review)
-        db.commit()
+        # Комментарии обзора перестают учитываться в счётчике игры; UPDATE идёт до DELETE (commit)
+        review_comments = select(models.Review.comment_count).where(models.Review.id == review_id).scalar_subquery()
+        await _bump_game(db, db_review.game_id, reviews=-1, comments=-review_comments)
+        await db.delete(db_review)
+        await _apply_rating_delta(db, db_review.game_id, removed=db_review.rating)
+        events.publish(db, events.ReviewDeleted(
+            review_id=review_id, game_id=db_review.game_id, rating=db_review.rating, user_id=user_id
+        ))
+        await db.commit()
+        invalidate_review(review_id, db_review.game_id)
+        event_bus.notify()
         return True
     return False
 
 # ========== COMMENT CRUD ==========
-def get_comments_by_review(db: Session, review_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Comment).filter(
-        models.Comment.review_id == review_id
-    ).offset(skip).limit(limit).all()
+async def get_comments_by_review(
+    db: AsyncSession,
+    review_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    loader: Optional[str] = None,
+    cursor: Optional[Cursor] = None
+):
+    query = _comments_query(review_id, loader)
+    return await paginate(db, query, models.Comment, skip=skip, limit=limit, cursor=cursor)
+
+async def get_comment_rows(
+    db: AsyncSession, review_id: int, skip: int = 0, limit: int = 100, cursor: Optional[Cursor] = None
+):
+    query = (
+        serializers.COMMENT.select()
+        .join(models.User, models.Comment.user_id == models.User.id)
+        .where(models.Comment.review_id == review_id)
+    )
+    return await paginate(db, query, models.Comment, skip=skip, limit=limit, cursor=cursor, columns=True)
+
+def stream_comments_by_review(
+    db: AsyncSession,
+    review_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    loader: Optional[str] = None,
+    cursor: Optional[Cursor] = None
+):
+    query = _comments_query(review_id, _streaming_loader(loader))
+    return stream_page(db, query, models.Comment, skip=skip, limit=limit, cursor=cursor)
+
+def _comments_query(review_id: int, loader: Optional[str]):
+    return (
+        select(models.Comment)
+        .options(load_related(models.Comment.author, loader))
+        .where(models.Comment.review_id == review_id)
+    )
 
-def create_comment(db: Session, comment: schemas.CommentCreate, user_id: int):
+async def create_comment(db: AsyncSession, comment: schemas.CommentCreate, user_id: int):
     db_comment = models.Comment(
         **comment.model_dump(),
         user_id=user_id
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.flush()
+    game_id = await _bump_review(db, db_comment.review_id, comments=1, activity_at=db_comment.created_at)
+    events.publish(db, events.CommentCreated(comment_id=db_comment.id, review_id=db_comment.review_id))
+    await db.commit()
+    invalidate_review(db_comment.review_id, game_id)
+    event_bus.notify()
+    await db.refresh(db_comment, attribute_names=["author"])
     return db_comment
 
-def delete_comment(db: Session, comment_id: int, user_id: int):
-    db_comment = db.query(models.Comment).filter(
-        models.Comment.id == comment_id,
-        models.Comment.user_id == user_id
-    ).first()
-    
+async def create_comments(db: AsyncSession, comments: List[schemas.CommentCreate], user_id: int):
+    """Создаёт комментарии одной транзакцией; существование обзоров проверяет вызывающий."""
+    db_comments = [models.Comment(**comment.model_dump(), user_id=user_id) for comment in comments]
+    db.add_all(db_comments)
+    await db.flush()
+    latest: Dict[int, datetime] = {}
+    counts = Counter()
+    for db_comment in db_comments:
+        counts[db_comment.review_id] += 1
+        latest[db_comment.review_id] = max(latest.get(db_comment.review_id, db_comment.created_at), db_comment.created_at)
+        events.publish(db, events.CommentCreated(comment_id=db_comment.id, review_id=db_comment.review_id))
+    game_ids = {
+        review_id: await _bump_review(db, review_id, comments=count, activity_at=latest[review_id])
+        for review_id, count in counts.items()
+    }
+    await db.commit()
+    for review_id, game_id in game_ids.items():
+        invalidate_review(review_id, game_id)
+    event_bus.notify()
+    return db_comments
+
+async def delete_comment(db: AsyncSession, comment_id: int, user_id: int):
+    db_comment = await db.scalar(
+        select(models.Comment).where(
+            models.Comment.id == comment_id,
+            models.Comment.user_id == user_id
+        )
+    )
+
     if db_comment:
-        db.delete(db_comment)
-        db.commit()
+        await db.delete(db_comment)
+        game_id = await _bump_review(db, db_comment.review_id, comments=-1)
+        events.publish(db, events.CommentDeleted(comment_id=comment_id, review_id=db_comment.review_id))
+        await db.commit()
+        invalidate_review(db_comment.review_id, game_id)
+        event_bus.notify()
         return True
     return False
 
+# ========== COUNTERS ==========
+# Счётчики обзоров и комментариев (models.Game, models.Review) меняются одним
+# UPDATE col = col + n в транзакции самой записи: параллельные запросы не теряют
+# приращения, а чтение счётчиков не требует COUNT по обзорам и комментариям.
+async def _bump_game(db: AsyncSession, game_id: int, reviews=0, comments=0, activity_at: Optional[datetime] = None):
+    game = models.Game
+    values = {"review_count": game.review_count + reviews, "comment_count": game.comment_count + comments}
+    if activity_at is not None:
+        values["last_activity_at"] = activity_at
+    await db.execute(
+        update(game).where(game.id == game_id).values(**values).execution_options(synchronize_session=False)
+    )
+
+async def _bump_review(
+    db: AsyncSession, review_id: int, comments: int, activity_at: Optional[datetime] = None
+) -> Optional[int]:
+    """Учитывает комментарии в счётчиках обзора и его игры (без commit); возвращает game_id."""
+    review = models.Review
+    values = {"comment_count": review.comment_count + comments}
+    if activity_at is not None:
+        values["last_activity_at"] = activity_at
+    game_id = await db.scalar(
+        update(review).where(review.id == review_id).values(**values).returning(review.game_id)
+        .execution_options(synchronize_session=False)
+    )
+    if game_id is not None:
+        await _bump_game(db, game_id, comments=comments, activity_at=activity_at)
+    return game_id
+
+def counter_rebuild_statements(game_ids: Optional[List[int]] = None):
+    """UPDATE-ы, пересчитывающие счётчики по таблицам reviews и comments (обзоры — первыми)."""
+    game, review, comment = models.Game, models.Review, models.Comment
+    review_comments = select(func.count(comment.id)).where(comment.review_id == review.id).scalar_subquery()
+    last_comment = select(func.max(comment.created_at)).where(comment.review_id == review.id).scalar_subquery()
+    reviews_stmt = update(review).values(
+        comment_count=review_comments,
+        last_activity_at=func.coalesce(last_comment, review.created_at),
+    )
+    game_reviews = select(func.count(review.id)).where(review.game_id == game.id).scalar_subquery()
+    game_comments = (
+        select(func.coalesce(func.sum(review.comment_count), 0)).where(review.game_id == game.id).scalar_subquery()
+    )
+    last_activity = select(func.max(review.last_activity_at)).where(review.game_id == game.id).scalar_subquery()
+    games_stmt = update(game).values(
+        review_count=game_reviews,
+        comment_count=game_comments,
+        last_activity_at=func.coalesce(last_activity, game.created_at),
+    )
+    if game_ids is not None:
+        reviews_stmt = reviews_stmt.where(review.game_id.in_(game_ids))
+        games_stmt = games_stmt.where(game.id.in_(game_ids))
+    return [
+        statement.execution_options(synchronize_session=False) for statement in (reviews_stmt, games_stmt)
+    ]
+
+async def apply_imported_reviews(
+    db: AsyncSession, histograms: Dict[int, Dict[int, int]], added: Dict[int, int]
+):
+    """Учитывает пачку импорта в агрегатах оценок и счётчиках игр (без commit).
+
+    histograms — {game_id: {оценка: +-число}} (новые и изменённые обзоры), added — число новых обзоров игры.
+    """
+    now = datetime.utcnow()
+    for game_id, delta in histograms.items():
+        await _apply_rating_histogram(db, game_id, delta)
+        if added.get(game_id):
+            await _bump_game(db, game_id, reviews=added[game_id], activity_at=now)
+
+async def get_game_summaries(db: AsyncSession, game_ids: Iterable[int]) -> Dict[int, dict]:
+    """Сводки игр {id: GameSummary} одним запросом по счётчикам и агрегатам оценок."""
+    game_ids = list(game_ids)
+    if not game_ids:
+        return {}
+    game, stats = models.Game, models.GameRatingStats
+    rows = await db.execute(
+        select(game.id, game.review_count, game.comment_count, game.last_activity_at, stats.review_count, stats.rating_sum)
+        .outerjoin(stats, stats.game_id == game.id)
+        .where(game.id.in_(game_ids))
+    )
+    return {
+        id: {
+            "id": id,
+            "review_count": review_count,
+            "comment_count": comment_count,
+            "average_rating": round(rating_sum / rated, 2) if rated else 0,
+            "last_activity_at": last_activity_at,
+        }
+        for id, review_count, comment_count, last_activity_at, rated, rating_sum in rows
+    }
+
 # ========== STATISTICS ==========
-def get_game_statistics(db: Session, game_id: int):
-    reviews = db.query(models.Review).filter(models.Review.game_id == game_id).all()
-    if not reviews:
-        return {"average_rating": 0, "total_reviews": 0}
-    
-    total_rating = sum(review.rating for review in reviews)
-    average_rating = total_rating / len(reviews)
-    
+# Агрегаты оценок (models.GameRatingStats) обновляются в той же транзакции,
+# что и сам обзор, поэтому чтение статистики — O(1) от числа обзоров.
+RATING_BUCKETS = range(1, 11)
+
+def _rating_column(rating: int):
+    return getattr(models.GameRatingStats, f"rating_{rating}")
+
+async def _apply_rating_delta(
+    db: AsyncSession,
+    game_id: int,
+    added: Optional[int] = None,
+    removed: Optional[int] = None
+):
+    """Учитывает добавленную и/или убранную оценку в агрегатах игры (без commit)."""
+    delta = Counter()
+    if added is not None:
+        delta[added] += 1
+    if removed is not None:
+        delta[removed] -= 1
+    await _apply_rating_histogram(db, game_id, delta)
+
+async def _apply_rating_histogram(db: AsyncSession, game_id: int, delta: Dict[int, int]):
+    """Учитывает изменение гистограммы оценок игры {оценка: +-число} одним UPDATE (без commit)."""
+    delta = {rating: count for rating, count in delta.items() if count}
+    if not delta:
+        return
+    stats = models.GameRatingStats
+    count_delta = sum(delta.values())
+    sum_delta = sum(rating * count for rating, count in delta.items())
+    values = {
+        "review_count": stats.review_count + count_delta,
+        "rating_sum": stats.rating_sum + sum_delta,
+        "updated_at": datetime.utcnow(),
+    }
+    for rating, count in delta.items():
+        values[f"rating_{rating}"] = _rating_column(rating) + count
+
+    update_stmt = update(stats).where(stats.game_id == game_id).values(**values)
+    result = await db.execute(update_stmt)
+    if result.rowcount or not any(count > 0 for count in delta.values()):
+        return
+
+    # Первый обзор игры: создаём строку агрегатов
+    buckets = {f"rating_{rating}": delta.get(rating, 0) for rating in RATING_BUCKETS}
+    try:
+        async with db.begin_nested():
+            db.add(stats(
+                game_id=game_id,
+                review_count=count_delta,
+                rating_sum=sum_delta,
+                updated_at=values["updated_at"],
+                **buckets
+            ))
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        await db.execute(update_stmt)
+
+async def get_game_statistics(db: AsyncSession, game_id: int):
+    stats = await db.get(models.GameRatingStats, game_id)
+    if not stats or not stats.review_count:
+        return {
+            "average_rating": 0,
+            "total_reviews": 0,
+            "rating_histogram": {rating: 0 for rating in RATING_BUCKETS},
+            "updated_at": stats.updated_at if stats else None
+        }
+
     return {
-        "average_rating": round(average_rating, 2),
-        "total_reviews": len(reviews)
-    }
\ No newline at end of file
+        "average_rating": round(stats.rating_sum / stats.review_count, 2),
+        "total_reviews": stats.review_count,
+        "rating_histogram": stats.histogram,
+        "updated_at": stats.updated_at
+    }
+
+async def rebuild_game_statistics(
+    db: AsyncSession, game_id: Optional[int] = None, game_ids: Optional[Iterable[int]] = None
+) -> int:
+    """Пересчитывает агрегаты и счётчики игр по таблицам reviews и comments (исправляет расхождения).
+
+    Без game_id/game_ids — для всех игр.
+    """
+    stats = models.GameRatingStats
+    delete_stmt = delete(stats)
+    aggregate = (
+        select(
+            models.Review.game_id,
+            func.count(models.Review.id),
+            func.coalesce(func.sum(models.Review.rating), 0),
+            *[
+                func.coalesce(func.sum(case((models.Review.rating == rating, 1), else_=0)), 0)
+                for rating in RATING_BUCKETS
+            ],
+            literal(datetime.utcnow(), DateTime),
+        )
+        .where(models.Review.game_id.isnot(None))
+        .group_by(models.Review.game_id)
+    )
+    if game_id is not None:
+        game_ids = [game_id]
+    if game_ids is not None:
+        game_ids = list(game_ids)
+        delete_stmt = delete_stmt.where(stats.game_id.in_(game_ids))
+        aggregate = aggregate.where(models.Review.game_id.in_(game_ids))
+
+    await db.execute(delete_stmt)
+    columns = ["game_id", "review_count", "rating_sum"]
+    columns += [f"rating_{rating}" for rating in RATING_BUCKETS] + ["updated_at"]
+    result = await db.execute(insert(stats).from_select(columns, aggregate))
+    for statement in counter_rebuild_statements(game_ids):
+        await db.execute(statement)
+    await db.commit()
+    if game_ids is not None:
+        for id in game_ids:
+            invalidate_game(id)
+    else:
+        invalidate_all()
+    return result.rowcount
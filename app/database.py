@@ -1,3 +1,440 @@
 # app/database.py
-# Временный заглушка для демо
-print("Database module loaded (demo mode)")
+# Слой подключения к БД: пул соединений, фабрика сессий и зависимости get_db / get_read_db.
+#
+# Чтение из обработчиков только для чтения (get_read_db) распределяется по репликам
+# (DATABASE_REPLICA_URLS), запись идёт в основную БД. Клиент, только что записавший
+# данные, READ_YOUR_WRITES_SECONDS читает из основной БД; реплика, не прошедшая проверку
+# здоровья или отставшая больше REPLICA_MAX_LAG_SECONDS, временно исключается.
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.schema import CreateColumn
+
+from app import metrics
+from app.invalidation import invalidation_channel
+
+load_dotenv()
+
+# Конфигурация
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./game_reviews.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# Реплики для чтения (через запятую) и их проверка
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+# Метрики пула
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания соединения из пула",
+    labelnames=("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "db_pool_checkout_timeouts_total",
+    "Количество таймаутов ожидания соединения из пула",
+    labelnames=("engine",),
+)
+
+_pools: Dict[str, QueuePool] = {}
+
+
+def _pool_stats(stat):
+    def collect():
+        return {(name,): stat(pool) for name, pool in list(_pools.items())}
+    return collect
+
+
+def _saturation(pool: QueuePool) -> float:
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+metrics.gauge(
+    "db_pool_checked_out", "Соединения, выданные из пула",
+    labelnames=("engine",), callback=_pool_stats(lambda pool: pool.checkedout()),
+)
+metrics.gauge(
+    "db_pool_size", "Размер пула (постоянные соединения)",
+    labelnames=("engine",), callback=_pool_stats(lambda pool: pool.size()),
+)
+metrics.gauge(
+    "db_pool_overflow", "Текущее число overflow-соединений",
+    labelnames=("engine",), callback=_pool_stats(lambda pool: max(pool.overflow(), 0)),
+)
+metrics.gauge(
+    "db_pool_saturation", "Доля занятых соединений от pool_size + max_overflow",
+    labelnames=("engine",), callback=_pool_stats(_saturation),
+)
+
+
+class _InstrumentedPoolMixin:
+    """Замеряет время ожидания соединения из пула."""
+
+    engine_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.engine_name).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(self.engine_name).observe(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        _pools[self.engine_name] = pool
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def normalize_database_url(url: str) -> str:
+    # Render/Heroku отдают postgres://, SQLAlchemy 2.x понимает только postgresql://
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def to_async_url(url: str) -> str:
+    """Подставляет асинхронный драйвер: asyncpg для Postgres, aiosqlite для SQLite."""
+    url = make_url(normalize_database_url(url))
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def _engine_options(url, name: str, pool_base, is_async: bool) -> dict:
+    backend = url.get_backend_name()
+    connect_args = {}
+    if backend == "sqlite":
+        if not is_async:
+            connect_args["check_same_thread"] = False
+        if url.database in (None, "", ":memory:"):
+            # Для in-memory базы нужно одно общее соединение
+            return {"connect_args": connect_args, "poolclass": StaticPool}
+    elif backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+    pool_class = type(f"{pool_base.__name__}_{name}", (pool_base,), {"engine_name": name})
+    return {
+        "connect_args": connect_args,
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def build_engine(url: str = DATABASE_URL, name: str = "sync") -> Engine:
+    """Синхронный движок для скриптов и обслуживания (create_all, пересчёты)."""
+    url = make_url(normalize_database_url(url))
+    engine = create_engine(url, **_engine_options(url, name, InstrumentedQueuePool, is_async=False))
+    if isinstance(engine.pool, QueuePool):
+        _pools[name] = engine.pool
+    return engine
+
+
+def build_async_engine(url: str = DATABASE_URL, name: str = "primary") -> AsyncEngine:
+    """Асинхронный движок, через который работают роутеры."""
+    url = make_url(to_async_url(url))
+    engine = create_async_engine(url, **_engine_options(url, name, InstrumentedAsyncQueuePool, is_async=True))
+    if isinstance(engine.pool, QueuePool):
+        _pools[name] = engine.pool
+    return engine
+
+
+engine = build_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = build_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+
+# ========== Реплики для чтения ==========
+READS_ROUTED = metrics.counter(
+    "db_reads_total", "Сессии обработчиков чтения по месту выполнения (primary, replica, sticky)",
+    labelnames=("target",),
+)
+REPLICAS_EJECTED = metrics.counter(
+    "db_replica_ejections_total", "Исключения реплики из ротации", labelnames=("engine",)
+)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    ejected_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+
+# Отставание реплики Postgres; 0, если всё полученное уже применено (простой основной БД)
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSet:
+    """Реплики для чтения: выбор по кругу среди здоровых, исключение и проверка здоровья."""
+
+    def __init__(self, replicas: List[Replica], eject_seconds: float = REPLICA_EJECT_SECONDS,
+                 max_lag: float = REPLICA_MAX_LAG_SECONDS):
+        self.replicas = replicas
+        self.eject_seconds = eject_seconds
+        self.max_lag = max_lag
+        self._position = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_urls(cls, urls: List[str], **kwargs) -> "ReplicaSet":
+        replicas = []
+        for number, url in enumerate(urls, 1):
+            engine = build_async_engine(url, name=f"replica-{number}")
+            factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+            replicas.append(Replica(f"replica-{number}", engine, factory))
+        return cls(replicas, **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._position % len(self.replicas)]
+            self._position += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    def eject(self, replica: Replica, reason: str):
+        if replica.healthy:
+            logger.warning("Replica %s ejected for %.0fs: %s", replica.name, self.eject_seconds, reason)
+            REPLICAS_EJECTED.labels(replica.name).inc()
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+
+    async def check(self, replica: Replica):
+        """Проверка здоровья: соединение, SELECT 1 и (для Postgres) отставание репликации."""
+        try:
+            async with replica.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                if connection.dialect.name == "postgresql":
+                    lag = await connection.scalar(_PG_LAG_SQL)
+                    if lag is not None and lag > self.max_lag:
+                        self.eject(replica, f"replication lag {lag:.1f}s")
+                        return
+        except (DBAPIError, OSError) as exc:
+            self.eject(replica, str(exc).splitlines()[0])
+            return
+        if not replica.healthy:
+            logger.info("Replica %s is back in rotation", replica.name)
+        replica.ejected_until = 0.0
+
+    async def check_all(self):
+        for replica in self.replicas:
+            await self.check(replica)
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Replica health check failed")
+
+    def start(self, interval: float = REPLICA_HEALTH_INTERVAL):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replicas = ReplicaSet.from_urls(DATABASE_REPLICA_URLS)
+
+
+# ========== Read-your-writes ==========
+# Клиент (токен или IP) -> время (time.time()), до которого он читает из основной БД
+_sticky: Dict[str, float] = {}
+
+
+def requester_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=12).hexdigest()
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _stick(key: str, until: float):
+    if len(_sticky) > 10000:
+        now = time.time()
+        for expired in [name for name, deadline in _sticky.items() if deadline <= now]:
+            del _sticky[expired]
+    _sticky[key] = max(_sticky.get(key, 0.0), until)
+
+
+def mark_written(key: str):
+    """Клиент только что записал данные: его чтения идут в основную БД (во всех воркерах)."""
+    until = time.time() + READ_YOUR_WRITES_SECONDS
+    _stick(key, until)
+    invalidation_channel.publish("read_your_writes", key, until)
+
+
+invalidation_channel.handler("read_your_writes")(_stick)
+
+
+def is_sticky(key: str) -> bool:
+    until = _sticky.get(key)
+    return until is not None and until > time.time()
+
+
+def remember_requester(db: AsyncSession, request: Request):
+    """Связывает сессию записи с клиентом: commit включит для него read-your-writes."""
+    if replicas.enabled:
+        db.info["requester"] = requester_key(request)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    key = session.info.get("requester")
+    if key is not None:
+        mark_written(key)
+
+
+# ========== Зависимости ==========
+async def get_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        remember_requester(db, request)
+        yield db
+
+
+def _is_connection_error(exc: BaseException) -> bool:
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc.orig, OSError)
+    return isinstance(exc, OSError)
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Сессия для обработчиков только для чтения: реплика или основная БД.
+
+    Сессия основной БД создаётся всегда (соединение она берёт только при первом запросе),
+    поэтому dependency_overrides для get_db действуют и здесь.
+    """
+    if not replicas.enabled:
+        yield db
+        return
+    if is_sticky(requester_key(request)):
+        READS_ROUTED.labels("sticky").inc()
+        yield db
+        return
+    replica = replicas.choose()
+    if replica is None:
+        READS_ROUTED.labels("primary").inc()
+        yield db
+        return
+    READS_ROUTED.labels("replica").inc()
+    # Ответ из реплики может отставать от записи: кэш ответов его не сохраняет
+    request.state.read_target = "replica"
+    async with replica.session_factory() as replica_db:
+        try:
+            yield replica_db
+        except Exception as exc:
+            if _is_connection_error(exc):
+                replicas.eject(replica, str(exc).splitlines()[0])
+            raise
+
+
+def _add_missing_columns(connection) -> Set[str]:
+    """ALTER TABLE ... ADD COLUMN для колонок моделей, которых нет в таблице; возвращает имена таблиц."""
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    altered = set()
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+            altered.add(table.name)
+    return altered
+
+
+def _create_all(connection):
+    from app.crud import counter_rebuild_statements
+    from app.game_search import setup_search
+
+    Base.metadata.create_all(connection)
+    # create_all не трогает уже существующие таблицы — досоздаём новые колонки и индексы
+    altered = _add_missing_columns(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    # Счётчики добавлены в существующую базу — заполняем их по обзорам и комментариям
+    if altered & {"games", "reviews"}:
+        for statement in counter_rebuild_statements():
+            connection.execute(statement)
+    setup_search(connection)
+
+
+async def create_tables(bind: AsyncEngine = async_engine):
+    async with bind.begin() as conn:
+        await conn.run_sync(_create_all)
@@ -0,0 +1,330 @@
+# app/events.py
+# Доменные события и transactional outbox.
+#
+# Путь записи кладёт событие в таблицу outbox_events в той же транзакции, что и
+# основную строку, и отвечает сразу после commit. Фоновый потребитель каждого
+# процесса читает журнал outbox по возрастанию id и передаёт события подписчикам
+# пачками (индекс поиска и другие производные структуры в памяти процесса).
+#
+# Позиция в журнале хранится в процессе: событие доставляется подписчику один раз и
+# повторяется только при его ошибке (с экспоненциальной задержкой); после исчерпания
+# попыток пачка разбирается по одному событию, а сбойные события пропускаются с записью
+# в лог. Обработчики читают актуальное состояние из БД, поэтому повтор безопасен.
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics, models
+from app.invalidation import invalidation_channel
+
+logger = logging.getLogger(__name__)
+
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "200"))
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "1.0"))
+EVENT_MAX_ATTEMPTS = int(os.getenv("EVENT_MAX_ATTEMPTS", "5"))
+EVENT_RETRY_DELAY = float(os.getenv("EVENT_RETRY_DELAY", "0.1"))
+# Сколько хранить события в outbox (для догоняющих процессов и разбора инцидентов)
+EVENT_RETENTION_SECONDS = int(os.getenv("EVENT_RETENTION_SECONDS", "86400"))
+# Сколько ждать строку с пропущенным id (транзакция с меньшим id могла зафиксироваться позже)
+EVENT_GAP_TIMEOUT = float(os.getenv("EVENT_GAP_TIMEOUT", "30"))
+
+EVENTS_DELIVERED = metrics.counter(
+    "events_delivered_total", "События, обработанные подписчиком", labelnames=("subscriber",)
+)
+EVENTS_FAILED = metrics.counter(
+    "events_failed_total", "События, пропущенные подписчиком после всех попыток", labelnames=("subscriber",)
+)
+EVENT_HANDLER_DURATION = metrics.histogram(
+    "event_handler_duration_seconds", "Время обработки пачки событий подписчиком", labelnames=("subscriber",)
+)
+
+
+# ========== События ==========
+@dataclass(frozen=True)
+class Event:
+    pass
+
+
+@dataclass(frozen=True)
+class ReviewCreated(Event):
+    review_id: int
+    game_id: int
+    user_id: int
+    rating: int
+
+
+@dataclass(frozen=True)
+class ReviewUpdated(Event):
+    review_id: int
+    game_id: int
+    rating: int
+    old_rating: int
+    user_id: Optional[int] = None  # нет в событиях, записанных до появления поля
+
+
+@dataclass(frozen=True)
+class ReviewDeleted(Event):
+    review_id: int
+    game_id: int
+    rating: int
+    user_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CommentCreated(Event):
+    comment_id: int
+    review_id: int
+
+
+@dataclass(frozen=True)
+class CommentDeleted(Event):
+    comment_id: int
+    review_id: int
+
+
+@dataclass(frozen=True)
+class GameUpdated(Event):
+    game_id: int
+
+
+@dataclass(frozen=True)
+class GameDeleted(Event):
+    game_id: int
+
+
+# Пачка обзоров, вставленных или обновлённых массовым импортом (app/bulk.py)
+@dataclass(frozen=True)
+class ReviewsImported(Event):
+    review_ids: List[int]
+    game_ids: List[int]
+    user_ids: List[int]
+
+
+EVENT_TYPES: Dict[str, Type[Event]] = {
+    cls.__name__: cls
+    for cls in (
+        ReviewCreated, ReviewUpdated, ReviewDeleted, CommentCreated, CommentDeleted,
+        GameUpdated, GameDeleted, ReviewsImported,
+    )
+}
+
+
+def publish(db: AsyncSession, event: Event):
+    """Добавляет событие в текущую транзакцию (без commit)."""
+    db.add(models.OutboxEvent(event_type=type(event).__name__, payload=json.dumps(asdict(event))))
+
+
+def decode(row: models.OutboxEvent) -> Optional[Event]:
+    cls = EVENT_TYPES.get(row.event_type)
+    return cls(**json.loads(row.payload)) if cls else None
+
+
+# ========== Шина ==========
+Handler = Callable[[AsyncSession, List[Event]], Awaitable[None]]
+
+
+async def journal_position(db: AsyncSession) -> int:
+    """Последний id журнала outbox: позиция, с которой снимок производной структуры догоняет БД."""
+    return await db.scalar(select(func.coalesce(func.max(models.OutboxEvent.id), 0)))
+
+
+async def replay(db: AsyncSession, position: int, handler: Handler, batch_size: int = EVENT_BATCH_SIZE) -> Optional[int]:
+    """Передаёт handler(db, events) события журнала после position пачками.
+
+    Возвращает новую позицию или None, если журнал уже не содержит всех событий после
+    position (очищены по EVENT_RETENTION_SECONDS) — тогда снимок нужно перестроить.
+    """
+    outbox = models.OutboxEvent
+    first, last = (await db.execute(select(func.min(outbox.id), func.max(outbox.id)))).one()
+    # Пустой журнал не отличить от очищенного целиком
+    if last is None or last < position or first > position + 1:
+        return None
+    while True:
+        rows = (await db.scalars(
+            select(outbox).where(outbox.id > position).order_by(outbox.id).limit(batch_size)
+        )).all()
+        if not rows:
+            return position
+        batch = [event for event in map(decode, rows) if event is not None]
+        if batch:
+            await handler(db, batch)
+        position = rows[-1].id
+
+
+class Subscriber:
+    def __init__(self, name: str, handler: Handler, event_types: Tuple[Type[Event], ...]):
+        self.name = name
+        self.handler = handler
+        self.event_types = event_types
+
+
+class EventBus:
+    def __init__(
+        self,
+        batch_size: int = EVENT_BATCH_SIZE,
+        poll_interval: float = EVENT_POLL_INTERVAL,
+        max_attempts: int = EVENT_MAX_ATTEMPTS,
+        retry_delay: float = EVENT_RETRY_DELAY,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.subscribers: List[Subscriber] = []
+        self._last_id = 0
+        self._gaps: Dict[int, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_prune = 0.0
+
+    def subscribe(self, *event_types: Type[Event], name: Optional[str] = None):
+        """Декоратор обработчика пачки событий: async def handler(db, events)."""
+        def register(handler: Handler) -> Handler:
+            self.subscribers.append(Subscriber(name or handler.__name__, handler, event_types))
+            return handler
+        return register
+
+    def notify(self):
+        """Будит потребителей после commit: в этом процессе и в остальных воркерах."""
+        self.wake()
+        invalidation_channel.publish("outbox")
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def reset_position(self, db: AsyncSession):
+        """Начинает чтение журнала с текущего конца (производные структуры уже построены из БД)."""
+        self._last_id = await journal_position(db)
+        self._gaps.clear()
+
+    @property
+    def position(self) -> int:
+        """Id, до которого включительно все события журнала доставлены подписчикам."""
+        return min(self._gaps) - 1 if self._gaps else self._last_id
+
+    async def process_pending(self, session_factory) -> int:
+        """Одна пачка событий из outbox; возвращает число прочитанных событий."""
+        now = time.monotonic()
+        outbox = models.OutboxEvent
+        async with session_factory() as db:
+            condition = outbox.id > self._last_id
+            if self._gaps:
+                condition = or_(condition, outbox.id.in_(list(self._gaps)))
+            rows = (await db.scalars(select(outbox).where(condition).order_by(outbox.id).limit(self.batch_size))).all()
+            if not rows:
+                self._expire_gaps(now)
+                return 0
+
+            # Прочитаны только недоставленные события: новые и пришедшие в пропуски id
+            ids = [row.id for row in rows]
+            events = [decode(row) for row in rows]
+            self._track_gaps(ids, now)
+            for subscriber in self.subscribers:
+                batch = [event for event in events if isinstance(event, subscriber.event_types)]
+                if batch:
+                    await self._deliver(db, subscriber, batch)
+            self._last_id = max(self._last_id, ids[-1])
+            return len(ids)
+
+    def _track_gaps(self, ids: List[int], now: float):
+        for id in ids:
+            self._gaps.pop(id, None)
+        expected = self._last_id + 1
+        for id in ids:
+            if id > self._last_id:
+                for missing in range(expected, id):
+                    self._gaps[missing] = now + EVENT_GAP_TIMEOUT
+                expected = id + 1
+        self._expire_gaps(now)
+
+    def _expire_gaps(self, now: float):
+        for id in [id for id, deadline in self._gaps.items() if deadline <= now]:
+            del self._gaps[id]
+
+    async def _deliver(self, db: AsyncSession, subscriber: Subscriber, events: List[Event]):
+        for attempt in range(self.max_attempts):
+            try:
+                await self._call(db, subscriber, events)
+                return
+            except Exception:
+                await db.rollback()
+                logger.warning("Subscriber %s failed on %d event(s), attempt %d",
+                               subscriber.name, len(events), attempt + 1, exc_info=True)
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+        # Пачка так и не прошла: изолируем сбойные события, остальные доставляем
+        for event in events:
+            try:
+                await self._call(db, subscriber, [event])
+            except Exception:
+                await db.rollback()
+                EVENTS_FAILED.labels(subscriber.name).inc()
+                logger.error("Subscriber %s dropped event %r", subscriber.name, event, exc_info=True)
+
+    async def _call(self, db: AsyncSession, subscriber: Subscriber, events: List[Event]):
+        start = time.perf_counter()
+        await subscriber.handler(db, events)
+        EVENT_HANDLER_DURATION.labels(subscriber.name).observe(time.perf_counter() - start)
+        EVENTS_DELIVERED.labels(subscriber.name).inc(len(events))
+
+    async def prune(self, session_factory, older_than: float = EVENT_RETENTION_SECONDS) -> int:
+        async with session_factory() as db:
+            cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+            result = await db.execute(delete(models.OutboxEvent).where(models.OutboxEvent.created_at < cutoff))
+            await db.commit()
+            return result.rowcount
+
+    async def _run(self, session_factory):
+        while True:
+            try:
+                while await self.process_pending(session_factory):
+                    pass
+                if time.monotonic() - self._last_prune > 3600:
+                    self._last_prune = time.monotonic()
+                    await self.prune(session_factory)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event consumer iteration failed")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, session_factory):
+        """Запускает потребителя с текущей позиции (см. reset_position)."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self, session_factory=None):
+        """Останавливает потребителя; с session_factory — сначала дочитывает журнал."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if session_factory is not None:
+            while await self.process_pending(session_factory):
+                pass
+        self._wakeup = None
+
+
+event_bus = EventBus()
+
+
+@invalidation_channel.on_resync
+@invalidation_channel.handler("outbox")
+def _wake_consumer():
+    event_bus.wake()
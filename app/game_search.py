@@ -0,0 +1,200 @@
+# app/game_search.py
+# Полнотекстовый поиск игр по title/genre/developer:
+#   PostgreSQL — генерируемая колонка tsvector + GIN, pg_trgm для опечаток в названии;
+#   SQLite     — виртуальная таблица FTS5 (external content) с триггерами синхронизации.
+# Индексы обновляет сама БД, поэтому create_game/update_game/delete_game
+# и любые массовые вставки не могут их рассинхронизировать.
+import logging
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, Integer, func, literal_column, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+        title, genre, developer,
+        content='games', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS games_fts_ai AFTER INSERT ON games BEGIN
+        INSERT INTO games_fts(rowid, title, genre, developer)
+        VALUES (new.id, new.title, new.genre, new.developer);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS games_fts_ad AFTER DELETE ON games BEGIN
+        INSERT INTO games_fts(games_fts, rowid, title, genre, developer)
+        VALUES ('delete', old.id, old.title, old.genre, old.developer);
+    END
+    """,
+    # Только индексируемые колонки: счётчики игры (review_count и т.д.) меняются на каждой
+    # записи обзора. DROP — чтобы заменить триггер без списка колонок в уже созданных базах
+    "DROP TRIGGER IF EXISTS games_fts_au",
+    """
+    CREATE TRIGGER games_fts_au AFTER UPDATE OF title, genre, developer ON games BEGIN
+        INSERT INTO games_fts(games_fts, rowid, title, genre, developer)
+        VALUES ('delete', old.id, old.title, old.genre, old.developer);
+        INSERT INTO games_fts(rowid, title, genre, developer)
+        VALUES (new.id, new.title, new.genre, new.developer);
+    END
+    """,
+]
+
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE games ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(genre, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(developer, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_games_search_vector ON games USING GIN (search_vector)",
+]
+
+POSTGRES_TRIGRAM_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_games_title_trgm ON games USING GIN (title gin_trgm_ops)",
+]
+
+# Что установлено в конкретной БД (ключ — URL движка): "fts5", "tsvector", "tsvector+trgm" или None
+_backends: Dict[str, Optional[str]] = {}
+
+
+def tokenize(term: str) -> List[str]:
+    return _TOKEN_RE.findall(term.lower())
+
+
+def setup_search(connection):
+    """Создаёт поисковые структуры (синхронно, вызывается из create_tables)."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        created = not connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'games_fts'"
+        ).first()
+        try:
+            for statement in SQLITE_SETUP:
+                connection.exec_driver_sql(statement)
+        except DBAPIError:
+            logger.warning("SQLite FTS5 is unavailable, game search falls back to LIKE")
+            return
+        if created:
+            connection.exec_driver_sql("INSERT INTO games_fts(games_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        for statement in POSTGRES_SETUP:
+            connection.exec_driver_sql(statement)
+        try:
+            with connection.begin_nested():
+                for statement in POSTGRES_TRIGRAM_SETUP:
+                    connection.exec_driver_sql(statement)
+        except DBAPIError:
+            logger.warning("pg_trgm is unavailable, game search has no typo tolerance")
+    _backends.pop(str(connection.engine.url), None)
+
+
+def rebuild_index(connection):
+    """Полная перестройка FTS5-индекса (для PostgreSQL колонка генерируемая)."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("INSERT INTO games_fts(games_fts) VALUES ('rebuild')")
+
+
+def _detect_backend(connection) -> Optional[str]:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        found = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'games_fts'"
+        ).first()
+        return "fts5" if found else None
+    if dialect == "postgresql":
+        found = connection.exec_driver_sql(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'games' AND column_name = 'search_vector'"
+        ).first()
+        if not found:
+            return None
+        trigram = connection.exec_driver_sql(
+            "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_games_title_trgm'"
+        ).first()
+        return "tsvector+trgm" if trigram else "tsvector"
+    return None
+
+
+async def _backend(db: AsyncSession) -> Optional[str]:
+    key = str(db.get_bind().url)
+    if key not in _backends:
+        connection = await db.connection()
+        _backends[key] = await connection.run_sync(_detect_backend)
+    return _backends[key]
+
+
+def _like_query(term: str):
+    pattern = f"%{term}%"
+    return select(models.Game).where(
+        or_(
+            models.Game.title.ilike(pattern),
+            models.Game.genre.ilike(pattern),
+            models.Game.developer.ilike(pattern)
+        )
+    ).order_by(models.Game.id)
+
+
+def _fts5_query(tokens: List[str]):
+    # Каждый токен — префиксный запрос, все токены обязательны
+    match = " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    hits = (
+        text(
+            "SELECT rowid AS game_id, bm25(games_fts, 10.0, 4.0, 4.0) AS score "
+            "FROM games_fts WHERE games_fts MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(game_id=Integer, score=Float)
+        .subquery("hits")
+    )
+    # bm25: чем меньше значение, тем релевантнее
+    return (
+        select(models.Game)
+        .join(hits, hits.c.game_id == models.Game.id)
+        .order_by(hits.c.score, models.Game.id)
+    )
+
+
+def _tsvector_query(term: str, tokens: List[str], trigram: bool):
+    vector = literal_column("games.search_vector")
+    query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+    rank = func.ts_rank_cd(vector, query)
+    condition = vector.op("@@")(query)
+    if trigram:
+        # Опечатки: похожесть названия по триграммам (порог pg_trgm.similarity_threshold)
+        similarity = func.similarity(models.Game.title, term)
+        condition = or_(condition, models.Game.title.op("%")(term))
+        rank = func.greatest(rank, similarity)
+    return select(models.Game).where(condition).order_by(rank.desc(), models.Game.id)
+
+
+async def search_games(db: AsyncSession, term: str, skip: int = 0, limit: int = 100):
+    """Игры по убыванию релевантности; поддерживает поиск по префиксу (search-as-you-type)."""
+    tokens = tokenize(term)
+    if not tokens:
+        return []
+
+    backend = await _backend(db)
+    if backend == "fts5":
+        query = _fts5_query(tokens)
+    elif backend in ("tsvector", "tsvector+trgm"):
+        query = _tsvector_query(term, tokens, trigram=backend == "tsvector+trgm")
+    else:
+        query = _like_query(term)
+
+    result = await db.scalars(query.offset(skip).limit(limit))
+    return result.all()
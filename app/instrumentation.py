@@ -0,0 +1,237 @@
+# app/instrumentation.py
+# Инструментирование запросов: число SQL-запросов, время в БД, время сериализации и
+# обработчика. Итоги уходят в заголовок Server-Timing и в гистограммы /metrics, а
+# медленные запросы к БД — в структурированный лог (маршрут, SQL, параметры).
+#
+# Статистика запроса лежит в contextvar: хуки SQLAlchemy выполняются в greenlet с тем же
+# контекстом, что и обработчик, поэтому запросы фонового потребителя событий и других
+# задач вне HTTP-запроса в статистику не попадают (но в журнал медленных — попадают).
+import asyncio
+import contextvars
+import copy
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Порог медленного SQL-запроса (0 — журнал выключен)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_PARAMETERS = os.getenv("SLOW_QUERY_LOG_PARAMETERS", "true").lower() in ("1", "true", "yes")
+# Сколько SQL-запросов на один HTTP-запрос считать подозрением на N+1 (0 — не проверять)
+REQUEST_QUERY_WARN = int(os.getenv("REQUEST_QUERY_WARN", "50"))
+_MAX_LOGGED_CHARS = 1000
+
+REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", labelnames=("method", "route")
+)
+REQUEST_DB_QUERIES = metrics.histogram(
+    "http_request_db_queries", "Число SQL-запросов на HTTP-запрос", labelnames=("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+REQUEST_DB_DURATION = metrics.histogram(
+    "http_request_db_duration_seconds", "Суммарное время SQL-запросов на HTTP-запрос", labelnames=("method", "route")
+)
+REQUEST_SERIALIZATION_DURATION = metrics.histogram(
+    "http_request_serialization_seconds", "Время сериализации ответа", labelnames=("method", "route")
+)
+SLOW_QUERIES = metrics.counter(
+    "db_slow_queries_total", "SQL-запросы дольше SLOW_QUERY_MS", labelnames=("route",)
+)
+
+
+@dataclass
+class RequestStats:
+    scope: dict
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+    endpoint_finished: Optional[float] = None
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    @property
+    def route(self) -> str:
+        # Шаблон маршрута (роутер дописывает его в scope), а не путь: метки не растут с числом id
+        route = self.scope.get("route")
+        return getattr(route, "path_format", None) or getattr(route, "path", None) or "other"
+
+    def server_timing(self, handler_seconds: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialization_seconds * 1000:.2f}",
+            f"handler;dur={handler_seconds * 1000:.2f}",
+        ])
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@contextmanager
+def serialization():
+    """Учитывает вложенный блок как время сериализации текущего запроса."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialization_seconds += time.perf_counter() - start
+
+
+# ---------- хуки SQLAlchemy ----------
+def _truncate(value) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= _MAX_LOGGED_CHARS else text[:_MAX_LOGGED_CHARS] + "…"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else None
+        SLOW_QUERIES.labels(route or "background").inc()
+        record = {
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 2),
+            "method": stats.method if stats is not None else None,
+            "route": route,
+            "path": stats.path if stats is not None else None,
+            "statement": _truncate(" ".join(statement.split())),
+            "executemany": executemany,
+        }
+        if SLOW_QUERY_LOG_PARAMETERS:
+            record["parameters"] = _truncate(parameters)
+        slow_query_logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Упавший запрос не доходит до after_cursor_execute: снимаем его отметку здесь
+    connection = context.connection
+    started = connection.info.get("query_started") if connection is not None else None
+    if started:
+        started.pop()
+
+
+# ---------- сериализация response_model ----------
+class TimedRoute(APIRoute):
+    """Маршрут, у которого проверка response_model и кодирование ответа входят в serialize.
+
+    Считается время от возврата обработчика до готового Response. Подключается через
+    APIRouter(route_class=TimedRoute); синхронные обработчики не оборачиваются.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if not asyncio.iscoroutinefunction(call):
+            return super().get_route_handler()
+
+        @functools.wraps(call)
+        async def timed_call(**values):
+            result = await call(**values)
+            stats = _current.get()
+            if stats is not None:
+                stats.endpoint_finished = time.perf_counter()
+            return result
+
+        # FastAPI берёт обработчик из dependant при сборке handler'а
+        original, self.dependant = self.dependant, copy.copy(self.dependant)
+        self.dependant.call = timed_call
+        try:
+            handler = super().get_route_handler()
+        finally:
+            self.dependant = original
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = _current.get()
+            if stats is not None and stats.endpoint_finished is not None:
+                stats.serialization_seconds += time.perf_counter() - stats.endpoint_finished
+                stats.endpoint_finished = None
+            return response
+
+        return timed_handler
+
+
+# ---------- middleware ----------
+class InstrumentationMiddleware:
+    """ASGI-middleware: собирает RequestStats, добавляет Server-Timing и пишет метрики."""
+
+    def __init__(self, app, enabled: bool = INSTRUMENTATION_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                handler = time.perf_counter() - stats.started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing(handler).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._observe(stats)
+
+    def _observe(self, stats: RequestStats):
+        labels = (stats.method, stats.route)
+        REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - stats.started)
+        REQUEST_DB_QUERIES.labels(*labels).observe(stats.queries)
+        REQUEST_DB_DURATION.labels(*labels).observe(stats.db_seconds)
+        REQUEST_SERIALIZATION_DURATION.labels(*labels).observe(stats.serialization_seconds)
+        if REQUEST_QUERY_WARN and stats.queries >= REQUEST_QUERY_WARN:
+            slow_query_logger.warning(json.dumps({
+                "event": "many_queries",
+                "queries": stats.queries,
+                "db_ms": round(stats.db_seconds * 1000, 2),
+                "method": stats.method,
+                "route": stats.route,
+                "path": stats.path,
+            }, ensure_ascii=False))
+
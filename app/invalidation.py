@@ -0,0 +1,322 @@
+# app/invalidation.py
+# Канал инвалидации кэшей между воркерами (gunicorn -w N).
+#
+# Каждый воркер держит кэши в своей памяти (кэш ответов, кэш токенов). Путь записи после
+# commit сбрасывает локальный кэш и рассылает сообщение остальным воркерам: через
+# Unix-сокеты в общем каталоге (воркеры одной машины, см. gunicorn.conf.py) или через
+# Postgres LISTEN/NOTIFY (воркеры на нескольких машинах). Доставка не гарантирована
+# (переполненный буфер, перезапуск воркера) — устаревшая запись тогда живёт не дольше TTL.
+#
+# Производные структуры (индекс поиска, рейтинги, рекомендации) согласуются через outbox:
+# журнал читает каждый воркер, а канал лишь будит потребителей раньше интервала опроса.
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# auto — сокеты, если задан каталог (его выставляет gunicorn.conf.py), иначе канал выключен
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "auto").lower()
+INVALIDATION_SOCKET_DIR = os.getenv("INVALIDATION_SOCKET_DIR", "")
+INVALIDATION_PG_CHANNEL = os.getenv("INVALIDATION_PG_CHANNEL", "cache_invalidation")
+# Сообщений в одной датаграмме / NOTIFY (payload NOTIFY ограничен 8000 байтами)
+MESSAGES_PER_PACKET = 50
+# Проверка соединения LISTEN и паузы между попытками переподключения (растут вдвое)
+INVALIDATION_PG_CHECK_SECONDS = float(os.getenv("INVALIDATION_PG_CHECK_SECONDS", "5"))
+INVALIDATION_PG_RECONNECT_MIN_SECONDS = 0.5
+INVALIDATION_PG_RECONNECT_MAX_SECONDS = 30.0
+
+MESSAGES_SENT = metrics.counter(
+    "invalidation_messages_sent_total", "Сообщения инвалидации, отправленные другим воркерам", labelnames=("kind",)
+)
+MESSAGES_RECEIVED = metrics.counter(
+    "invalidation_messages_received_total", "Сообщения инвалидации от других воркеров", labelnames=("kind",)
+)
+PACKETS_DROPPED = metrics.counter(
+    "invalidation_packets_dropped_total", "Пакеты инвалидации, которые не удалось отправить"
+)
+RECONNECTS = metrics.counter(
+    "invalidation_reconnects_total", "Переподключения канала инвалидации после потери соединения"
+)
+
+
+class SocketBackend:
+    """Датаграммы Unix-сокетов: каждый воркер слушает <каталог>/<name>.sock и пишет во все остальные."""
+
+    name = "socket"
+
+    def __init__(self, directory: str, name: Optional[str] = None):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name or os.getpid()}.sock")
+        self._socket: Optional[socket.socket] = None
+
+    async def start(self, on_packet: Callable[[str], None], on_reconnect: Optional[Callable[[], None]] = None):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.path)
+        sock.setblocking(False)
+        self._socket = sock
+
+        def read():
+            while True:
+                try:
+                    data = sock.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    return
+                on_packet(data.decode())
+
+        asyncio.get_running_loop().add_reader(sock.fileno(), read)
+
+    def send(self, packet: str):
+        data = packet.encode()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                self._socket.sendto(data, path)
+            except ConnectionRefusedError:
+                # Сокет остался от завершившегося воркера
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except FileNotFoundError:
+                pass
+            except OSError:
+                PACKETS_DROPPED.inc()
+                logger.warning("Invalidation packet to %s dropped", path, exc_info=True)
+
+    async def stop(self):
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            asyncio.get_running_loop().remove_reader(sock.fileno())
+            sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class PostgresBackend:
+    """LISTEN/NOTIFY на отдельном соединении asyncpg (вне пула приложения).
+
+    Потерянное соединение восстанавливается в фоне с нарастающей паузой; после
+    переподключения вызывается on_reconnect — сообщения за время разрыва могли пропасть.
+    """
+
+    name = "postgres"
+
+    def __init__(self, url: str, channel: str = INVALIDATION_PG_CHANNEL):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self._connection = None
+        self._on_packet: Optional[Callable[[str], None]] = None
+        self._on_reconnect: Optional[Callable[[], None]] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._lost: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def _open(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _connect(self):
+        connection = await self._open()
+        connection.add_termination_listener(lambda connection: self._lost.set())
+        await connection.add_listener(
+            self.channel, lambda connection, pid, channel, payload: self._on_packet(payload)
+        )
+        self._connection = connection
+        self._lost.clear()
+
+    async def start(self, on_packet: Callable[[str], None], on_reconnect: Optional[Callable[[], None]] = None):
+        self._on_packet = on_packet
+        self._on_reconnect = on_reconnect
+        self._queue = asyncio.Queue()
+        self._lost = asyncio.Event()
+        await self._connect()
+        self._tasks = [asyncio.create_task(self._send_loop()), asyncio.create_task(self._watch_loop())]
+
+    def send(self, packet: str):
+        self._queue.put_nowait(packet)
+
+    async def _send_loop(self):
+        while True:
+            packet = await self._queue.get()
+            try:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, packet)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Потерянные за время разрыва сообщения покрывает TTL кэшей
+                PACKETS_DROPPED.inc()
+                logger.warning("Invalidation NOTIFY failed", exc_info=True)
+                if self._connection.is_closed():
+                    self._lost.set()
+
+    async def _watch_loop(self):
+        # Воркер, который только слушает, узнаёт о разрыве из termination listener или проверки
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), INVALIDATION_PG_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                if not self._connection.is_closed():
+                    continue
+            await self._reconnect()
+
+    async def _reconnect(self):
+        try:
+            self._connection.terminate()
+        except Exception:
+            pass
+        delay = INVALIDATION_PG_RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                await self._connect()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Invalidation LISTEN reconnect failed, retrying in %.1fs", delay, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, INVALIDATION_PG_RECONNECT_MAX_SECONDS)
+        RECONNECTS.inc()
+        logger.info("Invalidation LISTEN connection restored")
+        if self._on_reconnect is not None:
+            self._on_reconnect()
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+def backend_from_env(database_url: str):
+    backend = INVALIDATION_BACKEND
+    if backend == "auto":
+        backend = "socket" if INVALIDATION_SOCKET_DIR else "none"
+    if backend == "socket":
+        if not INVALIDATION_SOCKET_DIR:
+            raise RuntimeError("INVALIDATION_SOCKET_DIR is required for the socket invalidation backend")
+        return SocketBackend(INVALIDATION_SOCKET_DIR)
+    if backend == "postgres":
+        return PostgresBackend(database_url)
+    if backend == "none":
+        return None
+    raise RuntimeError(f"Unknown INVALIDATION_BACKEND: {backend}")
+
+
+class InvalidationChannel:
+    """Рассылка сообщений вида (kind, *args) другим воркерам.
+
+    Обработчики регистрируются декоратором @channel.handler(kind) и вызываются только для
+    сообщений других воркеров: свой кэш отправитель сбрасывает сам. Сообщения одного шага
+    цикла событий уходят одним пакетом. Обработчики @channel.on_resync вызываются после
+    восстановления связи и сбрасывают кэши целиком: пропущенные сообщения неизвестны.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable] = {}
+        self.resync_handlers: List[Callable[[], None]] = []
+        self.backend = None
+        self.origin: Optional[str] = None
+        self._pending: List[list] = []
+
+    def handler(self, kind: str):
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def on_resync(self, func):
+        self.resync_handlers.append(func)
+        return func
+
+    def resync(self):
+        for handler in self.resync_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Invalidation resync handler %s failed", getattr(handler, "__name__", handler))
+
+    @property
+    def active(self) -> bool:
+        return self.backend is not None
+
+    def publish(self, kind: str, *args):
+        if self.backend is None:
+            return
+        if not self._pending:
+            try:
+                asyncio.get_running_loop().call_soon(self.flush)
+            except RuntimeError:
+                self._pending.append([kind, *args])
+                self.flush()
+                return
+        self._pending.append([kind, *args])
+
+    def flush(self):
+        messages, self._pending = self._pending, []
+        if self.backend is None or not messages:
+            return
+        for start in range(0, len(messages), MESSAGES_PER_PACKET):
+            chunk = messages[start:start + MESSAGES_PER_PACKET]
+            self.backend.send(json.dumps({"origin": self.origin, "messages": chunk}))
+        for kind, *_ in messages:
+            MESSAGES_SENT.labels(kind).inc()
+
+    def receive(self, packet: str):
+        try:
+            data = json.loads(packet)
+        except ValueError:
+            logger.warning("Malformed invalidation packet: %r", packet[:200])
+            return
+        # NOTIFY доставляется и самому отправителю
+        if data.get("origin") == self.origin:
+            return
+        for kind, *args in data.get("messages", []):
+            handler = self.handlers.get(kind)
+            if handler is None:
+                continue
+            MESSAGES_RECEIVED.labels(kind).inc()
+            try:
+                handler(*args)
+            except Exception:
+                logger.exception("Invalidation handler %s failed", kind)
+
+    async def start(self, database_url: str, backend=None):
+        """Запускается в startup каждого воркера (после fork: pid уже свой)."""
+        backend = backend if backend is not None else backend_from_env(database_url)
+        if backend is None:
+            return
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        await backend.start(self.receive, self.resync)
+        self.backend = backend
+
+    async def stop(self):
+        backend, self.backend = self.backend, None
+        self._pending = []
+        if backend is not None:
+            await backend.stop()
+
+
+invalidation_channel = InvalidationChannel()
@@ -0,0 +1,274 @@
+# app/leaderboards.py
+# Рейтинги игр для главной страницы: лучшие (байесовское среднее), самые обсуждаемые
+# и «в тренде» (число обзоров за скользящее окно), в целом и по жанрам.
+#
+# Рейтинги хранятся в памяти процесса как отсортированные списки ключей: чтение —
+# срез первых N элементов без запросов к БД. Игры, затронутые записью обзоров,
+# пересчитываются из БД подписчиком outbox (повтор безопасен). Раз в
+# LEADERBOARD_REFRESH_SECONDS всё строится заново: так окно «в тренде» сдвигается
+# и для игр без новых обзоров, а среднее по платформе для байесовской оценки обновляется.
+import asyncio
+import bisect
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import events, models
+from app.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+LEADERBOARD_TRENDING_DAYS = int(os.getenv("LEADERBOARD_TRENDING_DAYS", "7"))
+# Вес априорного среднего: столько «виртуальных» обзоров со средней оценкой платформы
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv("LEADERBOARD_PRIOR_WEIGHT", "5"))
+# Оценка по умолчанию, пока на платформе нет ни одного обзора
+DEFAULT_MEAN_RATING = 5.5
+
+BOARDS = ("top_rated", "most_reviewed", "trending")
+
+
+@dataclass
+class GameEntry:
+    game_id: int
+    title: str
+    genre: Optional[str]
+    review_count: int
+    rating_sum: int
+    recent_reviews: int
+
+    @property
+    def average_rating(self) -> float:
+        return round(self.rating_sum / self.review_count, 2) if self.review_count else 0
+
+
+class _Ranking:
+    """Отсортированный по ключу список id: обновление — bisect, чтение — срез."""
+
+    def __init__(self):
+        self._keys: List[tuple] = []
+        self._key_of: Dict[int, tuple] = {}
+
+    def set(self, id: int, key: Optional[tuple]):
+        old = self._key_of.pop(id, None)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, old)]
+        if key is not None:
+            key = (*key, id)
+            bisect.insort(self._keys, key)
+            self._key_of[id] = key
+
+    def top(self, limit: int) -> List[int]:
+        return [key[-1] for key in self._keys[:limit]]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _Board:
+    """Рейтинг по всем играм и отдельные рейтинги по жанрам."""
+
+    def __init__(self):
+        self.overall = _Ranking()
+        self.by_genre: Dict[str, _Ranking] = {}
+
+    def set(self, id: int, genre: Optional[str], key: Optional[tuple], old_genre: Optional[str] = None):
+        self.overall.set(id, key)
+        if old_genre is not None and old_genre != genre and old_genre in self.by_genre:
+            self.by_genre[old_genre].set(id, None)
+            if not self.by_genre[old_genre]:
+                del self.by_genre[old_genre]
+        if genre is not None:
+            ranking = self.by_genre.setdefault(genre, _Ranking())
+            ranking.set(id, key)
+            if not ranking:
+                del self.by_genre[genre]
+
+    def top(self, limit: int, genre: Optional[str] = None) -> List[int]:
+        ranking = self.overall if genre is None else self.by_genre.get(genre)
+        return ranking.top(limit) if ranking is not None else []
+
+
+class Leaderboards:
+    def __init__(
+        self,
+        trending_days: int = LEADERBOARD_TRENDING_DAYS,
+        prior_weight: float = LEADERBOARD_PRIOR_WEIGHT,
+        refresh_interval: float = LEADERBOARD_REFRESH_SECONDS,
+    ):
+        self.trending_days = trending_days
+        self.prior_weight = prior_weight
+        self.refresh_interval = refresh_interval
+        self._refreshing: Optional[Set[int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.clear()
+
+    def clear(self):
+        self.mean_rating = DEFAULT_MEAN_RATING
+        self.updated_at: Optional[datetime] = None
+        self.totals: Dict[str, int] = {"games": 0, "users": 0, "reviews": 0}
+        self._games: Dict[int, GameEntry] = {}
+        self._boards: Dict[str, _Board] = {name: _Board() for name in BOARDS}
+
+    # ---------- оценки ----------
+    def bayesian_score(self, entry: GameEntry) -> float:
+        weight = self.prior_weight
+        return (weight * self.mean_rating + entry.rating_sum) / (weight + entry.review_count)
+
+    def _keys(self, entry: GameEntry) -> Dict[str, Optional[tuple]]:
+        # Ключи по возрастанию = от лучшего к худшему; игры без обзоров в рейтинги не входят
+        if not entry.review_count:
+            return {name: None for name in BOARDS}
+        score = self.bayesian_score(entry)
+        return {
+            "top_rated": (-score, -entry.review_count),
+            "most_reviewed": (-entry.review_count, -score),
+            "trending": (-entry.recent_reviews, -score) if entry.recent_reviews else None,
+        }
+
+    def _put(self, entry: GameEntry):
+        old = self._games.get(entry.game_id)
+        self._games[entry.game_id] = entry
+        for name, key in self._keys(entry).items():
+            self._boards[name].set(entry.game_id, entry.genre, key, old.genre if old else None)
+
+    def _drop(self, game_id: int):
+        old = self._games.pop(game_id, None)
+        if old is not None:
+            for board in self._boards.values():
+                board.set(game_id, None, None, old.genre)
+
+    # ---------- чтение ----------
+    def top(self, board: str, limit: int = 10, genre: Optional[str] = None) -> List[GameEntry]:
+        if board not in self._boards:
+            raise ValueError(f"Unknown leaderboard: {board}")
+        return [self._games[id] for id in self._boards[board].top(limit, genre)]
+
+    def genres(self) -> List[str]:
+        return sorted(self._boards["top_rated"].by_genre)
+
+    def __len__(self):
+        return len(self._boards["top_rated"].overall)
+
+    # ---------- загрузка из БД ----------
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.trending_days)
+
+    async def _load(self, db: AsyncSession, game_ids: Optional[Iterable[int]] = None) -> Dict[int, GameEntry]:
+        stats = models.GameRatingStats
+        query = (
+            select(
+                models.Game.id, models.Game.title, models.Game.genre,
+                func.coalesce(stats.review_count, 0), func.coalesce(stats.rating_sum, 0),
+            )
+            .outerjoin(stats, stats.game_id == models.Game.id)
+        )
+        recent = (
+            select(models.Review.game_id, func.count(models.Review.id))
+            .where(models.Review.created_at >= self._cutoff(), models.Review.game_id.isnot(None))
+            .group_by(models.Review.game_id)
+        )
+        if game_ids is not None:
+            game_ids = list(game_ids)
+            query = query.where(models.Game.id.in_(game_ids))
+            recent = recent.where(models.Review.game_id.in_(game_ids))
+        else:
+            # Полная перестройка: игры без обзоров не нужны
+            query = query.where(stats.review_count > 0)
+        recent_counts = dict((await db.execute(recent)).all())
+        return {
+            id: GameEntry(id, title, genre, review_count, rating_sum, recent_counts.get(id, 0))
+            for id, title, genre, review_count, rating_sum in await db.execute(query)
+        }
+
+    async def refresh(self, db: AsyncSession):
+        """Полная перестройка рейтингов (при старте и периодически)."""
+        # Игры, изменённые во время чтения, пересчитываются после подмены
+        self._refreshing = set()
+        try:
+            entries = await self._load(db)
+            review_count, rating_sum = (await db.execute(
+                select(
+                    func.coalesce(func.sum(models.GameRatingStats.review_count), 0),
+                    func.coalesce(func.sum(models.GameRatingStats.rating_sum), 0),
+                )
+            )).one()
+            totals = {
+                "games": await db.scalar(select(func.count(models.Game.id))),
+                "users": await db.scalar(select(func.count(models.User.id))),
+                "reviews": review_count,
+            }
+        except BaseException:
+            self._refreshing = None
+            raise
+
+        self.mean_rating = rating_sum / review_count if review_count else DEFAULT_MEAN_RATING
+        self._games = {}
+        self._boards = {name: _Board() for name in BOARDS}
+        for entry in entries.values():
+            self._put(entry)
+        self.totals = totals
+        self.updated_at = datetime.utcnow()
+        touched, self._refreshing = self._refreshing, None
+        if touched:
+            await self.sync_games(db, touched)
+
+    async def sync_games(self, db: AsyncSession, game_ids: Iterable[int]):
+        """Пересчитывает игры с данными id по состоянию БД (удалённые убираются из рейтингов)."""
+        game_ids = set(game_ids)
+        if not game_ids:
+            return
+        if self._refreshing is not None:
+            self._refreshing |= game_ids
+        entries = await self._load(db, game_ids)
+        for id in game_ids:
+            if id in entries:
+                self._put(entries[id])
+            else:
+                self._drop(id)
+
+    # ---------- периодическое обновление ----------
+    async def _run(self, session_factory):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with session_factory() as db:
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Leaderboard refresh failed")
+
+    def start(self, session_factory):
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+leaderboards = Leaderboards()
+
+
+@event_bus.subscribe(
+    events.ReviewCreated, events.ReviewUpdated, events.ReviewDeleted,
+    events.GameUpdated, events.GameDeleted, events.ReviewsImported, name="leaderboards"
+)
+async def apply_events(db: AsyncSession, batch: List[events.Event]):
+    game_ids = set()
+    for event in batch:
+        if isinstance(event, events.ReviewsImported):
+            game_ids.update(event.game_ids)
+        else:
+            game_ids.add(event.game_id)
+    await leaderboards.sync_games(db, game_ids)
@@ -0,0 +1,114 @@
+# app/loaders.py
+# DataLoader на время запроса: отдельные load(id), сделанные за один шаг цикла событий,
+# уходят в БД одним SELECT ... WHERE id IN (...), а результаты запоминаются до конца
+# запроса — повторная проверка той же игры или обзора не делает запроса.
+#
+# Загрузчики привязаны к сессии запроса (зависимости get_loaders / get_read_loaders);
+# между запросами ничего не кэшируется, поэтому инвалидация не нужна.
+import asyncio
+import os
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.database import get_db, get_read_db
+
+# Больше ключей в одном IN (...) — несколько запросов подряд
+LOADER_MAX_BATCH_SIZE = int(os.getenv("LOADER_MAX_BATCH_SIZE", "500"))
+
+BatchLoad = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class DataLoader:
+    """Собирает load(key) одного шага цикла событий в один вызов batch_load(keys) -> {key: value}.
+
+    Отсутствующий в ответе ключ даёт None. Ошибка batch_load передаётся всем ожидающим
+    и не запоминается: следующий load того же ключа повторит запрос.
+    """
+
+    def __init__(self, batch_load: BatchLoad, max_batch_size: int = LOADER_MAX_BATCH_SIZE):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+
+    def load(self, key: Hashable) -> Awaitable[Any]:
+        future = self._cache.get(key)
+        if future is not None and not future.cancelled():
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        if not self._queue:
+            loop.call_soon(self._dispatch)
+        self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        """Значения в порядке keys (None для отсутствующих)."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Any):
+        """Запоминает уже загруженное значение (например, только что созданную запись)."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[key] = future
+
+    def clear(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start:start + self.max_batch_size]
+            asyncio.ensure_future(self._load_batch([(key, self._cache[key]) for key in batch]))
+
+    async def _load_batch(self, pending):
+        try:
+            values = await self.batch_load([key for key, _ in pending])
+        except Exception as exc:
+            for key, future in pending:
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key, future in pending:
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+class Loaders:
+    """Загрузчики игр, пользователей и обзоров одной сессии."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # AsyncSession не выполняет запросы параллельно, а пачки разных загрузчиков
+        # одного шага цикла событий стартуют одновременно
+        self._lock = asyncio.Lock()
+        self.games = DataLoader(self._locked(crud.get_games_by_ids))
+        self.users = DataLoader(self._locked(crud.get_users_by_ids))
+        self.reviews = DataLoader(self._locked(
+            partial(crud.get_reviews_by_ids, loader=crud.loader_strategy("load_reviews"))
+        ))
+
+    def _locked(self, fetch) -> BatchLoad:
+        async def batch_load(ids):
+            async with self._lock:
+                return await fetch(self.db, ids)
+        return batch_load
+
+
+async def get_loaders(db: AsyncSession = Depends(get_db)) -> Loaders:
+    return Loaders(db)
+
+
+async def get_read_loaders(db: AsyncSession = Depends(get_read_db)) -> Loaders:
+    """Загрузчики поверх сессии чтения (реплика, если доступна)."""
+    return Loaders(db)
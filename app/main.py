@@ -1,86 +1,150 @@
-import uvicorn  # Импорт должен быть в начале файла
-from fastapi import FastAPI, Request
+# app/main.py
+# Сборка приложения: create_app(settings) подключает middleware, статику и роутеры из
+# настроек; фоновые задачи запускаются и останавливаются в lifespan.
+#
+# Импорт модуля ничего не печатает и не трогает файловую систему: тяжёлые зависимости
+# (jose, passlib/bcrypt, Jinja2, uvicorn) загружаются при первом использовании.
+import importlib
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-from typing import List, Optional
-import os
-
-
-# Получаем абсолютный путь к корневой директории
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# Проверяем существование папок (для отладки)
-STATIC_DIR = os.path.join(BASE_DIR, "static")
-TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
-
-print(f"Base directory: {BASE_DIR}")
-print(f"Static directory: {STATIC_DIR} - exists: {os.path.exists(STATIC_DIR)}")
-print(f"Templates directory: {TEMPLATES_DIR} - exists: {os.path.exists(TEMPLATES_DIR)}")
-
-# Если папок нет, создаем их (опционально, для безопасности)
-if not os.path.exists(STATIC_DIR):
-    print(f"WARNING: Static directory not found: {STATIC_DIR}")
-if not os.path.exists(TEMPLATES_DIR):
-    print(f"WARNING: Templates directory not found: {TEMPLATES_DIR}")
-
-app = FastAPI(title="GameReviews Platform API")
-
-# Разрешаем CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # В продакшене лучше указать конкретные домены
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Монтируем статические файлы
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
-
-# Пример модели данных
-class Game(BaseModel):
-    id: int
-    title: str
-    description: Optional[str] = None
-
-# Демо данные
-demo_games = [
-    {"id": 1, "title": "The Witcher 3", "description": "RPG игра"},
-    {"id": 2, "title": "Cyberpunk 2077", "description": "Футуристический экшен"},
-    {"id": 3, "title": "Elden Ring", "description": "Открытый мир, Dark Souls стиль"},
+
+from app import metrics
+from app.database import DATABASE_URL, AsyncSessionLocal, async_engine, create_tables, replicas
+from app.events import event_bus
+from app.instrumentation import InstrumentationMiddleware, TimedRoute
+from app.invalidation import invalidation_channel
+from app.leaderboards import leaderboards
+from app.password_hasher import password_hasher
+from app.rate_limit import RateLimitHeadersMiddleware
+from app.recommendations import init_recommendations
+from app.response_cache import ResponseCacheMiddleware
+from app.review_index import init_review_index, review_snapshots
+from app.settings import Settings
+
+EXPOSE_HEADERS = [
+    "Link", "X-Next-Cursor", "X-Prev-Cursor", "ETag", "Server-Timing",
+    "Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy",
 ]
 
-# API endpoints
-@app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
 
-@app.get("/api/games", response_model=List[Game])
-async def get_games():
-    return demo_games
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await create_tables()
+    async with AsyncSessionLocal() as db:
+        # Позиция в outbox фиксируется до построения индекса: события, пришедшие во время
+        # построения, будут применены повторно, а это безопасно
+        await event_bus.reset_position(db)
+        await init_review_index(db)
+        await leaderboards.refresh(db)
+        await init_recommendations(db)
+    # Канал инвалидации между воркерами (при запуске через gunicorn.conf.py)
+    await invalidation_channel.start(DATABASE_URL)
+    # Реплики для чтения: недоступные исключаются сразу, дальше — периодическая проверка
+    await replicas.check_all()
+    replicas.start()
+    event_bus.start(AsyncSessionLocal)
+    leaderboards.start(AsyncSessionLocal)
+    review_snapshots.start()
+    try:
+        yield
+    finally:
+        await leaderboards.stop()
+        await event_bus.stop(AsyncSessionLocal)
+        # После дочитывания outbox: снимок индекса обзоров с итоговой позицией
+        await review_snapshots.stop()
+        await invalidation_channel.stop()
+        await replicas.stop()
+        await replicas.dispose()
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+
+# ========== Служебные эндпоинты ==========
+core_router = APIRouter(route_class=TimedRoute)
+
+
+def _templates(request: Request):
+    # Шаблоны создаются при первом запросе страницы; без DEBUG Jinja компилирует их один
+    # раз и не проверяет файлы на изменение
+    templates = getattr(request.app.state, "templates", None)
+    if templates is None:
+        from fastapi.templating import Jinja2Templates
+
+        settings: Settings = request.app.state.settings
+        templates = Jinja2Templates(directory=settings.templates_dir, auto_reload=settings.debug)
+        request.app.state.templates = templates
+    return templates
+
+
+@core_router.get("/", response_class=HTMLResponse)
+async def read_root(request: Request):
+    return _templates(request).TemplateResponse("index.html", {"request": request})
 
-@app.get("/api/users")
-async def get_users():
-    return [{"id": 1, "username": "test_user"}]
 
-@app.get("/api/health")
+@core_router.get("/api/health")
 async def health_check():
     """Проверка работоспособности API"""
     return {
-        "status": "ok", 
+        "status": "ok",
         "service": "GameReviews Platform API",
         "version": "1.0.0"
     }
 
-@app.get("/api/docs")
+
+@core_router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Метрики в формате Prometheus (пул соединений и т.д.)"""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
+
+
+@core_router.get("/api/docs")
 async def get_api_docs_redirect():
     """Перенаправление на Swagger документацию"""
-    from fastapi.responses import RedirectResponse
     return RedirectResponse(url="/docs")
 
+
+# ========== Фабрика ==========
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or Settings.from_env()
+    app = FastAPI(title=settings.title, lifespan=lifespan)
+    app.state.settings = settings
+
+    # Кэш ответов для чтения игр и отзывов (ETag / If-None-Match)
+    app.add_middleware(ResponseCacheMiddleware)
+    # Заголовки RateLimit-* ответов, прошедших ограничения частоты (снаружи кэша — в кэш не попадают)
+    app.add_middleware(RateLimitHeadersMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=EXPOSE_HEADERS,
+    )
+    # Server-Timing и метрики запроса (SQL, сериализация); внешний слой — учитывает и кэш ответов
+    app.add_middleware(InstrumentationMiddleware)
+
+    # Каталог проверяется при первом обращении к /static, а не при импорте
+    app.mount("/static", StaticFiles(directory=settings.static_dir, check_dir=False), name="static")
+
+    app.include_router(core_router)
+    # Роутеры API (работают через пул соединений из app.database)
+    for module_name, attribute, prefix in settings.router_specs():
+        module = importlib.import_module(module_name)
+        router = getattr(module, attribute)
+        tags = None if router.tags else [module_name.rsplit(".", 1)[-1]]
+        app.include_router(router, prefix=prefix, tags=tags)
+    return app
+
+
+app = create_app()
+
 # Для запуска в режиме разработки
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
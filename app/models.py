@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset-пагинация идёт по (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
@@ -18,6 +22,9 @@ class User(Base):
 
 class Game(Base):
     __tablename__ = "games"
+    __table_args__ = (
+        Index("ix_games_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False, index=True)
@@ -26,11 +33,19 @@ class Game(Base):
     release_year = Column(Integer)
     developer = Column(String(100))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Денормализованные счётчики: обновляются в транзакции записи обзора/комментария (app/crud.py)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime, default=datetime.utcnow)  # последний новый обзор или комментарий
     
     reviews = relationship("Review", back_populates="game")
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_created_at_id", "created_at", "id"),
+        Index("ix_reviews_game_id_created_at_id", "game_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(Integer, ForeignKey("games.id"))
@@ -38,6 +53,8 @@ class Review(Base):
     content = Column(Text, nullable=False)
     rating = Column(Integer, nullable=False)  # 1-10
     created_at = Column(DateTime, default=datetime.utcnow)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime, default=datetime.utcnow)  # создание обзора или последний комментарий
     
     game = relationship("Game", back_populates="reviews")
     author = relationship("User", back_populates="reviews")
@@ -45,6 +62,9 @@ class Review(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_review_id_created_at_id", "review_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     review_id = Column(Integer, ForeignKey("reviews.id"))
@@ -53,4 +73,37 @@ class Comment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     review = relationship("Review", back_populates="comments")
-    author = relationship("User", back_populates="comments")
\ No newline at end of file
+    author = relationship("User", back_populates="comments")
+
+class GameRatingStats(Base):
+    """Агрегаты оценок по игре, обновляются инкрементально при записи обзоров."""
+    __tablename__ = "game_rating_stats"
+
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    # Гистограмма оценок 1-10
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    rating_6 = Column(Integer, nullable=False, default=0)
+    rating_7 = Column(Integer, nullable=False, default=0)
+    rating_8 = Column(Integer, nullable=False, default=0)
+    rating_9 = Column(Integer, nullable=False, default=0)
+    rating_10 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f"rating_{rating}") or 0 for rating in range(1, 11)}
+
+class OutboxEvent(Base):
+    """Доменное событие, записанное в одной транзакции с изменением (transactional outbox)."""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON полей события
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,185 @@
+# app/pagination.py
+# Keyset (cursor) пагинация по (created_at, id) и legacy-режим skip/limit
+import base64
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Сколько строк читается из серверного курсора за раз при потоковой выдаче
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+# Сколько id можно запросить одним ?ids=1,2,3
+MAX_IDS_PER_REQUEST = int(os.getenv("MAX_IDS_PER_REQUEST", "100"))
+
+
+@dataclass(frozen=True)
+class Cursor:
+    created_at: datetime
+    id: int
+    backwards: bool = False
+
+
+def encode_cursor(created_at: datetime, id: int, backwards: bool = False) -> str:
+    payload = json.dumps([created_at.isoformat(), id, int(backwards)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, id, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Cursor(datetime.fromisoformat(created_at), int(id), bool(backwards))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {token!r}") from exc
+
+
+def cursor_param(
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor / X-Prev-Cursor")
+) -> Optional[Cursor]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_ids(value: str) -> List[int]:
+    """"1,2,3" -> [1, 2, 3] без повторов в порядке запроса."""
+    try:
+        ids = list(dict.fromkeys(int(item) for item in value.split(",") if item.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IDS_PER_REQUEST} ids per request")
+    return ids
+
+
+def ids_param(
+    ids: str = Query(..., description=f"id через запятую, не больше {MAX_IDS_PER_REQUEST}")
+) -> List[int]:
+    return parse_ids(ids)
+
+
+def optional_ids_param(
+    ids: Optional[str] = Query(None, description=f"id через запятую, не больше {MAX_IDS_PER_REQUEST}")
+) -> Optional[List[int]]:
+    """Выборка по id вместо страницы списка."""
+    return parse_ids(ids) if ids is not None else None
+
+
+class Page(list):
+    """Список строк страницы; курсоры соседних страниц — в атрибутах."""
+
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def _cursor_for(row, backwards: bool = False) -> str:
+    return encode_cursor(row.created_at, row.id, backwards)
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    model,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Cursor] = None,
+    columns: bool = False
+) -> Page:
+    """Выполняет query с детерминированным порядком (created_at, id).
+
+    Без курсора работает legacy-режим offset/limit; с курсором — keyset,
+    стоимость которого не зависит от глубины страницы. columns=True — query
+    выбирает колонки (в т.ч. created_at и id), и страница состоит из Row.
+    """
+    fetch = db.execute if columns else db.scalars
+    order = (model.created_at, model.id)
+    if limit <= 0:
+        return Page()
+
+    if cursor is None:
+        rows = (await fetch(query.order_by(*order).offset(skip).limit(limit + 1))).all()
+        page = Page(rows[:limit])
+        if len(rows) > limit:
+            page.next_cursor = _cursor_for(page[-1])
+        if skip > 0 and page:
+            page.prev_cursor = _cursor_for(page[0], backwards=True)
+        return page
+
+    key = tuple_(*order)
+    position = (cursor.created_at, cursor.id)
+    if cursor.backwards:
+        query = query.where(key < position).order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.where(key > position).order_by(*order)
+    rows = (await fetch(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if cursor.backwards:
+        page = Page(reversed(rows))
+        if page:
+            page.next_cursor = _cursor_for(page[-1])
+            if has_more:
+                page.prev_cursor = _cursor_for(page[0], backwards=True)
+    else:
+        page = Page(rows)
+        if page:
+            page.prev_cursor = _cursor_for(page[0], backwards=True)
+            if has_more:
+                page.next_cursor = _cursor_for(page[-1])
+    return page
+
+
+def stream_page(
+    db: AsyncSession,
+    query,
+    model,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Cursor] = None,
+    batch_size: Optional[int] = None
+):
+    """Та же страница, что у paginate, но пачками строк из серверного курсора (yield_per).
+
+    Поддерживается только движение вперёд; курсоры соседних страниц не вычисляются.
+    """
+    if cursor is not None and cursor.backwards:
+        raise ValueError("Backward cursors are not supported for streaming")
+    if cursor is None:
+        query = query.offset(skip)
+    else:
+        query = query.where(tuple_(model.created_at, model.id) > (cursor.created_at, cursor.id))
+    query = query.order_by(model.created_at, model.id).limit(max(limit, 0))
+    batch_size = batch_size or STREAM_BATCH_SIZE
+
+    async def partitions():
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+
+    return partitions()
+
+
+def set_pagination_headers(request: Request, response: Response, page: Page):
+    """Отдаёт курсоры в X-Next-Cursor / X-Prev-Cursor и в заголовке Link."""
+    links = []
+    for rel, token, header in (
+        ("next", page.next_cursor, "X-Next-Cursor"),
+        ("prev", page.prev_cursor, "X-Prev-Cursor"),
+    ):
+        if token:
+            response.headers[header] = token
+            url = request.url.remove_query_params("skip").include_query_params(cursor=token)
+            links.append(f'<{url}>; rel="{rel}"')
+    if links:
+        response.headers["Link"] = ", ".join(links)
@@ -0,0 +1,104 @@
+# app/password_hasher.py
+# bcrypt в отдельном пуле процессов: хэширование не занимает event loop и потоки
+# AnyIO, а при переполнении очереди запросы получают отказ (429), а не ждут.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from app import metrics
+from app.auth import get_password_hash, verify_and_update_password
+
+# 0 — без отдельных процессов (хэширование в пуле потоков)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Сколько операций может ждать свободного процесса сверх числа процессов
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+HASH_DURATION = metrics.histogram(
+    "password_hash_duration_seconds",
+    "Время операции bcrypt, включая ожидание в очереди",
+    labelnames=("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HASH_REJECTED = metrics.counter(
+    "password_hash_rejected_total",
+    "Операции bcrypt, отклонённые из-за переполнения очереди",
+    labelnames=("operation",),
+)
+HASH_REHASHED = metrics.counter(
+    "password_rehash_total",
+    "Хэши паролей, пересчитанные под текущие параметры при входе",
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хэширования заполнена."""
+
+    retry_after = PASSWORD_HASH_RETRY_AFTER
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE):
+        self.workers = workers
+        self.capacity = max(workers, 1) + max(queue_size, 0)
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Optional[Executor]:
+        # Пул создаётся лениво: после fork воркеров сервера, а не до него
+        if self.workers > 0 and self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                HASH_REJECTED.labels(operation).inc()
+                raise PasswordHasherBusy()
+            self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            HASH_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Проверяет пароль; второй элемент — новый хэш, если старый устарел."""
+        valid, new_hash = await self._run("verify", verify_and_update_password, password, hashed_password)
+        if valid and new_hash:
+            HASH_REHASHED.inc()
+        return valid, new_hash
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
+metrics.gauge(
+    "password_hash_in_flight", "Операции bcrypt в работе и в очереди",
+    callback=lambda: {(): password_hasher.in_flight},
+)
+metrics.gauge(
+    "password_hash_capacity", "Максимум операций bcrypt в работе и в очереди",
+    callback=lambda: {(): password_hasher.capacity},
+)
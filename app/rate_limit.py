@@ -0,0 +1,274 @@
+# app/rate_limit.py
+# Ограничение частоты запросов: token bucket по IP, пользователю или маршруту.
+#
+# Правило (RateLimit) состоит из одного или нескольких лимитов вида «N за период»:
+# короткий период задаёт всплеск, длинный — устойчивую скорость. Каждый лимит — ведро
+# ёмкостью N, которое пополняется со скоростью N/период; запрос проходит, только если
+# токенов хватает во всех вёдрах. Правила подключаются в роутерах как зависимости,
+# заголовки RateLimit-* добавляет RateLimitHeadersMiddleware.
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app import metrics
+from app.auth import principal_cache
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# За прокси (Render) адрес клиента — первый в X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+# Переопределения лимитов правил, например:
+# RATE_LIMITS="auth:login=5/minute,30/hour;games:search=2/second"
+RATE_LIMIT_OVERRIDES = {
+    name.strip(): spec.strip()
+    for name, _, spec in (item.partition("=") for item in os.getenv("RATE_LIMITS", "").split(";"))
+    if name.strip() and spec.strip()
+}
+
+RATE_LIMITED = metrics.counter(
+    "rate_limit_rejected_total", "Запросы, отклонённые ограничением частоты", labelnames=("rule",)
+)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+
+@dataclass(frozen=True)
+class Limit:
+    count: int
+    period: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """"10/second", "100/minute", "1000/5minutes" -> Limit."""
+        match = _LIMIT_RE.match(spec)
+        if not match:
+            raise ValueError(f"Invalid rate limit: {spec!r}")
+        count, multiplier, unit = match.groups()
+        return cls(int(count), PERIODS[unit] * int(multiplier or 1))
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.period
+
+    def __str__(self):
+        return f"{self.count};w={int(self.period)}"
+
+
+def parse_limits(specs) -> Tuple[Limit, ...]:
+    if isinstance(specs, str):
+        specs = specs.split(",")
+    return tuple(Limit.parse(spec) for spec in specs)
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int  # ёмкость самого строгого ведра
+    remaining: int
+    reset: float  # секунд до полного пополнения самого строгого ведра
+    retry_after: float  # секунд до возможности повторить (0, если разрешено)
+
+
+class InMemoryStore:
+    """Вёдра в словаре процесса: ключ -> [токены, время] по каждому лимиту.
+
+    Словарь упорядочен по последнему обращению: вытеснение снимает вёдра с начала.
+
+    Общий бэкенд (например, Redis со скриптом на Lua) реализует тот же метод hit().
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limits: Sequence[Limit], cost: float = 1.0) -> Decision:
+        now = self._clock()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict()
+                # Плоский список [токены_0, время_0, токены_1, время_1, ...]
+                state = self._buckets[key] = [value for limit in limits for value in (limit.count, now)]
+            else:
+                self._buckets.move_to_end(key)
+            levels = []
+            allowed = True
+            for i, limit in enumerate(limits):
+                tokens = min(limit.count, state[2 * i] + (now - state[2 * i + 1]) * limit.rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    allowed = False
+            retry_after = 0.0
+            for i, limit in enumerate(limits):
+                if allowed:
+                    levels[i] -= cost
+                elif levels[i] < cost:
+                    retry_after = max(retry_after, (cost - levels[i]) / limit.rate)
+                state[2 * i] = levels[i]
+                state[2 * i + 1] = now
+
+        strictest = 0
+        for i in range(1, len(limits)):
+            if levels[i] * limits[strictest].count < levels[strictest] * limits[i].count:
+                strictest = i
+        limit = limits[strictest]
+        return Decision(
+            allowed=allowed,
+            limit=limit.count,
+            remaining=max(int(levels[strictest]), 0),
+            reset=(limit.count - levels[strictest]) / limit.rate,
+            retry_after=retry_after,
+        )
+
+    def _evict(self):
+        # Удаляем десятую часть давно не использованных вёдер: простоявшее ведро уже
+        # пополнилось, и забыть его — то же, что создать заново полным
+        for _ in range(max(len(self._buckets) // 10, 1)):
+            self._buckets.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimiter:
+    def __init__(self, store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.store = store if store is not None else InMemoryStore()
+        self.enabled = enabled
+
+    def set_backend(self, store):
+        self.store = store
+
+    def reset(self):
+        self.store.clear()
+
+
+rate_limiter = RateLimiter()
+
+
+# ---------- ключи ----------
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _user_or_ip(request: Request) -> str:
+    # Пользователь известен только по уже проверенному токену (кэш principal): непроверенный
+    # токен не должен давать отдельное ведро, иначе лимит обходится случайными токенами
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        principal = principal_cache.get(authorization[7:])
+        if principal is not None:
+            return f"user:{principal.id}"
+    return f"ip:{client_ip(request)}"
+
+
+KEY_FUNCTIONS: Dict[str, Callable[[Request], str]] = {
+    "ip": lambda request: f"ip:{client_ip(request)}",
+    "user": _user_or_ip,
+    "route": lambda request: "route",
+}
+
+
+# ---------- правило ----------
+class RateLimit:
+    """Зависимость FastAPI: Depends(RateLimit("games:search", "5/second", "100/minute", key="user")).
+
+    cost(request) — стоимость запроса в токенах (например, по limit страницы);
+    when(request) — применять ли правило к запросу.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *limits: str,
+        key: str = "ip",
+        cost: Optional[Callable[[Request], float]] = None,
+        when: Optional[Callable[[Request], bool]] = None,
+        limiter: RateLimiter = rate_limiter,
+    ):
+        if key not in KEY_FUNCTIONS:
+            raise ValueError(f"Unknown rate limit key: {key}")
+        self.name = name
+        self.limits = parse_limits(RATE_LIMIT_OVERRIDES.get(name, ",".join(limits)))
+        self.policy = ", ".join(str(limit) for limit in self.limits)
+        # Дороже ёмкости самого маленького ведра запрос не бывает: иначе он не прошёл бы никогда
+        self.max_cost = float(min(limit.count for limit in self.limits))
+        self.key = KEY_FUNCTIONS[key]
+        self.cost = cost
+        self.when = when
+        self.limiter = limiter
+
+    async def __call__(self, request: Request):
+        if not self.limiter.enabled or (self.when is not None and not self.when(request)):
+            return
+        cost = min(self.cost(request), self.max_cost) if self.cost is not None else 1.0
+        decision = self.limiter.store.hit(f"{self.name}|{self.key(request)}", self.limits, cost)
+        headers = {
+            "RateLimit-Limit": str(decision.limit),
+            "RateLimit-Remaining": str(decision.remaining),
+            "RateLimit-Reset": str(math.ceil(decision.reset)),
+            "RateLimit-Policy": self.policy,
+        }
+        if not decision.allowed:
+            RATE_LIMITED.labels(self.name).inc()
+            headers["Retry-After"] = str(max(math.ceil(decision.retry_after), 1))
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests", headers=headers)
+        # Заголовки успешного ответа добавит middleware (ответ может быть готовым Response)
+        previous = getattr(request.state, "rate_limit", None)
+        if previous is None or decision.remaining / decision.limit < int(previous["RateLimit-Remaining"]) / int(previous["RateLimit-Limit"]):
+            request.state.rate_limit = headers
+
+
+def page_cost(default_limit: int = 100, page: int = 100) -> Callable[[Request], float]:
+    """Стоимость списка: токен за каждые `page` запрошенных строк (не меньше одного)."""
+    def cost(request: Request) -> float:
+        try:
+            limit = int(request.query_params.get("limit", default_limit))
+        except ValueError:
+            limit = default_limit
+        return max(1.0, math.ceil(max(limit, 0) / page))
+    return cost
+
+
+class RateLimitHeadersMiddleware:
+    """Добавляет RateLimit-* к ответам запросов, прошедших правила."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit")
+                if headers:
+                    existing = {name.lower() for name, _ in message.get("headers", [])}
+                    extra = [
+                        (name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in headers.items() if name.lower().encode("latin-1") not in existing
+                    ]
+                    message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,328 @@
+# app/recommendations.py
+# Рекомендации «тем, кто высоко оценил эту игру, понравились также…».
+#
+# Модель — item-item сходство по скорректированному косинусу: оценка пользователя
+# центрируется на его средней, сходство игр g и h — сумма произведений центрированных
+# оценок общих пользователей, делённая на нормы игр. Процесс хранит только списки top-k
+# соседей каждой игры (O(игры × k)); оценки пользователя для персональных рекомендаций
+# читаются из БД на запрос.
+#
+# Списки строятся пакетно — командой python -m app.cli build-recommendations или один раз
+# в мастере gunicorn — и сохраняются в снимок RECOMMENDATIONS_PATH вместе с позицией
+# outbox. Сборка инкрементальна: по событиям после позиции снимка пересчитываются только
+# строки игр, оценённых затронутыми пользователями, и строки, где эти игры стоят соседями.
+# Воркер при старте загружает снимок, догоняет журнал и дальше обновляет строки по событиям.
+# Игра, которая могла бы войти в чужой список только из-за изменения своей нормы, попадёт
+# туда при полной перестройке (--full).
+import heapq
+import json
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, events, models
+from app.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+RECOMMEND_NEIGHBORS = int(os.getenv("RECOMMEND_NEIGHBORS", "20"))
+RECOMMENDATIONS_PATH = os.getenv("RECOMMENDATIONS_PATH", "./recommendations.json")
+# Середина шкалы 1-10: от неё центрируются оценки пользователя с единственным обзором
+NEUTRAL_RATING = 5.5
+_EPSILON = 1e-9
+
+Row = List[Tuple[int, float]]
+
+
+def centered_ratings(ratings: Dict[int, Dict[int, int]]) -> Dict[int, Dict[int, float]]:
+    """{user_id: {game_id: rating}} -> те же оценки минус средняя пользователя."""
+    centered = {}
+    for user_id, user_ratings in ratings.items():
+        mean = sum(user_ratings.values()) / len(user_ratings)
+        centered[user_id] = {game_id: rating - mean for game_id, rating in user_ratings.items()}
+    return centered
+
+
+def neighbor_rows(
+    game_ids: Iterable[int],
+    centered: Dict[int, Dict[int, float]],
+    norms: Dict[int, float],
+    neighbors: int = RECOMMEND_NEIGHBORS,
+) -> Dict[int, Row]:
+    """Top-k соседей данных игр с положительным сходством: {game_id: [(other_id, score)]}.
+
+    centered должен содержать всех пользователей, оценивших эти игры, а norms — квадраты
+    норм всех игр, которые эти пользователи оценили.
+    """
+    game_ids = set(game_ids)
+    raters: Dict[int, List[int]] = {}
+    for user_id, values in centered.items():
+        for game_id in values:
+            if game_id in game_ids:
+                raters.setdefault(game_id, []).append(user_id)
+
+    rows = {}
+    for game_id in game_ids:
+        norm = norms.get(game_id, 0.0)
+        dots: Dict[int, float] = {}
+        if norm > _EPSILON:
+            for user_id in raters.get(game_id, ()):
+                values = centered[user_id]
+                value = values[game_id]
+                for other_id, other_value in values.items():
+                    if other_id != game_id:
+                        dots[other_id] = dots.get(other_id, 0.0) + value * other_value
+        scored = (
+            (other_id, dot / math.sqrt(norm * norms[other_id]))
+            for other_id, dot in dots.items()
+            if dot > _EPSILON and norms.get(other_id, 0.0) > _EPSILON
+        )
+        rows[game_id] = [
+            (other_id, round(score, 6))
+            for other_id, score in heapq.nlargest(neighbors, scored, key=lambda item: (item[1], -item[0]))
+        ]
+    return rows
+
+
+class ItemSimilarity:
+    """Списки top-k соседей игр и позиция outbox, до которой они актуальны (meta)."""
+
+    def __init__(self, neighbors: int = RECOMMEND_NEIGHBORS):
+        self.neighbors = neighbors
+        self.clear()
+
+    def clear(self):
+        self._top: Dict[int, Row] = {}
+        self.meta: Dict[str, object] = {}
+
+    def update(self, rows: Dict[int, Row]):
+        for game_id, row in rows.items():
+            if row:
+                self._top[game_id] = row
+            else:
+                self._top.pop(game_id, None)
+
+    def referencing(self, game_ids: Set[int]) -> Set[int]:
+        """Игры, в списках которых стоит хотя бы одна из game_ids."""
+        return {
+            game_id for game_id, row in self._top.items()
+            if any(other_id in game_ids for other_id, _ in row)
+        }
+
+    # ---------- чтение ----------
+    def similar(self, game_id: int, limit: Optional[int] = None) -> Row:
+        """Top-k соседей игры: [(game_id, score)] по убыванию сходства."""
+        top = self._top.get(game_id, [])
+        return top[:limit] if limit is not None else top
+
+    def recommend(self, ratings: Dict[int, int], limit: int = 10) -> Row:
+        """Игры, похожие на понравившиеся пользователю (оценённые выше его средней)."""
+        if not ratings:
+            return []
+        mean = sum(ratings.values()) / len(ratings) if len(ratings) > 1 else NEUTRAL_RATING
+        scores: Dict[int, float] = {}
+        for game_id, rating in ratings.items():
+            weight = rating - mean
+            if weight <= 0:
+                continue
+            for other_id, similarity in self.similar(game_id):
+                if other_id not in ratings:
+                    scores[other_id] = scores.get(other_id, 0.0) + weight * similarity
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def __len__(self):
+        return len(self._top)
+
+    # ---------- снимок ----------
+    def save(self, path: str):
+        payload = {
+            "meta": {**self.meta, "neighbors": self.neighbors},
+            "games": {str(game_id): row for game_id, row in self._top.items()},
+        }
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as fh:
+            payload = json.load(fh)
+        if payload.get("meta", {}).get("neighbors") != self.neighbors:
+            raise ValueError(f"{path}: built for a different RECOMMEND_NEIGHBORS")
+        self._top = {
+            int(game_id): [(other_id, score) for other_id, score in row]
+            for game_id, row in payload["games"].items()
+        }
+        self.meta = dict(payload["meta"])
+
+
+item_similarity = ItemSimilarity()
+
+
+async def with_games(db: AsyncSession, scored: Row) -> List[dict]:
+    """[(game_id, score)] -> [{"score", "game"}] одним запросом; порядок сохраняется."""
+    games = await crud.get_games_by_ids(db, [game_id for game_id, _ in scored])
+    return [{"score": round(score, 4), "game": games[game_id]} for game_id, score in scored if game_id in games]
+
+
+# ---------- загрузка из БД ----------
+def _ratings_query():
+    # Только обзоры существующих игр: у удалённой игры могли остаться строки
+    return (
+        select(models.Review.user_id, models.Review.game_id, models.Review.rating)
+        .join(models.Game, models.Game.id == models.Review.game_id)
+        .where(models.Review.user_id.isnot(None))
+    )
+
+
+async def _load_ratings(db: AsyncSession, condition=None) -> Dict[int, Dict[int, int]]:
+    query = _ratings_query()
+    if condition is not None:
+        query = query.where(condition)
+    ratings: Dict[int, Dict[int, int]] = {}
+    result = await db.stream(query.execution_options(yield_per=1000))
+    async for user_id, game_id, rating in result:
+        ratings.setdefault(user_id, {})[game_id] = rating
+    return ratings
+
+
+async def user_ratings(db: AsyncSession, user_id: int) -> Dict[int, int]:
+    return (await _load_ratings(db, models.Review.user_id == user_id)).get(user_id, {})
+
+
+async def _norms(db: AsyncSession, game_ids: Set[int]) -> Dict[int, float]:
+    """Квадраты норм центрированных оценок игр — по всем их игрокам, одним запросом."""
+    if not game_ids:
+        return {}
+    review = models.Review
+    raters = select(review.user_id).where(review.game_id.in_(game_ids))
+    ratings = _ratings_query().where(review.user_id.in_(raters)).subquery()
+    means = (
+        select(ratings.c.user_id, func.avg(ratings.c.rating).label("mean"))
+        .group_by(ratings.c.user_id)
+        .subquery()
+    )
+    deviation = ratings.c.rating - means.c.mean
+    result = await db.execute(
+        select(ratings.c.game_id, func.sum(deviation * deviation))
+        .join(means, means.c.user_id == ratings.c.user_id)
+        .where(ratings.c.game_id.in_(game_ids))
+        .group_by(ratings.c.game_id)
+    )
+    return {game_id: float(norm or 0.0) for game_id, norm in result}
+
+
+async def build_from_db(db: AsyncSession, model: ItemSimilarity = item_similarity) -> ItemSimilarity:
+    """Полная сборка списков одним проходом по обзорам."""
+    position = await events.journal_position(db)
+    centered = centered_ratings(await _load_ratings(db))
+    norms: Dict[int, float] = {}
+    for values in centered.values():
+        for game_id, value in values.items():
+            norms[game_id] = norms.get(game_id, 0.0) + value * value
+    model.clear()
+    model.update(neighbor_rows(norms, centered, norms, model.neighbors))
+    model.meta = {"outbox_id": position}
+    return model
+
+
+async def refresh_games(db: AsyncSession, game_ids: Iterable[int], model: ItemSimilarity = item_similarity):
+    """Пересчитывает списки данных игр и списки, в которых они стоят соседями."""
+    dirty = set(game_ids)
+    if not dirty:
+        return
+    dirty |= model.referencing(dirty)
+    raters = select(models.Review.user_id).where(models.Review.game_id.in_(dirty))
+    centered = centered_ratings(await _load_ratings(db, models.Review.user_id.in_(raters)))
+    candidates = {game_id for values in centered.values() for game_id in values}
+    norms = await _norms(db, candidates | dirty)
+    model.update(neighbor_rows(dirty, centered, norms, model.neighbors))
+
+
+async def _affected_games(db: AsyncSession, batch: List[events.Event]) -> Set[int]:
+    # Изменение оценки сдвигает среднюю пользователя, а с ней — вклад во все его игры
+    game_ids, user_ids, whole_games = set(), set(), set()
+    for event in batch:
+        if isinstance(event, events.ReviewsImported):
+            game_ids.update(event.game_ids)
+            user_ids.update(event.user_ids)
+        elif isinstance(event, events.GameDeleted) or event.user_id is None:
+            game_ids.add(event.game_id)
+            whole_games.add(event.game_id)
+        else:
+            game_ids.add(event.game_id)
+            user_ids.add(event.user_id)
+    review = models.Review
+    conditions = []
+    if user_ids:
+        conditions.append(review.user_id.in_(user_ids))
+    if whole_games:
+        conditions.append(review.user_id.in_(select(review.user_id).where(review.game_id.in_(whole_games))))
+    if conditions:
+        game_ids.update((await db.scalars(select(review.game_id).where(or_(*conditions)).distinct())).all())
+    return game_ids
+
+
+_EVENT_TYPES = (
+    events.ReviewCreated, events.ReviewUpdated, events.ReviewDeleted, events.GameDeleted, events.ReviewsImported,
+)
+
+
+@event_bus.subscribe(*_EVENT_TYPES, name="recommendations")
+async def apply_events(db: AsyncSession, batch: List[events.Event], model: ItemSimilarity = item_similarity):
+    await refresh_games(db, await _affected_games(db, batch), model)
+
+
+async def catch_up(db: AsyncSession, model: ItemSimilarity = item_similarity) -> bool:
+    """Применяет события журнала после позиции снимка; False, если журнал их уже не содержит."""
+    async def handler(db, batch):
+        batch = [event for event in batch if isinstance(event, _EVENT_TYPES)]
+        if batch:
+            await apply_events(db, batch, model)
+
+    position = await events.replay(db, int(model.meta.get("outbox_id", 0)), handler)
+    if position is None:
+        return False
+    model.meta["outbox_id"] = position
+    return True
+
+
+async def _load_snapshot(db: AsyncSession, model: ItemSimilarity, path: Optional[str]) -> bool:
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        model.load(path)
+    except (ValueError, KeyError, OSError):
+        logger.warning("Recommendations snapshot %s is unreadable, rebuilding", path)
+        return False
+    if not await catch_up(db, model):
+        logger.warning("Outbox no longer covers recommendations snapshot %s, rebuilding", path)
+        return False
+    return True
+
+
+async def build_snapshot(
+    db: AsyncSession, path: str = RECOMMENDATIONS_PATH, full: bool = False, model: Optional[ItemSimilarity] = None
+) -> ItemSimilarity:
+    """Пакетная сборка: догоняет существующий снимок по журналу (или строит заново) и записывает его."""
+    model = model if model is not None else ItemSimilarity()
+    if full or not await _load_snapshot(db, model, path):
+        await build_from_db(db, model)
+    model.save(path)
+    return model
+
+
+async def init_recommendations(
+    db: AsyncSession, model: ItemSimilarity = item_similarity, path: Optional[str] = RECOMMENDATIONS_PATH
+) -> ItemSimilarity:
+    """При старте воркера: снимок + догон журнала; без пригодного снимка — сборка и запись."""
+    if await _load_snapshot(db, model, path):
+        return model
+    await build_from_db(db, model)
+    if path:
+        model.save(path)
+    return model
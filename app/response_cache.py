@@ -0,0 +1,243 @@
+# app/response_cache.py
+# Кэш ответов для GET-эндпоинтов чтения (ASGI middleware) со строгими ETag.
+#
+# Запись кэша помечается тегами ("game:5", "review:7"); инвалидация тега —
+# это увеличение его поколения, поэтому она O(1) и не требует обхода записей.
+# Запись с устаревшими поколениями тегов считается промахом.
+#
+# Поколения тоже хранятся в ограниченном TTLCache: тег, выпавший из него, при следующем
+# обращении получает новое поколение, поэтому записи со старым поколением становятся промахом.
+import hashlib
+import itertools
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+from app import database, metrics
+from app.cache import TTLCache
+from app.invalidation import invalidation_channel
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+CACHE_REQUESTS = metrics.counter(
+    "response_cache_requests_total",
+    "Запросы к кэшируемым эндпоинтам по результату (hit, miss, not_modified)",
+    labelnames=("result",),
+)
+
+# Кэшируемые пути и теги, от которых зависит ответ
+CACHE_RULES = [
+    (re.compile(r"^/api/games/(?P<game_id>\d+)$"), ("game:{game_id}", "game-counters:{game_id}")),
+    (re.compile(r"^/api/games/(?P<game_id>\d+)/reviews$"), ("game:{game_id}", "game-reviews:{game_id}")),
+    (re.compile(r"^/api/games/(?P<game_id>\d+)/stats$"), ("game:{game_id}", "game-stats:{game_id}")),
+    (re.compile(r"^/api/reviews/(?P<review_id>\d+)$"), ("review:{review_id}",)),
+]
+
+
+ALL_TAG = "*"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: Tuple[Tuple[bytes, bytes], ...]
+    body: bytes
+    etag: bytes
+    generations: Tuple[Tuple[str, int], ...]
+
+
+class InMemoryBackend:
+    """Хранилище в памяти процесса; общий бэкенд (например, Redis) реализует те же методы."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = TTLCache(max_size=max_entries, ttl=ttl)
+        # Запись зависит от нескольких тегов; поколение живёт дольше записей, чтобы не
+        # сбрасывать их раньше срока без нужды
+        self._generations = TTLCache(max_size=max_entries * 4, ttl=ttl * 10)
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: CachedResponse):
+        self._entries.set(key, entry)
+
+    def generation(self, tag: str) -> int:
+        generation = self._generations.get(tag)
+        if generation is None:
+            with self._lock:
+                generation = self._generations.get(tag)
+                if generation is None:
+                    generation = next(self._counter)
+                    self._generations.set(tag, generation)
+        return generation
+
+    def bump(self, tag: str):
+        with self._lock:
+            self._generations.set(tag, next(self._counter))
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ResponseCache:
+    def __init__(self, backend=None, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.backend = backend or InMemoryBackend()
+        self.enabled = enabled
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def tags_for(self, path: str) -> Optional[List[str]]:
+        for pattern, tags in CACHE_RULES:
+            match = pattern.match(path)
+            if match:
+                return [tag.format(**match.groupdict()) for tag in tags]
+        return None
+
+    def generations(self, tags: List[str]) -> Tuple[Tuple[str, int], ...]:
+        # Общий тег ALL_TAG входит в каждую запись: его сдвиг устаревает весь кэш
+        return tuple((tag, self.backend.generation(tag)) for tag in (ALL_TAG, *tags))
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        if any(self.backend.generation(tag) != generation for tag, generation in entry.generations):
+            return None
+        return entry
+
+    def invalidate(self, *tags: str):
+        for tag in tags:
+            self.backend.bump(tag)
+
+    def clear(self):
+        # Сдвиг общего поколения отбрасывает и ответы, которые сейчас формируются со старыми поколениями
+        self.backend.bump(ALL_TAG)
+        self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+# ========== Инвалидация из путей записи (app/crud.py) ==========
+# Сбрасывает кэш этого воркера и рассылает те же теги остальным (app/invalidation.py)
+def invalidate_tags(*tags: str):
+    response_cache.invalidate(*tags)
+    invalidation_channel.publish("tags", *tags)
+
+
+def invalidate_game(game_id: int):
+    invalidate_tags(f"game:{game_id}")
+
+
+def invalidate_review(review_id: int, game_id: Optional[int]):
+    tags = [f"review:{review_id}"]
+    if game_id is not None:
+        # Счётчики обзоров и комментариев игры входят в GameResponse
+        tags += [f"game-reviews:{game_id}", f"game-stats:{game_id}", f"game-counters:{game_id}"]
+    invalidate_tags(*tags)
+
+
+def invalidate_all():
+    response_cache.clear()
+    invalidation_channel.publish("clear")
+
+
+@invalidation_channel.handler("tags")
+def _apply_tags(*tags: str):
+    response_cache.invalidate(*tags)
+
+
+@invalidation_channel.on_resync
+@invalidation_channel.handler("clear")
+def _apply_clear():
+    response_cache.clear()
+
+
+# ========== Middleware ==========
+def _etag(body: bytes) -> bytes:
+    return b'"' + hashlib.sha256(body).hexdigest()[:32].encode() + b'"'
+
+
+def _etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(b",")]
+    return b"*" in candidates or etag in candidates
+
+
+class ResponseCacheMiddleware:
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.cache.enabled:
+            await self.app(scope, receive, send)
+            return
+        tags = self.cache.tags_for(scope["path"])
+        if tags is None or (
+            database.replicas.enabled and database.is_sticky(database.requester_key(Request(scope)))
+        ):
+            # Клиент, только что записавший данные, читает мимо кэша (read-your-writes)
+            await self.app(scope, receive, send)
+            return
+
+        query = "&".join(sorted(scope.get("query_string", b"").decode("latin-1").split("&")))
+        key = f"{scope['path']}?{query}"
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            result = "not_modified" if _etag_matches(if_none_match, entry.etag) else "hit"
+            CACHE_REQUESTS.labels(result).inc()
+            await self._send_entry(send, entry, not_modified=result == "not_modified")
+            return
+
+        CACHE_REQUESTS.labels("miss").inc()
+        # Поколения фиксируем до обработки: запись, пришедшая во время запроса, сделает ответ промахом
+        generations = self.cache.generations(tags)
+        start_message, chunks = None, []
+
+        async def capture(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = tuple(
+            (name, value) for name, value in start_message.get("headers", [])
+            if name.lower() not in (b"content-length", b"etag", b"cache-control")
+        )
+        entry = CachedResponse(start_message["status"], headers, body, _etag(body), generations)
+        # Ответ отстающей реплики лёг бы в кэш под новыми поколениями тегов
+        from_replica = scope.get("state", {}).get("read_target") == "replica"
+        if entry.status == 200 and not from_replica:
+            self.cache.backend.set(key, entry)
+        await self._send_entry(
+            send, entry, not_modified=entry.status == 200 and _etag_matches(if_none_match, entry.etag)
+        )
+
+    async def _send_entry(self, send, entry: CachedResponse, not_modified: bool = False):
+        headers = list(entry.headers)
+        if entry.status == 200:
+            headers += [(b"etag", entry.etag), (b"cache-control", b"no-cache")]
+        if not_modified:
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers.append((b"content-length", str(len(entry.body)).encode()))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,521 @@
+# app/review_index.py
+# Инвертированный индекс текста обзоров и комментариев (BM25) в памяти процесса.
+#
+# Индекс состоит из неизменяемого сегмента на диске (читается через mmap, постинги
+# разбираются лениво при запросе) и изменений поверх него: новые/изменённые документы
+# хранятся в словарях, удалённые документы сегмента — в множестве deleted.
+# save() сливает всё в новый сегмент и атомарно подменяет файл; под блокировкой
+# берётся только копия словарей, сам сегмент пишется по одному термину без неё.
+#
+# Снимок хранит позицию outbox, до которой он актуален: при старте индекс догоняет БД
+# событиями после неё (новые, изменённые и удалённые обзоры и комментарии). Воркер
+# пересохраняет снимок раз в REVIEW_INDEX_SAVE_SECONDS и при остановке.
+import asyncio
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import events, models
+from app.events import event_bus
+
+logger = logging.getLogger(__name__)
+
+REVIEW_INDEX_PATH = os.getenv("REVIEW_INDEX_PATH", "./review_index.bin")
+# Как часто воркер сливает изменения индекса в снимок; 0 — только при остановке
+REVIEW_INDEX_SAVE_SECONDS = float(os.getenv("REVIEW_INDEX_SAVE_SECONDS", "600"))
+
+MAGIC = b"RVIX1\n"
+_HEADER_LEN = struct.Struct("<Q")
+_POSTING = struct.Struct("<II")
+
+K1 = 1.2
+B = 0.75
+
+REVIEW = "review"
+COMMENT = "comment"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall((text or "").lower()) if len(token) > 1]
+
+
+@dataclass(frozen=True)
+class Document:
+    kind: str
+    id: int
+    review_id: int
+    length: int
+
+
+@dataclass(frozen=True)
+class Hit:
+    kind: str
+    id: int
+    review_id: int
+    score: float
+
+
+class _Segment:
+    """Сегмент на диске: заголовок JSON (документы и словарь) + блок постингов."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a review index file")
+        (header_len,) = _HEADER_LEN.unpack_from(self._mm, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(self._mm[header_start:header_start + header_len])
+        self.docs = [Document(*doc) for doc in header["docs"]]
+        self.terms: Dict[str, Tuple[int, int]] = {term: tuple(entry) for term, entry in header["terms"].items()}
+        self.meta = header.get("meta", {})
+        self._postings_start = header_start + header_len
+
+    def postings(self, term: str) -> Iterator[Tuple[int, int]]:
+        entry = self.terms.get(term)
+        if entry is None:
+            return iter(())
+        offset, count = entry
+        start = self._postings_start + offset * _POSTING.size
+        return _POSTING.iter_unpack(self._mm[start:start + count * _POSTING.size])
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class ReviewIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._journal: Optional[list] = None     # изменения во время compact()
+        self._pinned: Optional[_Segment] = None   # сегмент, который сейчас читает compact()
+        self._epoch = 0                            # растёт при каждой load()/clear()
+        self._reset()
+
+    def _reset(self):
+        self._segment: Optional[_Segment] = None
+        self._deleted: Set[int] = set()          # позиции документов сегмента
+        self._segment_keys: Dict[Tuple[str, int], int] = {}
+        self._docs: Dict[Tuple[str, int], Document] = {}
+        self._terms: Dict[Tuple[str, int], Counter] = {}
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._doc_count = 0
+        self._total_length = 0
+        self.meta: Dict[str, object] = {}
+        self.changes = 0                         # изменений после загрузки снимка
+
+    # ---------- изменения ----------
+    def add(self, kind: str, id: int, review_id: int, text: str):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._add(kind, id, review_id, terms)
+            self.changes += 1
+            if self._journal is not None:
+                self._journal.append((kind, id, review_id, terms))
+
+    def remove(self, kind: str, id: int):
+        with self._lock:
+            self._remove((kind, id))
+            self.changes += 1
+            if self._journal is not None:
+                self._journal.append((kind, id, None, None))
+
+    def _add(self, kind: str, id: int, review_id: int, terms: Counter):
+        key = (kind, id)
+        self._remove(key)
+        document = Document(kind, id, review_id, sum(terms.values()))
+        self._docs[key] = document
+        self._terms[key] = terms
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[key] = tf
+        self._doc_count += 1
+        self._total_length += document.length
+
+    def _remove(self, key: Tuple[str, int]):
+        position = self._segment_keys.pop(key, None)
+        if position is not None:
+            self._deleted.add(position)
+            self._doc_count -= 1
+            self._total_length -= self._segment.docs[position].length
+            return
+        document = self._docs.pop(key, None)
+        if document is None:
+            return
+        for term in self._terms.pop(key):
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+        self._doc_count -= 1
+        self._total_length -= document.length
+
+    def index_review(self, review):
+        self.add(REVIEW, review.id, review.id, review.content)
+
+    def index_comment(self, comment):
+        self.add(COMMENT, comment.id, comment.review_id, comment.content)
+
+    def __len__(self):
+        return self._doc_count
+
+    # ---------- поиск ----------
+    def search(self, query: str, limit: int = 20) -> List[Hit]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            if not self._doc_count:
+                return []
+            avgdl = self._total_length / self._doc_count
+            scores: Dict[object, float] = {}
+            for term in terms:
+                matches = list(self._matches(term))
+                if not matches:
+                    continue
+                df = len(matches)
+                idf = math.log(1 + (self._doc_count - df + 0.5) / (df + 0.5))
+                for ref, document, tf in matches:
+                    norm = tf + K1 * (1 - B + B * document.length / avgdl)
+                    scores[ref] = scores.get(ref, 0.0) + idf * tf * (K1 + 1) / norm
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [
+                Hit(document.kind, document.id, document.review_id, round(score, 6))
+                for document, score in ((self._document(ref), score) for ref, score in best)
+            ]
+
+    def _matches(self, term: str) -> Iterator[Tuple[object, Document, int]]:
+        if self._segment is not None:
+            for position, tf in self._segment.postings(term):
+                if position not in self._deleted:
+                    yield position, self._segment.docs[position], tf
+        for key, tf in self._postings.get(term, {}).items():
+            yield key, self._docs[key], tf
+
+    def _document(self, ref) -> Document:
+        if isinstance(ref, int):
+            return self._segment.docs[ref]
+        return self._docs[ref]
+
+    # ---------- сохранение и загрузка ----------
+    def _snapshot(self):
+        """Копия состояния для записи сегмента вне блокировки (вызывается под ней).
+
+        Сегмент неизменяем, а словари документов и их терминов при изменениях
+        не правятся на месте, а подменяются, поэтому достаточно поверхностных копий.
+        """
+        return self._segment, set(self._deleted), dict(self._docs), dict(self._terms)
+
+    @staticmethod
+    def _write(path: str, snapshot, meta: Dict[str, object]):
+        """Пишет сегмент из снимка состояния: постинги — по одному термину, без копии индекса в памяти."""
+        segment, deleted, mem_docs, mem_terms = snapshot
+        docs, positions = [], {}
+        if segment is not None:
+            for position, document in enumerate(segment.docs):
+                if position not in deleted:
+                    positions[position] = len(docs)
+                    docs.append([document.kind, document.id, document.review_id, document.length])
+        mem_postings: Dict[str, List[Tuple[int, int]]] = {}
+        for key, document in mem_docs.items():
+            for term, tf in mem_terms[key].items():
+                mem_postings.setdefault(term, []).append((len(docs), tf))
+            docs.append([document.kind, document.id, document.review_id, document.length])
+
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        postings_path = f"{tmp_path}.postings"
+        terms = set(mem_postings)
+        if segment is not None:
+            terms.update(segment.terms)
+        term_table, offset = {}, 0
+        try:
+            with open(postings_path, "wb") as fh:
+                for term in sorted(terms):
+                    entries = [
+                        (positions[position], tf)
+                        for position, tf in (segment.postings(term) if segment is not None else ())
+                        if position in positions
+                    ]
+                    entries.extend(mem_postings.get(term, ()))
+                    if not entries:
+                        continue
+                    term_table[term] = [offset, len(entries)]
+                    fh.write(b"".join(_POSTING.pack(position, tf) for position, tf in entries))
+                    offset += len(entries)
+
+            header = json.dumps(
+                {"docs": docs, "terms": term_table, "meta": meta}, separators=(",", ":")
+            ).encode()
+            with open(tmp_path, "wb") as fh, open(postings_path, "rb") as postings:
+                fh.write(MAGIC)
+                fh.write(_HEADER_LEN.pack(len(header)))
+                fh.write(header)
+                shutil.copyfileobj(postings, fh)
+            os.replace(tmp_path, path)
+        finally:
+            for leftover in (postings_path, tmp_path):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    def save(self, path: str, meta: Optional[Dict[str, object]] = None):
+        with self._lock:
+            self.meta = dict(meta if meta is not None else self.meta)
+            snapshot, meta = self._snapshot(), self.meta
+        self._write(path, snapshot, meta)
+
+    @staticmethod
+    def _open(path: str):
+        segment = _Segment(path)
+        return segment, {(doc.kind, doc.id): position for position, doc in enumerate(segment.docs)}
+
+    def _release(self):
+        # Сегмент, из которого compact() пишет новый, закроет сам compact()
+        if self._segment is not None and self._segment is not self._pinned:
+            self._segment.close()
+
+    def _install(self, segment: _Segment, keys: Dict[Tuple[str, int], int]):
+        self._release()
+        self._reset()
+        self._epoch += 1
+        self._segment = segment
+        self._segment_keys = keys
+        self._doc_count = len(segment.docs)
+        self._total_length = sum(doc.length for doc in segment.docs)
+        self.meta = dict(segment.meta)
+
+    def load(self, path: str):
+        """Подменяет содержимое индекса сегментом из файла (через mmap)."""
+        segment, keys = self._open(path)
+        with self._lock:
+            self._install(segment, keys)
+
+    def compact(self, path: str, meta: Optional[Dict[str, object]] = None):
+        """Переносит изменения из словарей в новый сегмент.
+
+        Блокировка индекса берётся дважды и ненадолго: чтобы снять копию состояния
+        и чтобы подменить сегмент, применив поверх него изменения, сделанные за время записи.
+        """
+        with self._compact_lock:
+            with self._lock:
+                self.meta = dict(meta if meta is not None else self.meta)
+                snapshot, meta, epoch = self._snapshot(), self.meta, self._epoch
+                self._journal, self._pinned = [], snapshot[0]
+            try:
+                self._write(path, snapshot, meta)
+                segment, keys = self._open(path)
+            except BaseException:
+                with self._lock:
+                    self._journal = self._pinned = None
+                    if snapshot[0] is not None and snapshot[0] is not self._segment:
+                        snapshot[0].close()
+                raise
+            with self._lock:
+                journal, self._journal, self._pinned = self._journal, None, None
+                if self._epoch != epoch:
+                    # Индекс перезагрузили или очистили во время записи: новое состояние важнее
+                    segment.close()
+                    if snapshot[0] is not None:
+                        snapshot[0].close()
+                    return
+                self._install(segment, keys)
+                for kind, id, review_id, terms in journal:
+                    if terms is None:
+                        self._remove((kind, id))
+                    else:
+                        self._add(kind, id, review_id, terms)
+                self.changes = len(journal)
+
+    def clear(self):
+        with self._lock:
+            self._release()
+            self._reset()
+            self._epoch += 1
+
+
+review_index = ReviewIndex()
+
+
+# ---------- загрузка из БД ----------
+async def _stream_documents(db: AsyncSession):
+    reviews = await db.stream(
+        select(models.Review.id, models.Review.content).execution_options(yield_per=1000)
+    )
+    async for id, content in reviews:
+        yield REVIEW, id, id, content
+    comments = await db.stream(
+        select(models.Comment.id, models.Comment.review_id, models.Comment.content)
+        .execution_options(yield_per=1000)
+    )
+    async for id, review_id, content in comments:
+        yield COMMENT, id, review_id, content
+
+
+async def build_from_db(db: AsyncSession, index: ReviewIndex = review_index, path: Optional[str] = REVIEW_INDEX_PATH):
+    """Полная перестройка индекса по таблицам reviews и comments (и запись снимка)."""
+    meta = {"outbox_id": await events.journal_position(db)}
+    index.clear()
+    async for kind, id, review_id, content in _stream_documents(db):
+        index.add(kind, id, review_id, content)
+    if path:
+        index.compact(path, meta)
+    else:
+        index.meta = meta
+    return index
+
+
+async def catch_up(db: AsyncSession, index: ReviewIndex = review_index) -> bool:
+    """Применяет к загруженному снимку события outbox после его позиции.
+
+    False, если позиции в снимке нет или журнал уже не содержит всех событий после неё.
+    """
+    if "outbox_id" not in index.meta:
+        return False
+
+    async def handler(db, batch):
+        batch = [event for event in batch if isinstance(event, _EVENT_TYPES)]
+        if batch:
+            await apply_events(db, batch, index)
+
+    position = await events.replay(db, int(index.meta["outbox_id"]), handler)
+    if position is None:
+        return False
+    index.meta["outbox_id"] = position
+    return True
+
+
+async def init_review_index(db: AsyncSession, index: ReviewIndex = review_index, path: str = REVIEW_INDEX_PATH):
+    """При старте: mmap снимка + догон по outbox, либо построение с нуля."""
+    if path and os.path.exists(path):
+        try:
+            index.load(path)
+        except (ValueError, OSError):
+            logger.warning("Review index snapshot %s is unreadable, rebuilding", path)
+        else:
+            if await catch_up(db, index):
+                return index
+            logger.warning("Outbox no longer covers review index snapshot %s, rebuilding", path)
+    return await build_from_db(db, index, path)
+
+
+async def refresh_snapshot(db: AsyncSession, path: str = REVIEW_INDEX_PATH) -> ReviewIndex:
+    """Догоняет снимок на диске и пересохраняет его (один раз в мастере gunicorn перед fork)."""
+    index = ReviewIndex()
+    await init_review_index(db, index, path)
+    if index.changes:
+        index.compact(path)
+    return index
+
+
+async def sync_documents(
+    db: AsyncSession, review_ids: Iterable[int], comment_ids: Iterable[int], index: ReviewIndex = review_index
+):
+    """Приводит документы с данными id к состоянию БД: есть строка — (пере)индексируем, нет — удаляем."""
+    review_ids, comment_ids = set(review_ids), set(comment_ids)
+    if review_ids:
+        rows = dict((await db.execute(
+            select(models.Review.id, models.Review.content).where(models.Review.id.in_(review_ids))
+        )).all())
+        for id in review_ids:
+            if id in rows:
+                index.add(REVIEW, id, id, rows[id])
+            else:
+                index.remove(REVIEW, id)
+    if comment_ids:
+        rows = {
+            id: (review_id, content)
+            for id, review_id, content in await db.execute(
+                select(models.Comment.id, models.Comment.review_id, models.Comment.content)
+                .where(models.Comment.id.in_(comment_ids))
+            )
+        }
+        for id in comment_ids:
+            if id in rows:
+                index.add(COMMENT, id, *rows[id])
+            else:
+                index.remove(COMMENT, id)
+
+
+_EVENT_TYPES = (
+    events.ReviewCreated, events.ReviewUpdated, events.ReviewDeleted,
+    events.CommentCreated, events.CommentDeleted, events.ReviewsImported,
+)
+
+
+@event_bus.subscribe(*_EVENT_TYPES, name="review_index")
+async def apply_events(db: AsyncSession, batch: List[events.Event], index: ReviewIndex = review_index):
+    review_ids, comment_ids = [], []
+    for event in batch:
+        if isinstance(event, events.ReviewsImported):
+            review_ids.extend(event.review_ids)
+        elif isinstance(event, (events.CommentCreated, events.CommentDeleted)):
+            comment_ids.append(event.comment_id)
+        else:
+            review_ids.append(event.review_id)
+    await sync_documents(db, review_ids, comment_ids, index)
+
+
+class SnapshotWriter:
+    """Сливает изменения индекса в снимок: периодически и при остановке воркера."""
+
+    def __init__(self, index: ReviewIndex, path: str, interval: float = REVIEW_INDEX_SAVE_SECONDS):
+        self.index = index
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def save(self, position: Optional[int] = None) -> bool:
+        """Записывает снимок с позицией outbox (по умолчанию — доставленной шиной событий)."""
+        if not self.path or not self.index.changes:
+            return False
+        meta = {**self.index.meta, "outbox_id": event_bus.position if position is None else position}
+        # Слияние занимает заметное время: не держим цикл событий
+        await asyncio.to_thread(self.index.compact, self.path, meta)
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Снимок, только что записанный другим воркером, не переписываем
+                if not os.path.exists(self.path) or time.time() - os.path.getmtime(self.path) >= self.interval / 2:
+                    await self.save()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Review index snapshot failed")
+
+    def start(self):
+        if self.path and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.save()
+        except Exception:
+            logger.exception("Review index snapshot failed")
+
+
+review_snapshots = SnapshotWriter(review_index, REVIEW_INDEX_PATH)
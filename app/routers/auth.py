@@ -1,40 +1,60 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, schemas
 from app.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.database import get_db
+from app.instrumentation import TimedRoute
+from app.password_hasher import PasswordHasherBusy
+from app.rate_limit import RateLimit
 
-router = APIRouter(tags=["auth"])
+router = APIRouter(tags=["auth"], route_class=TimedRoute)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-@router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+# Перебор паролей и массовая регистрация упираются в bcrypt: лимит по IP до хеширования
+login_limit = RateLimit("auth:login", "5/minute", "30/hour", key="ip")
+register_limit = RateLimit("auth:register", "3/minute", "20/day", key="ip")
+
+def too_many_requests(exc: PasswordHasherBusy):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Authentication service is busy, try again later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@router.post("/register", response_model=schemas.UserResponse, dependencies=[Depends(register_limit)])
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
-    return crud.create_user(db=db, user=user)
+    try:
+        return await crud.create_user(db=db, user=user)
+    except PasswordHasherBusy as exc:
+        raise too_many_requests(exc)
 
-@router.post("/login", response_model=schemas.Token)
-def login(
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(login_limit)])
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = crud.authenticate_user(
-        db, email=form_data.username, password=form_data.password
-    )
+    try:
+        user = await crud.authenticate_user(
+            db, email=form_data.username, password=form_data.password
+        )
+    except PasswordHasherBusy as exc:
+        raise too_many_requests(exc)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,71 +1,175 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app import crud, schemas
-from app.database import get_db
+from app import bulk, crud, schemas, serializers
+from app.leaderboards import BOARDS, leaderboards
+from app.recommendations import item_similarity, with_games
+from app.database import get_db, get_read_db
+from app.instrumentation import TimedRoute
+from app.rate_limit import RateLimit, page_cost
+from app.loaders import Loaders, get_loaders, get_read_loaders
+from app.pagination import Cursor, cursor_param, ids_param, optional_ids_param, set_pagination_headers
+from app.streaming import stream_param, streaming_response
+from app.auth import Principal
 from app.routers.users import get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.get("/", response_model=List[schemas.GameResponse])
-def read_games(
+# Ограничения частоты (переопределяются через RATE_LIMITS); стоимость списка растёт с limit
+list_limit = RateLimit("games:list", "50/second", "1000/minute", key="user", cost=page_cost())
+search_limit = RateLimit(
+    "games:search", "10/second", "200/minute", key="user", when=lambda request: "search" in request.query_params
+)
+
+@router.get("/", response_model=List[schemas.GameResponse], dependencies=[Depends(list_limit), Depends(search_limit)])
+async def read_games(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(cursor_param),
+    stream: Optional[str] = Depends(stream_param),
+    ids: Optional[List[int]] = Depends(optional_ids_param),
+    db: AsyncSession = Depends(get_read_db),
+    loaders: Loaders = Depends(get_read_loaders)
 ):
-    games = crud.get_games(db, skip=skip, limit=limit, search=search)
-    return games
+    if ids is not None:
+        # ?ids=1,2,3 — игры в порядке ids (отсутствующие пропускаются); страница и поиск не применяются
+        return [game for game in await loaders.games.load_many(ids) if game is not None]
+    if stream:
+        if search:
+            raise HTTPException(status_code=400, detail="Streaming is not supported for search")
+        return streaming_response(
+            lambda: crud.stream_games(db, skip=skip, limit=limit, cursor=cursor),
+            schemas.GameResponse, stream
+        )
+    if search:
+        games = await crud.get_games(db, skip=skip, limit=limit, search=search)
+        set_pagination_headers(request, response, games)
+        return games
+    games = await crud.get_game_rows(db, skip=skip, limit=limit, cursor=cursor)
+    fast_response = serializers.rows_response(games, serializers.GAME)
+    set_pagination_headers(request, fast_response, games)
+    return fast_response
 
 @router.post("/", response_model=schemas.GameResponse)
-def create_game(
+async def create_game(
     game: schemas.GameCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return await crud.create_game(db=db, game=game, user_id=current_user.id)
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_games(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    return crud.create_game(db=db, game=game, user_id=current_user.id)
+    records = bulk.iter_records(bulk.iter_lines(request.stream()), fmt)
+    return asdict(await bulk.import_games(db, records))
+
+@router.get("/export")
+async def export_games(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    return StreamingResponse(
+        bulk.export_rows(db, "games", fmt),
+        media_type=bulk.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="games.{fmt}"'}
+    )
+
+def _leaderboard_entries(board: str, limit: int, genre: Optional[str] = None):
+    return [
+        {**asdict(entry), "average_rating": entry.average_rating, "score": round(leaderboards.bayesian_score(entry), 3)}
+        for entry in leaderboards.top(board, limit, genre)
+    ]
+
+@router.get("/leaderboards", response_model=schemas.HomeLeaderboards)
+async def read_leaderboards(limit: int = Query(10, ge=1, le=100), genre: Optional[str] = None):
+    """Все рейтинги одним ответом (главная страница); данные из памяти, без запросов к БД."""
+    return {
+        **{board: _leaderboard_entries(board, limit, genre) for board in BOARDS},
+        "genres": leaderboards.genres(),
+        "totals": leaderboards.totals,
+        "trending_days": leaderboards.trending_days,
+        "updated_at": leaderboards.updated_at,
+    }
+
+@router.get("/leaderboards/{board}", response_model=schemas.Leaderboard)
+async def read_leaderboard(board: str, limit: int = Query(10, ge=1, le=100), genre: Optional[str] = None):
+    if board not in BOARDS:
+        raise HTTPException(status_code=404, detail="Leaderboard not found")
+    return {"board": board, "genre": genre, "entries": _leaderboard_entries(board, limit, genre)}
+
+@router.get("/summary", response_model=List[schemas.GameSummary], dependencies=[Depends(list_limit)])
+async def read_game_summaries(ids: List[int] = Depends(ids_param), db: AsyncSession = Depends(get_read_db)):
+    """Счётчики и средняя оценка нескольких игр одним запросом (карточки списков); порядок — как в ids."""
+    summaries = await crud.get_game_summaries(db, ids)
+    return [summaries[game_id] for game_id in ids if game_id in summaries]
 
 @router.get("/{game_id}", response_model=schemas.GameResponse)
-def read_game(game_id: int, db: Session = Depends(get_db)):
-    db_game = crud.get_game(db, game_id=game_id)
+async def read_game(game_id: int, loaders: Loaders = Depends(get_loaders)):
+    db_game = await loaders.games.load(game_id)
     if db_game is None:
         raise HTTPException(status_code=404, detail="Game not found")
     return db_game
 
 @router.put("/{game_id}", response_model=schemas.GameResponse)
-def update_game(
+async def update_game(
     game_id: int,
     game_update: schemas.GameBase,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_game = crud.update_game(db, game_id=game_id, game_update=game_update)
+    db_game = await crud.update_game(db, game_id=game_id, game_update=game_update)
     if db_game is None:
         raise HTTPException(status_code=404, detail="Game not found")
     return db_game
 
 @router.delete("/{game_id}")
-def delete_game(
+async def delete_game(
     game_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    success = crud.delete_game(db, game_id=game_id)
+    success = await crud.delete_game(db, game_id=game_id)
     if not success:
         raise HTTPException(status_code=404, detail="Game not found")
     return {"message": "Game deleted successfully"}
 
-@router.get("/{game_id}/reviews", response_model=List[schemas.ReviewResponse])
-def read_game_reviews(
+@router.get("/{game_id}/reviews", response_model=List[schemas.ReviewResponse], dependencies=[Depends(list_limit)])
+async def read_game_reviews(
     game_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(cursor_param),
+    db: AsyncSession = Depends(get_db)
+):
+    reviews = await crud.get_review_rows(db, skip=skip, limit=limit, game_id=game_id, cursor=cursor)
+    response = serializers.rows_response(reviews, serializers.REVIEW)
+    set_pagination_headers(request, response, reviews)
+    return response
+
+@router.get("/{game_id}/similar", response_model=List[schemas.SimilarGame])
+async def read_similar_games(
+    game_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    reviews = crud.get_reviews(db, skip=skip, limit=limit, game_id=game_id)
-    return reviews
+    """Игры, которые высоко оценили игроки, высоко оценившие эту (item-item сходство)."""
+    if await loaders.games.load(game_id) is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return await with_games(db, item_similarity.similar(game_id, limit))
 
 @router.get("/{game_id}/stats")
-def get_game_stats(game_id: int, db: Session = Depends(get_db)):
-    stats = crud.get_game_statistics(db, game_id=game_id)
+async def get_game_stats(game_id: int, db: AsyncSession = Depends(get_read_db)):
+    stats = await crud.get_game_statistics(db, game_id=game_id)
     return stats
\ No newline at end of file
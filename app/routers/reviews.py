@@ -1,50 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app import crud, schemas
-from app.database import get_db
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app import bulk, crud, models, schemas, serializers
+from app.database import get_db, get_read_db
+from app.instrumentation import TimedRoute
+from app.rate_limit import RateLimit, page_cost
+from app.loaders import Loaders, get_loaders, get_read_loaders
+from app.pagination import Cursor, cursor_param, optional_ids_param, set_pagination_headers
+from app.streaming import stream_param, streaming_response
+from app.review_index import COMMENT, review_index
+from app.auth import Principal
 from app.routers.users import get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+# Пакетные эндпоинты в стиле "ресурс:действие" (/api/reviews:batch) — монтируются с префиксом /api
+batch_router = APIRouter(route_class=TimedRoute)
 
-@router.get("/", response_model=List[schemas.ReviewResponse])
-def read_reviews(
+# Ограничения частоты (переопределяются через RATE_LIMITS)
+list_limit = RateLimit("reviews:list", "50/second", "1000/minute", key="user", cost=page_cost())
+search_limit = RateLimit("reviews:search", "10/second", "200/minute", key="user")
+write_limit = RateLimit("reviews:write", "5/second", "120/minute", key="user")
+
+@router.get("/", response_model=List[schemas.ReviewResponse], dependencies=[Depends(list_limit)])
+async def read_reviews(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     game_id: int = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(cursor_param),
+    stream: Optional[str] = Depends(stream_param),
+    ids: Optional[List[int]] = Depends(optional_ids_param),
+    db: AsyncSession = Depends(get_read_db),
+    loaders: Loaders = Depends(get_read_loaders)
 ):
-    reviews = crud.get_reviews(db, skip=skip, limit=limit, game_id=game_id)
-    return reviews
+    if ids is not None:
+        return [review for review in await loaders.reviews.load_many(ids) if review is not None]
+    if stream:
+        return streaming_response(
+            lambda: crud.stream_reviews(
+                db, skip=skip, limit=limit, game_id=game_id, cursor=cursor,
+                loader=crud.loader_strategy("read_reviews")
+            ),
+            schemas.ReviewResponse, stream
+        )
+    reviews = await crud.get_review_rows(db, skip=skip, limit=limit, game_id=game_id, cursor=cursor)
+    response = serializers.rows_response(reviews, serializers.REVIEW)
+    set_pagination_headers(request, response, reviews)
+    return response
 
-@router.post("/", response_model=schemas.ReviewResponse)
-def create_review(
+@router.post("/", response_model=schemas.ReviewResponse, dependencies=[Depends(write_limit)])
+async def create_review(
     review: schemas.ReviewCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: Principal = Depends(get_current_user)
 ):
     # Проверяем, существует ли игра
-    game = crud.get_game(db, game_id=review.game_id)
+    game = await loaders.games.load(review.game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     
-    return crud.create_review(db=db, review=review, user_id=current_user.id)
+    return await crud.create_review(db=db, review=review, user_id=current_user.id)
+
+@router.get("/search", response_model=List[schemas.ReviewSearchHit], dependencies=[Depends(search_limit)])
+async def search_reviews(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    hits = review_index.search(q, limit=limit)
+    reviews = await crud.get_reviews_by_ids(
+        db, {hit.review_id for hit in hits}, loader=crud.loader_strategy("search_reviews")
+    )
+    return [
+        {
+            "score": hit.score,
+            "comment_id": hit.id if hit.kind == COMMENT else None,
+            "review": reviews[hit.review_id]
+        }
+        for hit in hits
+        if hit.review_id in reviews
+    ]
+
+@router.post("/import", response_model=schemas.ImportReport)
+async def import_reviews(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Через API обзоры импортируются от имени текущего пользователя
+    records = bulk.iter_records(bulk.iter_lines(request.stream()), fmt)
+    return asdict(await bulk.import_reviews(db, records, user_id=current_user.id))
+
+@router.get("/export")
+async def export_reviews(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    return StreamingResponse(
+        bulk.export_rows(db, "reviews", fmt),
+        media_type=bulk.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="reviews.{fmt}"'}
+    )
 
 @router.get("/{review_id}", response_model=schemas.ReviewResponse)
-def read_review(review_id: int, db: Session = Depends(get_db)):
-    db_review = crud.get_review(db, review_id=review_id)
+async def read_review(review_id: int, loaders: Loaders = Depends(get_loaders)):
+    db_review = await loaders.reviews.load(review_id)
     if db_review is None:
         raise HTTPException(status_code=404, detail="Review not found")
     return db_review
 
 @router.put("/{review_id}", response_model=schemas.ReviewResponse)
-def update_review(
+async def update_review(
     review_id: int,
     review_update: schemas.ReviewBase,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_review = crud.update_review(
+    db_review = await crud.update_review(
         db, review_id=review_id, review_update=review_update, user_id=current_user.id
     )
     if db_review is None:
@@ -52,43 +129,123 @@ def update_review(
     return db_review
 
 @router.delete("/{review_id}")
-def delete_review(
+async def delete_review(
     review_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    success = crud.delete_review(db, review_id=review_id, user_id=current_user.id)
+    success = await crud.delete_review(db, review_id=review_id, user_id=current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Review not found or access denied")
     return {"message": "Review deleted successfully"}
 
-@router.get("/{review_id}/comments", response_model=List[schemas.CommentResponse])
-def read_review_comments(
+@router.get("/{review_id}/comments", response_model=List[schemas.CommentResponse], dependencies=[Depends(list_limit)])
+async def read_review_comments(
     review_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(cursor_param),
+    stream: Optional[str] = Depends(stream_param),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    comments = crud.get_comments_by_review(db, review_id=review_id, skip=skip, limit=limit)
-    return comments
+    if stream:
+        return streaming_response(
+            lambda: crud.stream_comments_by_review(
+                db, review_id=review_id, skip=skip, limit=limit, cursor=cursor,
+                loader=crud.loader_strategy("read_review_comments")
+            ),
+            schemas.CommentResponse, stream
+        )
+    comments = await crud.get_comment_rows(db, review_id=review_id, skip=skip, limit=limit, cursor=cursor)
+    response = serializers.rows_response(comments, serializers.COMMENT)
+    set_pagination_headers(request, response, comments)
+    return response
 
-@router.post("/{review_id}/comments", response_model=schemas.CommentResponse)
-def create_comment(
+@router.post("/{review_id}/comments", response_model=schemas.CommentResponse, dependencies=[Depends(write_limit)])
+async def create_comment(
     review_id: int,
     comment: schemas.CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserResponse = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: Principal = Depends(get_current_user)
 ):
     # Проверяем, существует ли обзор
-    review = crud.get_review(db, review_id=review_id)
+    review = await loaders.reviews.load(review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
     comment_data = comment.model_dump()
     comment_data["review_id"] = review_id
     
-    return crud.create_comment(
+    return await crud.create_comment(
         db=db, 
         comment=schemas.CommentCreate(**comment_data),
         user_id=current_user.id
-    )
\ No newline at end of file
+    )
+
+# ========== Пакетная запись ==========
+def _validate_batch(items, schema, extra=None):
+    """Корректные элементы [(индекс, объект)] и результаты для некорректных."""
+    valid, results = [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate({**item, **(extra or {})})))
+        except ValidationError as exc:
+            results[index] = schemas.BatchItemResult(
+                index=index, status="invalid", error=bulk.describe_validation_error(exc)
+            )
+    return valid, results
+
+async def _commit_batch(batch: schemas.BatchRequest, valid, results, create, response: Response):
+    valid = [(index, item) for index, item in valid if index not in results]
+    if results and batch.atomic:
+        for index, _ in valid:
+            results[index] = schemas.BatchItemResult(
+                index=index, status="skipped", error="Atomic batch contains failed items"
+            )
+        response.status_code = 422
+    elif valid:
+        created = await create([item for _, item in valid])
+        for (index, _), entity in zip(valid, created):
+            results[index] = schemas.BatchItemResult(index=index, status="created", id=entity.id)
+
+    ordered = [results[index] for index in range(len(batch.items))]
+    created_count = sum(1 for result in ordered if result.status == "created")
+    return {"created": created_count, "failed": len(ordered) - created_count, "results": ordered}
+
+@batch_router.post("/reviews:batch", response_model=schemas.BatchResult, dependencies=[Depends(write_limit)])
+async def create_reviews_batch(
+    batch: schemas.BatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    valid, results = _validate_batch(batch.items, schemas.ReviewCreate)
+    # Все игры проверяются одним запросом
+    games = await crud.existing_ids(db, models.Game, {review.game_id for _, review in valid})
+    for index, review in valid:
+        if review.game_id not in games:
+            results[index] = schemas.BatchItemResult(index=index, status="not_found", error="Game not found")
+
+    return await _commit_batch(
+        batch, valid, results,
+        lambda reviews: crud.create_reviews(db, reviews, user_id=current_user.id), response
+    )
+
+@batch_router.post("/reviews/{review_id}/comments:batch", response_model=schemas.BatchResult, dependencies=[Depends(write_limit)])
+async def create_comments_batch(
+    review_id: int,
+    batch: schemas.BatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if not await crud.existing_ids(db, models.Review, [review_id]):
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    valid, results = _validate_batch(batch.items, schemas.CommentCreate, extra={"review_id": review_id})
+    return await _commit_batch(
+        batch, valid, results,
+        lambda comments: crud.create_comments(db, comments, user_id=current_user.id), response
+    )
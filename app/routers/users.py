@@ -1,50 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app import crud, schemas
-from app.database import get_db
-from app.auth import oauth2_scheme
-from jose import JWTError, jwt
-import os
+from app.database import get_db, get_read_db
+from app.instrumentation import TimedRoute
+from app.loaders import Loaders, get_loaders, get_read_loaders
+from app.pagination import Cursor, cursor_param, optional_ids_param, set_pagination_headers
+from app.recommendations import item_similarity, user_ratings, with_games
+from app.auth import (
+    InvalidToken, Principal, cache_principal, decode_access_token, oauth2_scheme, principal_cache
+)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, os.getenv("SECRET_KEY"), algorithms=["HS256"]
-        )
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-    except JWTError:
+    except InvalidToken:
         raise credentials_exception
-    
-    user = crud.get_user_by_email(db, email=email)
-    if user is None:
+
+    user = await crud.get_user_by_email(db, email=email)
+    if user is None or not user.is_active:
         raise credentials_exception
-    return user
+
+    principal = Principal.from_user(user)
+    cache_principal(token, principal, expires_at=payload.get("exp"))
+    return principal
 
 @router.get("/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: schemas.UserResponse = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_user)):
     return current_user
 
+@router.get("/me/recommendations", response_model=List[schemas.SimilarGame])
+async def read_my_recommendations(
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    ratings = await user_ratings(db, current_user.id)
+    return await with_games(db, item_similarity.recommend(ratings, limit))
+
 @router.get("/", response_model=List[schemas.UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
+async def read_users(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[Cursor] = Depends(cursor_param),
+    ids: Optional[List[int]] = Depends(optional_ids_param),
+    db: AsyncSession = Depends(get_read_db),
+    loaders: Loaders = Depends(get_read_loaders)
+):
+    if ids is not None:
+        return [user for user in await loaders.users.load_many(ids) if user is not None]
+    users = await crud.get_users(db, skip=skip, limit=limit, cursor=cursor)
+    set_pagination_headers(request, response, users)
     return users
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def read_user(user_id: int, loaders: Loaders = Depends(get_loaders)):
+    db_user = await loaders.users.load(user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
\ No newline at end of file
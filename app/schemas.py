@@ -2,7 +2,7 @@
 from pydantic import BaseModel, EmailStr
 from pydantic import Field  # Для версии 1.x отдельно
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 
 # User schemas
 class UserBase(BaseModel):
@@ -38,6 +38,9 @@ class GameCreate(GameBase):
 class GameResponse(GameBase):
     id: int
     created_at: datetime
+    review_count: int = 0
+    comment_count: int = 0  # комментарии ко всем обзорам игры
+    last_activity_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -50,16 +53,94 @@ class ReviewBase(BaseModel):
 class ReviewCreate(ReviewBase):
     game_id: int
 
+class ReviewImport(ReviewCreate):
+    user_id: int
+
 class ReviewResponse(ReviewBase):
     id: int
     game_id: int
     user_id: int
     author: UserResponse
     created_at: datetime
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class GameSummary(BaseModel):
+    """Компактная сводка игры для карточек списка (GET /api/games/summary)."""
+    id: int
+    review_count: int
+    comment_count: int
+    average_rating: float
+    last_activity_at: Optional[datetime] = None
+
+class ReviewSearchHit(BaseModel):
+    score: float
+    comment_id: Optional[int] = None  # если совпадение найдено в комментарии к обзору
+    review: ReviewResponse
+
+class SimilarGame(BaseModel):
+    score: float  # сходство (похожие игры) или вес рекомендации
+    game: GameResponse
+
+# Leaderboard schemas
+class LeaderboardEntry(BaseModel):
+    game_id: int
+    title: str
+    genre: Optional[str] = None
+    review_count: int
+    average_rating: float
+    score: float  # байесовское среднее
+    recent_reviews: int  # обзоры за окно «в тренде»
+
+class Leaderboard(BaseModel):
+    board: str
+    genre: Optional[str] = None
+    entries: List[LeaderboardEntry]
+
+class HomeLeaderboards(BaseModel):
+    top_rated: List[LeaderboardEntry]
+    most_reviewed: List[LeaderboardEntry]
+    trending: List[LeaderboardEntry]
+    genres: List[str]
+    totals: Dict[str, int]  # games, users, reviews на момент последней перестройки
+    trending_days: int
+    updated_at: Optional[datetime] = None
+
+# Bulk import schemas
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    processed: int
+    inserted: int
+    updated: int
+    failed: int
+    errors: List[ImportRowError]  # первые BULK_MAX_REPORTED_ERRORS ошибок
+
+# Batch write schemas
+BATCH_MAX_ITEMS = 500
+
+class BatchRequest(BaseModel):
+    # Элементы проверяются по одному, чтобы ошибка одного не отменяла разбор остальных
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    # True — всё или ничего; False — сохраняются корректные элементы
+    atomic: bool = True
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str  # created | invalid | not_found | skipped
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchItemResult]
+
 # Comment schemas
 class CommentBase(BaseModel):
     content: str = Field(..., min_length=1)
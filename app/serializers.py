@@ -0,0 +1,63 @@
+# app/serializers.py
+# Быстрая сериализация списков: выбираем только нужные колонки (Row-кортежи),
+# собираем словари в порядке полей схем *Response и кодируем orjson.
+# Результат побайтно совпадает с ответом через response_model + JSONResponse.
+from typing import List, Sequence
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select
+
+from app import models, schemas
+from app.instrumentation import serialization
+
+try:
+    import orjson  # noqa: F401
+except ImportError:  # orjson необязателен: тот же JSON даст стандартный кодировщик
+    orjson = None
+
+FastJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+
+class RowEncoder:
+    """Колонки модели в порядке полей схемы; вложенные схемы — через JOIN с префиксом."""
+
+    def __init__(self, schema, model, relations=None, prefix: str = ""):
+        relations = relations or {}
+        self.plan = []
+        self.columns = []
+        for name in schema.model_fields:
+            if name in relations:
+                nested = RowEncoder(*relations[name], prefix=f"{prefix}{name}_")
+                self.plan.append((name, nested))
+                self.columns.extend(nested.columns)
+            else:
+                column = getattr(model, name)
+                self.plan.append((name, None))
+                self.columns.append(column.label(f"{prefix}{name}") if prefix else column)
+        self.width = len(self.columns)
+
+    def to_dict(self, row: Sequence, offset: int = 0) -> dict:
+        data = {}
+        for name, nested in self.plan:
+            if nested is None:
+                data[name] = row[offset]
+                offset += 1
+            else:
+                data[name] = nested.to_dict(row, offset)
+                offset += nested.width
+        return data
+
+    def select(self):
+        return select(*self.columns)
+
+
+USER = RowEncoder(schemas.UserResponse, models.User)
+GAME = RowEncoder(schemas.GameResponse, models.Game)
+REVIEW = RowEncoder(schemas.ReviewResponse, models.Review, {"author": (schemas.UserResponse, models.User)})
+COMMENT = RowEncoder(schemas.CommentResponse, models.Comment, {"author": (schemas.UserResponse, models.User)})
+
+
+def rows_response(rows: Sequence, encoder: RowEncoder) -> JSONResponse:
+    with serialization():
+        content: List[dict] = [encoder.to_dict(row) for row in rows]
+        return FastJSONResponse(content)
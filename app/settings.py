@@ -0,0 +1,51 @@
+# app/settings.py
+# Настройки сборки приложения (create_app): пути, CORS и подключаемые роутеры.
+# Настройки подсистем (пул БД, кэши, лимиты) по-прежнему читают из окружения их модули.
+import os
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "модуль:атрибут=префикс"; тег в документации — имя модуля, если у роутера нет своего
+DEFAULT_ROUTERS = [
+    "app.routers.auth:router=/api/auth",
+    "app.routers.games:router=/api/games",
+    "app.routers.reviews:router=/api/reviews",
+    "app.routers.reviews:batch_router=/api",
+    "app.routers.users:router=/api/users",
+]
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@dataclass
+class Settings:
+    title: str = "GameReviews Platform API"
+    debug: bool = False
+    static_dir: str = os.path.join(BASE_DIR, "static")
+    templates_dir: str = os.path.join(BASE_DIR, "templates")
+    cors_origins: List[str] = field(default_factory=lambda: ["*"])
+    routers: List[str] = field(default_factory=lambda: list(DEFAULT_ROUTERS))
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        defaults = cls()
+        return cls(
+            debug=os.getenv("DEBUG", "false").lower() in ("1", "true", "yes"),
+            static_dir=os.getenv("STATIC_DIR", defaults.static_dir),
+            templates_dir=os.getenv("TEMPLATES_DIR", defaults.templates_dir),
+            cors_origins=_split(os.getenv("CORS_ORIGINS", "")) or defaults.cors_origins,
+            routers=_split(os.getenv("APP_ROUTERS", "")) or defaults.routers,
+        )
+
+    def router_specs(self) -> List[Tuple[str, str, str]]:
+        """[(модуль, атрибут, префикс), ...]"""
+        specs = []
+        for spec in self.routers:
+            target, _, prefix = spec.partition("=")
+            module, _, attribute = target.partition(":")
+            specs.append((module.strip(), attribute.strip() or "router", prefix.strip()))
+        return specs
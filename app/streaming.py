@@ -0,0 +1,48 @@
+# app/streaming.py
+# Потоковая выдача списков (по запросу ?stream=ndjson|json): строки сериализуются
+# по мере чтения из БД, поэтому память не растёт с размером выдачи.
+from typing import AsyncIterator, Optional, Sequence, Type
+
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.instrumentation import serialization
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def stream_param(
+    stream: Optional[str] = Query(
+        None, pattern="^(ndjson|json)$",
+        description="Потоковая выдача: ndjson — объект на строку, json — массив по частям"
+    )
+) -> Optional[str]:
+    return stream
+
+
+async def _encode(partitions: AsyncIterator[Sequence], schema: Type[BaseModel], fmt: str):
+    first = True
+    if fmt == "json":
+        yield b"["
+    async for partition in partitions:
+        with serialization():
+            rows = [schema.model_validate(row).model_dump_json().encode() for row in partition]
+        if not rows:
+            continue
+        if fmt == "ndjson":
+            yield b"\n".join(rows) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(rows)
+        first = False
+    if fmt == "json":
+        yield b"]"
+
+
+def streaming_response(make_partitions, schema: Type[BaseModel], fmt: str) -> StreamingResponse:
+    """make_partitions — вызов crud.stream_*; ошибки параметров превращаются в 400 до начала ответа."""
+    try:
+        partitions = make_partitions()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return StreamingResponse(_encode(partitions, schema, fmt), media_type=STREAM_MEDIA_TYPES[fmt])
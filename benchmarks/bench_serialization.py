@@ -0,0 +1,88 @@
+"""Сравнение сериализации страницы из 100 обзоров: response_model (ORM + Pydantic)
+и быстрый путь (Row-кортежи + orjson).
+
+    python -m benchmarks.bench_serialization [--rows 100] [--repeat 200]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models, schemas, serializers
+from app.database import Base
+
+REVIEWS = TypeAdapter(List[schemas.ReviewResponse])
+
+
+async def seed(session_factory, rows: int):
+    async with session_factory() as db:
+        users = [
+            models.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x")
+            for i in range(10)
+        ]
+        game = models.Game(title="Benchmark")
+        db.add_all(users + [game])
+        await db.flush()
+        db.add_all(
+            models.Review(game_id=game.id, user_id=users[i % 10].id, rating=i % 10 + 1,
+                          content=f"Обзор номер {i}: " + "текст " * 30)
+            for i in range(rows)
+        )
+        await db.commit()
+
+
+async def schema_path(db, rows):
+    page = await crud.get_reviews(db, limit=rows)
+    content = REVIEWS.dump_python(REVIEWS.validate_python(list(page), from_attributes=True), mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+async def fast_path(db, rows):
+    page = await crud.get_review_rows(db, limit=rows)
+    return serializers.rows_response(page, serializers.REVIEW).body
+
+
+async def measure(session_factory, func, rows: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            body = await func(db, rows)
+            timings.append(time.perf_counter() - start)
+    return body, timings
+
+
+async def main(rows: int, repeat: int):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, rows)
+
+    results = {}
+    for name, func in (("response_model", schema_path), ("fast_path", fast_path)):
+        await measure(session_factory, func, rows, 5)  # прогрев
+        results[name] = await measure(session_factory, func, rows, repeat)
+    await engine.dispose()
+
+    assert results["response_model"][0] == results["fast_path"][0], "outputs differ"
+    for name, (_, timings) in results.items():
+        print(f"{name:>15}: median {statistics.median(timings) * 1000:.2f} ms, "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.2f} ms")
+    speedup = statistics.median(results["response_model"][1]) / statistics.median(results["fast_path"][1])
+    print(f"{'speedup':>15}: x{speedup:.2f} on {rows}-row pages")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
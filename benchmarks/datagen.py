@@ -0,0 +1,114 @@
+"""Синтетические данные для бенчмарков: пользователи, игры, обзоры и комментарии.
+
+    python -m benchmarks.datagen --database-url sqlite:///./bench.db --users 1000 --games 500 \\
+        --reviews 20000 --comments 40000
+
+Все пользователи получают пароль BENCH_PASSWORD (email userN@bench.example).
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, models
+from app.auth import get_password_hash
+from app.database import build_async_engine, create_tables
+
+BENCH_PASSWORD = "benchmark"
+GENRES = ["RPG", "Action", "Strategy", "Shooter", "Puzzle", "Racing", "Simulation", "Adventure"]
+WORDS = (
+    "сюжет графика геймплей музыка боссы открытый мир квесты персонажи управление баланс "
+    "кооператив сложность атмосфера локации оружие прокачка диалоги финал"
+).split()
+INSERT_BATCH = 5000
+
+
+@dataclass
+class DatasetSize:
+    users: int = 200
+    games: int = 100
+    reviews: int = 2000
+    comments: int = 4000
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+async def _insert(db, model, rows):
+    for start in range(0, len(rows), INSERT_BATCH):
+        await db.execute(insert(model), rows[start:start + INSERT_BATCH])
+
+
+async def generate(session_factory: async_sessionmaker, size: DatasetSize, seed: int = 0) -> DatasetSize:
+    """Заполняет пустую БД (таблицы уже созданы); id строк идут подряд с 1."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    def moment(days: int = 90) -> datetime:
+        return now - timedelta(seconds=rng.randrange(days * 86400))
+
+    # bcrypt дорог: один хэш на всех пользователей
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    users = [
+        {"username": f"user{i}", "email": f"user{i}@bench.example", "hashed_password": hashed_password,
+         "is_active": True, "created_at": moment()}
+        for i in range(1, size.users + 1)
+    ]
+    games = [
+        {"title": f"Game {i}", "description": _text(rng, 20), "genre": rng.choice(GENRES),
+         "release_year": rng.randrange(1990, 2025), "developer": f"Studio {i % 50}", "created_at": moment()}
+        for i in range(1, size.games + 1)
+    ]
+    # Не больше одного обзора на пару (игра, пользователь); популярные игры получают больше обзоров
+    reviews_total = min(size.reviews, size.users * size.games)
+    weights = [1 / rank for rank in range(1, size.games + 1)]
+    pairs = set()
+    while len(pairs) < reviews_total:
+        pairs.add((rng.choices(range(1, size.games + 1), weights)[0], rng.randrange(1, size.users + 1)))
+    reviews = [
+        {"game_id": game_id, "user_id": user_id, "rating": rng.randrange(1, 11),
+         "content": _text(rng, rng.randrange(10, 60)), "created_at": moment()}
+        for game_id, user_id in sorted(pairs)
+    ]
+    comments = [
+        {"review_id": rng.randrange(1, reviews_total + 1), "user_id": rng.randrange(1, size.users + 1),
+         "content": _text(rng, rng.randrange(3, 20)), "created_at": moment()}
+        for _ in range(size.comments if reviews_total else 0)
+    ]
+
+    async with session_factory() as db:
+        await _insert(db, models.User, users)
+        await _insert(db, models.Game, games)
+        await _insert(db, models.Review, reviews)
+        await _insert(db, models.Comment, comments)
+        await db.commit()
+        await crud.rebuild_game_statistics(db)
+    return DatasetSize(len(users), len(games), len(reviews), len(comments))
+
+
+async def main(args):
+    engine = build_async_engine(args.database_url, name="bench")
+    await create_tables(bind=engine)
+    size = DatasetSize(args.users, args.games, args.reviews, args.comments)
+    created = await generate(async_sessionmaker(engine, expire_on_commit=False), size, seed=args.seed)
+    await engine.dispose()
+    print("Generated " + ", ".join(f"{count} {name}" for name, count in asdict(created).items()))
+
+
+def add_size_arguments(parser: argparse.ArgumentParser):
+    defaults = DatasetSize()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name}", type=int, default=value)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    add_size_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,210 @@
+"""Нагрузочный прогон горячих путей API в процессе (ASGI, без сети).
+
+    python -m benchmarks.load --database-url sqlite:///./bench.db --generate --requests 500 --concurrency 16
+    python -m benchmarks.load --compare benchmarks/results/<прошлый>.json
+
+По каждому сценарию печатает пропускную способность и p50/p95/p99 и пишет результат в JSON
+(по умолчанию benchmarks/results/<commit>.json); --compare сравнивает с прошлым прогоном.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Запрос сценария: (метод, путь, именованные аргументы httpx)
+Request = Tuple[str, str, dict]
+
+
+def _scenarios(size, password: str) -> Dict[str, Callable[[random.Random], Request]]:
+    def game_id(rng):
+        # Чаще запрашиваются популярные игры (как и распределены обзоры)
+        return min(int(rng.paretovariate(1.2)), size.games)
+
+    return {
+        "games": lambda rng: ("GET", "/api/games/", {"params": {"limit": 50}}),
+        "game_reviews": lambda rng: ("GET", f"/api/games/{game_id(rng)}/reviews", {"params": {"limit": 50}}),
+        "game_stats": lambda rng: ("GET", f"/api/games/{game_id(rng)}/stats", {}),
+        "review_comments": lambda rng: (
+            "GET", f"/api/reviews/{rng.randrange(1, size.reviews + 1)}/comments", {"params": {"limit": 50}}
+        ),
+        "login": lambda rng: ("POST", "/api/auth/login", {"data": {
+            "username": f"user{rng.randrange(1, size.users + 1)}@bench.example", "password": password,
+        }}),
+    }
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(share * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_scenario(client, make_request, requests: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [make_request(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    position = 0
+
+    async def worker():
+        nonlocal position
+        while position < len(plan):
+            method, path, kwargs = plan[position]
+            position += 1
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            **{f"p{int(share * 100)}": round(percentile(latencies, share) * 1000, 3) for share in (0.5, 0.95, 0.99)},
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Сценарии, где p95 вырос или пропускная способность упала больше чем на threshold."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        p95, p95_before = result["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        rps, rps_before = result["throughput_rps"], before["throughput_rps"]
+        print(f"{name:>16}: p95 {p95_before:.2f} -> {p95:.2f} ms, {rps_before:.1f} -> {rps:.1f} req/s")
+        if p95_before and p95 > p95_before * (1 + threshold):
+            regressions.append(f"{name}: p95 {p95_before:.2f} -> {p95:.2f} ms")
+        if rps_before and rps < rps_before * (1 - threshold):
+            regressions.append(f"{name}: throughput {rps_before:.1f} -> {rps:.1f} req/s")
+    return regressions
+
+
+async def dataset_size(session_factory):
+    from sqlalchemy import func, select
+    from app import models
+    from benchmarks.datagen import DatasetSize
+
+    async with session_factory() as db:
+        counts = [
+            await db.scalar(select(func.count(model.id)))
+            for model in (models.User, models.Game, models.Review, models.Comment)
+        ]
+    return DatasetSize(*counts)
+
+
+async def main(args) -> int:
+    import httpx
+    from benchmarks import datagen
+    from app.database import AsyncSessionLocal, create_tables
+    from app.main import app
+
+    if args.generate:
+        await create_tables()
+        size = datagen.DatasetSize(args.users, args.games, args.reviews, args.comments)
+        size = await datagen.generate(AsyncSessionLocal, size, seed=args.seed)
+    else:
+        size = await dataset_size(AsyncSessionLocal)
+
+    scenarios = _scenarios(size, datagen.BENCH_PASSWORD)
+    selected = args.scenarios or list(scenarios)
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in selected:
+                requests = args.login_requests if name == "login" else args.requests
+                # Прогрев: соединения пула, кэши процесса
+                await run_scenario(client, scenarios[name], min(args.warmup, requests), args.concurrency, args.seed)
+                results[name] = result = await run_scenario(
+                    client, scenarios[name], requests, args.concurrency, args.seed + 1
+                )
+                latency = result["latency_ms"]
+                print(f"{name:>16}: {result['throughput_rps']:8.1f} req/s  p50 {latency['p50']:7.2f}  "
+                      f"p95 {latency['p95']:7.2f}  p99 {latency['p99']:7.2f} ms  errors {result['errors']}")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": args.database_url.split("://")[0],
+        "dataset": vars(size),
+        "concurrency": args.concurrency,
+        "response_cache": not args.no_response_cache,
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as target:
+        json.dump(report, target, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as source:
+            regressions = compare(report, json.load(source), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--database-url", default="sqlite:///./bench.db")
+    common.add_argument("--no-response-cache", action="store_true")
+    known, _ = common.parse_known_args(argv)
+    # Приложение читает настройки при импорте: окружение выставляется до импорта app
+    os.environ["DATABASE_URL"] = known.database_url
+    if known.no_response_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    # Все запросы прогона идут с одного адреса: ограничение частоты мерило бы само себя
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    from benchmarks.datagen import add_size_arguments
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0], parents=[common])
+    parser.add_argument("--generate", action="store_true", help="заполнить пустую БД синтетическими данными")
+    add_size_arguments(parser)
+    parser.add_argument("--scenarios", nargs="*", choices=["games", "game_reviews", "game_stats", "review_comments", "login"])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50, help="вход упирается в bcrypt, запросов меньше")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (доля)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,117 @@
+"""Время старта приложения: импорт app.main по модулям и lifespan.
+
+    python -m benchmarks.startup --runs 5 --top 20
+    python -m benchmarks.startup --output benchmarks/results/startup.json
+
+Каждый прогон — отдельный интерпретатор с -X importtime (первый прогон прогревает .pyc и
+не учитывается). Печатает медианы: полное время импорта, create_app, запуск lifespan на
+пустой SQLite, затем самые дорогие модули приложения (кумулятивно) и пакеты (собственное
+время всех их модулей).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$")
+
+# Выполняется в дочернем процессе: тайминги — в последней строке stdout
+_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+application = app.main.create_app()
+created = time.perf_counter()
+
+async def run_lifespan():
+    start = time.perf_counter()
+    async with application.router.lifespan_context(application):
+        ready = time.perf_counter()
+    return ready - start
+
+lifespan = asyncio.run(run_lifespan())
+print(json.dumps({"import": imported - started, "create_app": created - imported, "lifespan": lifespan}))
+"""
+
+
+def run_probe(database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules: Dict[str, int] = {}
+    own: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            modules[name] = int(cumulative_us)
+            own[name] = int(self_us)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"timings": timings, "cumulative_us": modules, "self_us": own}
+
+
+def summarize(runs: List[dict], top: int) -> dict:
+    timings = {
+        name: round(statistics.median(run["timings"][name] for run in runs) * 1000, 2)
+        for name in runs[0]["timings"]
+    }
+    app_modules = defaultdict(list)
+    packages = defaultdict(list)
+    for run in runs:
+        per_package: Dict[str, int] = defaultdict(int)
+        for name, self_us in run["self_us"].items():
+            per_package[name.split(".")[0]] += self_us
+        for package, total in per_package.items():
+            packages[package].append(total)
+        for name, cumulative in run["cumulative_us"].items():
+            if name == "app" or name.startswith("app."):
+                app_modules[name].append(cumulative)
+
+    def ranked(samples):
+        medians = {name: statistics.median(values) / 1000 for name, values in samples.items()}
+        return {name: round(ms, 2) for name, ms in sorted(medians.items(), key=lambda item: -item[1])[:top]}
+
+    return {"ms": timings, "app_modules_ms": ranked(app_modules), "packages_ms": ranked(packages)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="записать сводку в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'startup.db')}"
+        run_probe(database_url)  # прогрев .pyc и создание схемы
+        runs = [run_probe(database_url) for _ in range(args.runs)]
+    summary = summarize(runs, args.top)
+
+    for name, ms in summary["ms"].items():
+        print(f"{name:>12}: {ms:8.2f} ms")
+    print("\nМодули приложения (кумулятивно, мс):")
+    for name, ms in summary["app_modules_ms"].items():
+        print(f"  {name:<32} {ms:8.2f}")
+    print("\nПакеты (собственное время модулей, мс):")
+    for name, ms in summary["packages_ms"].items():
+        print(f"  {name:<32} {ms:8.2f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as target:
+            json.dump(summary, target, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
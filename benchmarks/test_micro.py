@@ -0,0 +1,100 @@
+"""Микробенчмарки функций crud, сериализации и ограничения частоты (pytest-benchmark).
+
+    pip install pytest-benchmark
+    python -m pytest benchmarks/test_micro.py --benchmark-autosave
+    python -m pytest benchmarks/test_micro.py --benchmark-compare --benchmark-compare-fail=median:20%
+
+Результаты сохраняются в .benchmarks/ (JSON на прогон) и сравниваются между коммитами.
+"""
+import asyncio
+from typing import List
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app import crud, schemas, serializers  # noqa: E402
+from app.database import create_tables  # noqa: E402
+from app.rate_limit import InMemoryStore, parse_limits  # noqa: E402
+from benchmarks.datagen import DatasetSize, generate  # noqa: E402
+
+REVIEWS = TypeAdapter(List[schemas.ReviewResponse])
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def session_factory(loop):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    loop.run_until_complete(create_tables(bind=engine))
+    loop.run_until_complete(generate(factory, DatasetSize(users=200, games=50, reviews=2000, comments=4000)))
+    yield factory
+    loop.run_until_complete(engine.dispose())
+
+
+@pytest.fixture
+def run(loop, session_factory):
+    """Вызов crud-функции в отдельной сессии: run(crud.get_game_rows, limit=100)."""
+    def call(func, *args, **kwargs):
+        async def scenario():
+            async with session_factory() as db:
+                return await func(db, *args, **kwargs)
+        return loop.run_until_complete(scenario())
+    return call
+
+
+def test_get_game_rows(benchmark, run):
+    assert len(benchmark(run, crud.get_game_rows, limit=50)) == 50
+
+
+def test_get_game_review_rows(benchmark, run):
+    # Игра 1 — самая популярная в синтетических данных
+    assert len(benchmark(run, crud.get_review_rows, game_id=1, limit=100)) == 100
+
+
+def test_get_game_statistics(benchmark, run):
+    assert benchmark(run, crud.get_game_statistics, 1)["total_reviews"] > 0
+
+
+def test_get_comment_rows(benchmark, run):
+    benchmark(run, crud.get_comment_rows, review_id=1, limit=50)
+
+
+def test_get_reviews_orm(benchmark, run):
+    assert len(benchmark(run, crud.get_reviews, limit=100)) == 100
+
+
+def test_serialize_reviews_response_model(benchmark, run):
+    page = list(run(crud.get_reviews, limit=100))
+
+    def serialize():
+        content = REVIEWS.dump_python(REVIEWS.validate_python(page, from_attributes=True), mode="json")
+        return JSONResponse(jsonable_encoder(content)).body
+
+    benchmark(serialize)
+
+
+def test_serialize_reviews_rows(benchmark, run):
+    page = run(crud.get_review_rows, limit=100)
+    benchmark(lambda: serializers.rows_response(page, serializers.REVIEW).body)
+
+
+def test_rate_limit_hit(benchmark):
+    # Проверка лимита на горячем пути: по ведру на клиента, два лимита в правиле
+    store = InMemoryStore()
+    limits = parse_limits("1000000/second,100000000/hour")
+    keys = [f"games:list|ip:10.0.{i // 256}.{i % 256}" for i in range(1000)]
+    position = iter(range(10 ** 9))
+    benchmark(lambda: store.hit(keys[next(position) % 1000], limits))
@@ -0,0 +1,51 @@
+# gunicorn.conf.py
+# Многопроцессный запуск: gunicorn -c gunicorn.conf.py app.main:app
+#
+# Воркеры не делят память: у каждого свои кэши, индекс поиска и рейтинги. Кэши
+# согласуются через канал инвалидации (app/invalidation.py), производные структуры —
+# через outbox (app/events.py).
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Приложение импортируется в мастере до fork: воркеры стартуют быстрее и делят страницы
+# кода. Соединения с БД, пул bcrypt и фоновые задачи создаются уже в startup воркера.
+preload_app = True
+
+# Каталог сокетов канала инвалидации — общий для воркеров этого мастера. Выставляется до
+# импорта приложения, который при preload_app идёт после чтения конфигурации.
+_socket_dir = None
+if os.getenv("INVALIDATION_BACKEND", "auto").lower() in ("auto", "socket") and not os.getenv("INVALIDATION_SOCKET_DIR"):
+    _socket_dir = tempfile.mkdtemp(prefix="game-reviews-")
+    os.environ["INVALIDATION_SOCKET_DIR"] = _socket_dir
+
+
+def on_starting(server):
+    # Схема и снимки (рекомендации, индекс обзоров) готовятся один раз в мастере, а не
+    # наперегонки в каждом воркере: воркеры только загружают снимки и догоняют outbox
+    from app.database import AsyncSessionLocal, async_engine, create_tables
+    from app.recommendations import build_snapshot
+    from app.review_index import refresh_snapshot
+
+    async def prepare():
+        await create_tables()
+        async with AsyncSessionLocal() as db:
+            await build_snapshot(db)
+            (await refresh_snapshot(db)).clear()
+        # Соединения мастера не должны достаться воркерам после fork
+        await async_engine.dispose()
+
+    asyncio.run(prepare())
+
+
+def on_exit(server):
+    if _socket_dir is not None:
+        shutil.rmtree(_socket_dir, ignore_errors=True)
@@ -17,8 +17,20 @@ async function showHome() {
                 </div>
             </div>
         </div>
+        <div class="section">
+            <h2><i class="fas fa-trophy"></i> Лучшие игры</h2>
+            <div id="topRated">Загрузка...</div>
+        </div>
+        <div class="section">
+            <h2><i class="fas fa-fire"></i> В тренде</h2>
+            <div id="trending">Загрузка...</div>
+        </div>
+        <div class="section">
+            <h2><i class="fas fa-comments"></i> Самые обсуждаемые</h2>
+            <div id="mostReviewed">Загрузка...</div>
+        </div>
     `;
-    await loadStats();
+    await loadHome();
 }
 
 async function showGames() {
@@ -73,23 +85,86 @@ function showRegister() {
 }
 
 // Загрузка данных с API
-async function loadStats() {
+// Главная страница строится из одного запроса: рейтинги и счётчики считаются на сервере заранее
+async function loadHome() {
+    const sections = ['gamesCount', 'usersCount', 'topRated', 'trending', 'mostReviewed'];
     try {
-        const gamesResponse = await fetch('/api/games');
-        const usersResponse = await fetch('/api/users');
-        
-        const games = await gamesResponse.json();
-        const users = await usersResponse.json();
-        
-        document.getElementById('gamesCount').textContent = games.length;
-        document.getElementById('usersCount').textContent = users.length;
+        const response = await fetch('/api/games/leaderboards?limit=5');
+        const home = await response.json();
+        const summaries = await loadSummaries(
+            [...home.top_rated, ...home.trending, ...home.most_reviewed].map(entry => entry.game_id)
+        );
+
+        document.getElementById('gamesCount').textContent = home.totals.games;
+        document.getElementById('usersCount').textContent = home.totals.users;
+        document.getElementById('topRated').innerHTML = renderLeaderboard(
+            home.top_rated, summaries, 'Пока нет оценённых игр'
+        );
+        document.getElementById('trending').innerHTML = renderLeaderboard(
+            home.trending, summaries, `Нет обзоров за последние ${home.trending_days} дн.`
+        );
+        document.getElementById('mostReviewed').innerHTML = renderLeaderboard(
+            home.most_reviewed, summaries, 'Пока нет обзоров'
+        );
+    } catch (error) {
+        console.error('Ошибка загрузки главной страницы:', error);
+        sections.forEach(id => {
+            document.getElementById(id).textContent = 'Ошибка';
+        });
+    }
+}
+
+// Счётчики обзоров и комментариев всех карточек — одним запросом вместо запроса на игру
+async function loadSummaries(gameIds) {
+    const ids = [...new Set(gameIds)];
+    if (!ids.length) {
+        return {};
+    }
+    try {
+        const response = await fetch(`/api/games/summary?ids=${ids.join(',')}`);
+        const summaries = await response.json();
+        return Object.fromEntries(summaries.map(summary => [summary.id, summary]));
     } catch (error) {
-        console.error('Ошибка загрузки статистики:', error);
-        document.getElementById('gamesCount').textContent = 'Ошибка';
-        document.getElementById('usersCount').textContent = 'Ошибка';
+        console.error('Ошибка загрузки сводок игр:', error);
+        return {};
     }
 }
 
+function renderLeaderboard(entries, summaries, emptyText) {
+    if (!entries.length) {
+        return `<p>${emptyText}</p>`;
+    }
+    let html = '<div class="games-grid">';
+    entries.forEach((entry, position) => {
+        html += `
+            <div class="game-card">
+                <h3>${position + 1}. ${escapeHtml(entry.title)}</h3>
+                <p>${escapeHtml(entry.genre || 'Жанр не указан')}</p>
+                <p><i class="fas fa-star"></i> ${entry.average_rating} · обзоров: ${entry.review_count}</p>
+                ${renderActivity(summaries[entry.game_id])}
+            </div>
+        `;
+    });
+    html += '</div>';
+    return html;
+}
+
+function renderActivity(summary) {
+    if (!summary) {
+        return '';
+    }
+    const lastActivity = summary.last_activity_at
+        ? ` · ${new Date(summary.last_activity_at + 'Z').toLocaleDateString()}`
+        : '';
+    return `<p><small><i class="fas fa-comments"></i> комментариев: ${summary.comment_count}${lastActivity}</small></p>`;
+}
+
+function escapeHtml(text) {
+    const element = document.createElement('div');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
 async function loadGames() {
     try {
         const response = await fetch('/api/games');
@@ -101,7 +176,7 @@ async function loadGames() {
                 <div class="game-card">
                     <h3>${game.title}</h3>
                     <p>${game.description || 'Нет описания'}</p>
-                    <p><small>ID: ${game.id}</small></p>
+                    <p><small>ID: ${game.id} · обзоров: ${game.review_count} · комментариев: ${game.comment_count}</small></p>
                 </div>
             `;
         });
@@ -0,0 +1,89 @@
+# tests/conftest.py
+# Общие фикстуры: своя SQLite-база на каждый тест (в tmp_path), клиент с подменённой
+# сессией БД и сброс синглтонов процесса (кэши, ограничитель частоты) между тестами.
+from dataclasses import dataclass
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.auth import principal_cache
+from app.database import Base, get_db
+from app.main import app
+from app.rate_limit import rate_limiter
+from app.response_cache import response_cache
+
+
+@dataclass
+class Database:
+    url: str
+    sync_engine: Engine
+    engine: AsyncEngine
+    Session: async_sessionmaker
+    SyncSession: sessionmaker
+
+
+def make_database(path) -> Database:
+    """Пустая схема в SQLite-файле path: sync-движок для подготовки данных и async — для приложения."""
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    return Database(
+        url=f"sqlite+aiosqlite:///{path}",
+        sync_engine=sync_engine,
+        engine=engine,
+        Session=async_sessionmaker(engine, autoflush=False, expire_on_commit=False),
+        SyncSession=sessionmaker(bind=sync_engine),
+    )
+
+
+@pytest.fixture
+def database_factory(tmp_path):
+    """make(name) — ещё одна пустая база в tmp_path (например, реплика)."""
+    created = []
+
+    def make(name: str) -> Database:
+        db = make_database(tmp_path / f"{name}.db")
+        created.append(db)
+        return db
+
+    yield make
+    for db in created:
+        db.sync_engine.dispose()
+
+
+@pytest.fixture
+def database(database_factory) -> Database:
+    return database_factory("test")
+
+
+@pytest.fixture
+def client(database) -> TestClient:
+    """TestClient приложения, у которого get_db отдаёт сессии тестовой базы."""
+    async def override_get_db():
+        async with database.Session() as db:
+            yield db
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """Кэши и корзины ограничителя частоты живут в процессе: тесты не должны видеть чужие."""
+    response_cache.clear()
+    principal_cache.clear()
+    rate_limiter.reset()
+    yield
+    response_cache.clear()
+    principal_cache.clear()
+    rate_limiter.reset()
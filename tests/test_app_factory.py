@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.settings import Settings
+
+
+def test_import_is_quiet_and_defers_heavy_dependencies():
+    probe = (
+        "import json, sys; import app.main; "
+        "print(json.dumps(sorted(m for m in ('jose', 'passlib', 'jinja2', 'uvicorn') if m in sys.modules)))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines() == ["[]"]
+
+
+def test_routers_come_from_settings(tmp_path):
+    (tmp_path / "index.html").write_text("<h1>Hello</h1>", encoding="utf-8")
+    settings = Settings(templates_dir=str(tmp_path), routers=["app.routers.games:router=/api/games"])
+    app = create_app(settings)
+    paths = {route.path for route in app.routes}
+    assert "/api/games/{game_id}" in paths and "/api/auth/login" not in paths
+
+    client = TestClient(app)
+    assert client.get("/api/health").json()["status"] == "ok"
+    first = client.get("/")
+    assert first.status_code == 200 and "Hello" in first.text
+    # Шаблоны собираются один раз на приложение и без DEBUG не перечитываются с диска
+    templates = app.state.templates
+    (tmp_path / "index.html").write_text("<h1>Changed</h1>", encoding="utf-8")
+    assert "Hello" in client.get("/").text
+    assert app.state.templates is templates
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("APP_ROUTERS", "app.routers.users:router=/api/users, app.routers.reviews:batch_router=/api")
+    monkeypatch.setenv("CORS_ORIGINS", "https://example.com")
+    settings = Settings.from_env()
+    assert settings.router_specs() == [
+        ("app.routers.users", "router", "/api/users"), ("app.routers.reviews", "batch_router", "/api"),
+    ]
+    assert settings.cors_origins == ["https://example.com"]
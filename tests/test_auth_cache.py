@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from app import models
+from app.auth import create_access_token, principal_cache
+from app.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    clock = FakeClock()
+    cache = TTLCache(max_size=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # вытесняет b — он использовался давнее всего
+    assert "b" not in cache and cache.get("a") == 1
+
+    cache.set("short", 4, ttl=1)
+    clock.now = 2
+    assert cache.get("short") is None
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_current_user_is_cached_and_invalidated_on_deactivation(client, database):
+    with database.SyncSession() as db:
+        user = models.User(username="cached", email="cached@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    token = create_access_token({"sub": "cached@example.com"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(database.engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/api/users/me", headers=headers).json()["id"] == user_id
+        first = len(statements)
+        assert client.get("/api/users/me", headers=headers).status_code == 200
+        assert len(statements) == first  # повторный запрос не ходит в БД
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", listener)
+
+    with database.SyncSession() as db:
+        db.get(models.User, user_id).is_active = False
+        db.commit()
+
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+
+def test_deactivation_invalidates_only_after_commit(client, database):
+    with database.SyncSession() as db:
+        user = models.User(username="pending", email="pending@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    token = create_access_token({"sub": "pending@example.com"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    with database.SyncSession() as db:
+        db.get(models.User, user_id).is_active = False
+        db.flush()
+        assert token in principal_cache  # до commit кэш не трогаем
+        db.rollback()
+    assert token in principal_cache
+
+    with database.SyncSession() as db:
+        db.get(models.User, user_id).is_active = False
+        db.commit()
+    assert token not in principal_cache
+
+
+def test_invalid_token_is_rejected(client):
+    response = client.get("/api/users/me", headers={"Authorization": "Bearer garbage"})
+    assert response.status_code == 401
@@ -1,58 +1,52 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.main import app
-from app.database import Base, get_db
-
-# Тестовая база данных
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Создаем тестовые таблицы
-Base.metadata.create_all(bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
-
-def test_read_root():
-    response = client.get("/")
-    assert response.status_code == 200
-    assert "message" in response.json()
 
-def test_health_check():
-    response = client.get("/health")
+USER = {
+    "username": "testuser",
+    "email": "test@example.com",
+    "password": "testpassword123"
+}
+
+
+@pytest.fixture
+def registered(client):
+    response = client.post("/api/auth/register", json=USER)
     assert response.status_code == 200
-    assert response.json()["status"] == "healthy"
+    return response.json()
+
 
-def test_register_user():
-    user_data = {
-        "username": "testuser",
-        "email": "test@example.com",
-        "password": "testpassword123"
+@pytest.fixture
+def auth_headers(client, registered):
+    login_data = {
+        "username": USER["email"],
+        "password": USER["password"]
     }
-    response = client.post("/api/auth/register", json=user_data)
+    response = client.post("/api/auth/login", data=login_data)
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_read_root(client):
+    response = client.get("/")
     assert response.status_code == 200
-    data = response.json()
-    assert data["username"] == user_data["username"]
-    assert data["email"] == user_data["email"]
-    assert "id" in data
+    assert response.headers["content-type"].startswith("text/html")
 
-def test_login_user():
+
+def test_health_check(client):
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+def test_register_user(registered):
+    assert registered["username"] == USER["username"]
+    assert registered["email"] == USER["email"]
+    assert "id" in registered
+
+
+def test_login_user(client, registered):
     login_data = {
-        "username": "test@example.com",
-        "password": "testpassword123"
+        "username": USER["email"],
+        "password": USER["password"]
     }
     response = client.post("/api/auth/login", data=login_data)
     assert response.status_code == 200
@@ -60,12 +54,14 @@ def test_login_user():
     assert "access_token" in data
     assert data["token_type"] == "bearer"
 
-def test_get_games():
+
+def test_get_games(client):
     response = client.get("/api/games")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_create_game_without_auth():
+
+def test_create_game_without_auth(client):
     game_data = {
         "title": "Test Game",
         "genre": "RPG",
@@ -74,37 +70,19 @@ def test_create_game_without_auth():
     response = client.post("/api/games", json=game_data)
     assert response.status_code == 401  # Unauthorized
 
-@pytest.fixture
-def auth_headers():
-    # Регистрируем и логиним пользователя
-    user_data = {
-        "username": "testuser2",
-        "email": "test2@example.com",
-        "password": "testpassword123"
-    }
-    client.post("/api/auth/register", json=user_data)
-    
-    login_data = {
-        "username": "test2@example.com",
-        "password": "testpassword123"
-    }
-    response = client.post("/api/auth/login", data=login_data)
-    token = response.json()["access_token"]
-    
-    return {"Authorization": f"Bearer {token}"}
 
-def test_create_game_with_auth(auth_headers):
+def test_create_game_with_auth(client, auth_headers):
     game_data = {
         "title": "Auth Test Game",
         "genre": "Strategy",
         "release_year": 2024
     }
     response = client.post(
-        "/api/games", 
-        json=game_data, 
+        "/api/games",
+        json=game_data,
         headers=auth_headers
     )
     assert response.status_code == 200
     data = response.json()
     assert data["title"] == game_data["title"]
-    assert data["genre"] == game_data["genre"]
\ No newline at end of file
+    assert data["genre"] == game_data["genre"]
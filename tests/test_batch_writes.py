@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app import models
+from app.auth import create_access_token
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        user = models.User(username="batcher", email="batcher@example.com", hashed_password="x")
+        games = [models.Game(title=f"Batch {i}") for i in range(3)]
+        db.add_all([user, *games])
+        db.commit()
+        return {"game_ids": [game.id for game in games]}
+
+
+@pytest.fixture
+def client(client, seeded):
+    token = create_access_token({"sub": "batcher@example.com"}, expires_delta=timedelta(minutes=5))
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def count(database):
+    def count(model):
+        with database.SyncSession() as db:
+            return db.scalar(select(func.count(model.id)))
+    return count
+
+
+def review(game_id, rating=7):
+    return {"game_id": game_id, "content": "Batch review content", "rating": rating}
+
+
+def test_review_batch_checks_games_in_one_query(client, seeded, database):
+    items = [review(game_id, rating) for rating in (3, 8) for game_id in seeded["game_ids"]]
+    client.get("/api/users/me")  # прогреваем кэш пользователя
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(database.engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = client.post("/api/reviews:batch", json={"items": items})
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 6 and body["failed"] == 0
+    assert [result["status"] for result in body["results"]] == ["created"] * 6
+    assert sum("FROM games" in statement for statement in statements) == 1
+
+    stats = client.get(f"/api/games/{seeded['game_ids'][0]}/stats").json()
+    assert stats["total_reviews"] == 2 and stats["average_rating"] == 5.5
+
+
+def test_atomic_batch_saves_nothing_on_failure(client, seeded, count):
+    game_id = seeded["game_ids"][0]
+    items = [review(game_id), review(999999), {"game_id": game_id, "content": "short", "rating": 5}]
+
+    response = client.post("/api/reviews:batch", json={"items": items})
+    assert response.status_code == 422
+    assert [result["status"] for result in response.json()["results"]] == ["skipped", "not_found", "invalid"]
+    assert count(models.Review) == 0
+
+    partial = client.post("/api/reviews:batch", json={"items": items, "atomic": False}).json()
+    assert (partial["created"], partial["failed"]) == (1, 2)
+    assert partial["results"][0]["id"] is not None
+    assert count(models.Review) == 1
+
+
+def test_comment_batch(client, seeded):
+    created = client.post("/api/reviews:batch", json={"items": [review(seeded["game_ids"][0])]}).json()
+    review_id = created["results"][0]["id"]
+
+    comments = [{"content": f"comment {i}"} for i in range(5)]
+    body = client.post(f"/api/reviews/{review_id}/comments:batch", json={"items": comments}).json()
+    assert body["created"] == 5
+    assert len(client.get(f"/api/reviews/{review_id}/comments").json()) == 5
+
+    assert client.post("/api/reviews/999999/comments:batch", json={"items": comments}).status_code == 404
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import bulk, crud, models
+from app.auth import create_access_token
+
+
+@pytest.fixture
+def user_id(database):
+    with database.SyncSession() as db:
+        user = models.User(username="importer", email="importer@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+async def lines_of(text):
+    async def chunks():
+        # Мелкие куски проверяют склейку строк на границах
+        data = text.encode()
+        for start in range(0, len(data), 7):
+            yield data[start:start + 7]
+
+    async for line in bulk.iter_lines(chunks()):
+        yield line
+
+
+def test_game_import_upserts_by_title_and_reports_row_errors(database, user_id):
+    ndjson = "\n".join([
+        json.dumps({"title": "Alpha", "genre": "RPG"}),
+        json.dumps({"title": "Beta", "release_year": 1800}),
+        "not json",
+        json.dumps({"title": "Gamma"}),
+    ])
+    csv_text = 'title,genre,description\nAlpha,Action,"two\nlines, ""quoted"""\nDelta,,\n'
+
+    async def scenario():
+        async with database.Session() as db:
+            first = await bulk.import_games(db, bulk.iter_records(lines_of(ndjson), "ndjson"), batch_size=2)
+            second = await bulk.import_games(db, bulk.iter_records(lines_of(csv_text), "csv"))
+            games = {game.title: game for game in (await db.scalars(select(models.Game))).all()}
+        return first, second, games
+
+    first, second, games = asyncio.run(scenario())
+    assert (first.processed, first.inserted, first.updated, first.failed) == (4, 2, 0, 2)
+    assert [error["row"] for error in first.errors] == [2, 3]
+    assert (second.inserted, second.updated) == (1, 1)
+    assert set(games) == {"Alpha", "Gamma", "Delta"}
+    assert games["Alpha"].genre == "Action" and games["Alpha"].description == 'two\nlines, "quoted"'
+    assert games["Delta"].genre is None
+
+
+def test_review_import_validates_references_and_keeps_stats(database, user_id):
+    async def scenario():
+        async with database.Session() as db:
+            game = models.Game(title="Reviewed")
+            db.add(game)
+            await db.commit()
+            rows = [
+                {"game_id": game.id, "user_id": user_id, "content": "First import text", "rating": 4},
+                {"game_id": game.id + 100, "user_id": user_id, "content": "Unknown game text", "rating": 5},
+                {"game_id": game.id, "user_id": user_id, "content": "Too short", "rating": 5},
+            ]
+            text = "\n".join(json.dumps(row) for row in rows)
+            report = await bulk.import_reviews(db, bulk.iter_records(lines_of(text), "ndjson"))
+
+            again = json.dumps({"game_id": game.id, "user_id": user_id, "content": "Updated import text", "rating": 9})
+            second = await bulk.import_reviews(db, bulk.iter_records(lines_of(again), "ndjson"))
+            count = await db.scalar(select(func.count(models.Review.id)))
+            stats = await crud.get_game_statistics(db, game.id)
+            review_count = await db.scalar(select(models.Game.review_count).where(models.Game.id == game.id))
+        return report, second, count, stats, review_count
+
+    report, second, count, stats, review_count = asyncio.run(scenario())
+    assert (report.inserted, report.failed) == (1, 2)
+    errors = {error["row"]: error["error"] for error in report.errors}
+    assert "not found" in errors[2] and "content" in errors[3]
+    assert (second.inserted, second.updated) == (0, 1)
+    assert count == 1
+    assert stats["total_reviews"] == 1 and stats["average_rating"] == 9
+    # Повторный импорт переносит оценку в гистограмме, а не добавляет новую
+    assert stats["rating_histogram"][4] == 0 and stats["rating_histogram"][9] == 1
+    assert review_count == 1
+
+
+def test_api_import_and_streaming_export_round_trip(client, user_id):
+    token = create_access_token({"sub": "importer@example.com"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+    body = "\n".join(json.dumps({"title": f"Game {i}", "release_year": 2000 + i}) for i in range(5))
+
+    assert client.post("/api/games/import", content=body).status_code == 401
+    report = client.post("/api/games/import", content=body, headers=headers).json()
+    assert report["inserted"] == 5 and report["failed"] == 0
+
+    exported = client.get("/api/games/export")
+    assert exported.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in exported.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Game {i}" for i in range(5)]
+
+    # Выгрузка импортируется обратно как обновление тех же записей
+    again = client.post("/api/games/import", content=exported.text, headers=headers).json()
+    assert (again["inserted"], again["updated"]) == (0, 5)
+
+    csv_export = client.get("/api/games/export", params={"format": "csv"}).text.splitlines()
+    assert csv_export[0] == "id,title,description,genre,release_year,developer,created_at"
+    assert len(csv_export) == 6
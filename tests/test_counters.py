@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select, text, update
+
+from app import crud, models, schemas
+from app.database import _create_all
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        users = [models.User(username=f"counter{i}", email=f"counter{i}@example.com", hashed_password="x") for i in range(3)]
+        games = [models.Game(title="Counted"), models.Game(title="Quiet")]
+        db.add_all(users + games)
+        db.commit()
+        return [user.id for user in users], [game.id for game in games]
+
+
+async def _game_counters(db, game_id):
+    game = models.Game
+    return tuple((await db.execute(select(game.review_count, game.comment_count).where(game.id == game_id))).one())
+
+
+async def _review_comments(db, review_id):
+    return await db.scalar(select(models.Review.comment_count).where(models.Review.id == review_id))
+
+
+def test_counters_follow_writes(database, seeded):
+    user_ids, (game_id, _) = seeded
+
+    async def scenario():
+        async with database.Session() as db:
+            reviews = [
+                await crud.create_review(
+                    db, schemas.ReviewCreate(game_id=game_id, content="Long enough review", rating=7), user_id=user_id
+                )
+                for user_id in user_ids[:2]
+            ]
+            assert reviews[0].comment_count == 0
+            await crud.create_comment(db, schemas.CommentCreate(review_id=reviews[0].id, content="first"), user_ids[2])
+            await crud.create_comments(
+                db,
+                [schemas.CommentCreate(review_id=reviews[1].id, content=content) for content in ("a", "b", "c")],
+                user_id=user_ids[2],
+            )
+            assert await _game_counters(db, game_id) == (2, 4)
+            assert await _review_comments(db, reviews[1].id) == 3
+
+            comment_id = await db.scalar(select(models.Comment.id).where(models.Comment.review_id == reviews[0].id))
+            assert await crud.delete_comment(db, comment_id, user_id=user_ids[2])
+            assert await _game_counters(db, game_id) == (2, 3)
+            assert await _review_comments(db, reviews[0].id) == 0
+
+            # Удаление обзора убирает и его комментарии из счётчика игры
+            assert await crud.delete_review(db, reviews[1].id, user_id=user_ids[1])
+            assert await _game_counters(db, game_id) == (1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_fixes_counter_drift(database, seeded):
+    user_ids, (game_id, _) = seeded
+
+    async def scenario():
+        async with database.Session() as db:
+            review = await crud.create_review(
+                db, schemas.ReviewCreate(game_id=game_id, content="Long enough review", rating=5), user_id=user_ids[0]
+            )
+            await crud.create_comment(db, schemas.CommentCreate(review_id=review.id, content="hi"), user_ids[1])
+            await db.execute(update(models.Game).values(review_count=50, comment_count=50))
+            await db.execute(update(models.Review).values(comment_count=50))
+            await db.commit()
+
+            await crud.rebuild_game_statistics(db, game_id=game_id)
+            assert await _game_counters(db, game_id) == (1, 1)
+            assert await _review_comments(db, review.id) == 1
+
+    asyncio.run(scenario())
+
+
+def test_create_tables_backfills_counters_in_existing_database(tmp_path):
+    path = tmp_path / "legacy.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    with sync_engine.begin() as conn:
+        # Схема до появления счётчиков
+        for statement in (
+            "CREATE TABLE games (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, "
+            "genre VARCHAR(100), release_year INTEGER, developer VARCHAR(100), created_at DATETIME)",
+            "CREATE TABLE reviews (id INTEGER PRIMARY KEY, game_id INTEGER, user_id INTEGER, "
+            "content TEXT NOT NULL, rating INTEGER NOT NULL, created_at DATETIME)",
+            "CREATE TABLE comments (id INTEGER PRIMARY KEY, review_id INTEGER, user_id INTEGER, "
+            "content TEXT NOT NULL, created_at DATETIME)",
+            "INSERT INTO games VALUES (1, 'Old', NULL, NULL, NULL, NULL, '2020-01-01 00:00:00')",
+            "INSERT INTO reviews VALUES (1, 1, 1, 'Long enough review', 8, '2021-01-01 00:00:00')",
+            "INSERT INTO reviews VALUES (2, 1, 1, 'Long enough review', 6, '2021-02-01 00:00:00')",
+            "INSERT INTO comments VALUES (1, 2, 1, 'late', '2022-03-01 00:00:00')",
+        ):
+            conn.execute(text(statement))
+
+    with sync_engine.begin() as conn:
+        _create_all(conn)
+
+    with sync_engine.connect() as conn:
+        game = conn.execute(text("SELECT review_count, comment_count, last_activity_at FROM games")).one()
+        review = conn.execute(text("SELECT comment_count FROM reviews WHERE id = 2")).one()
+    sync_engine.dispose()
+    assert tuple(game[:2]) == (2, 1) and game[2].startswith("2022-03-01")
+    assert review[0] == 1
+
+
+def test_summary_endpoint(client, database, seeded):
+    user_ids, (game_id, quiet_id) = seeded
+
+    async def scenario():
+        async with database.Session() as db:
+            review = await crud.create_review(
+                db, schemas.ReviewCreate(game_id=game_id, content="Long enough review", rating=9), user_id=user_ids[0]
+            )
+            await crud.create_comment(db, schemas.CommentCreate(review_id=review.id, content="agree"), user_ids[1])
+
+    asyncio.run(scenario())
+
+    response = client.get(f"/api/games/summary?ids={quiet_id},{game_id},999")
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body] == [quiet_id, game_id]
+    assert body[0]["review_count"] == 0 and body[0]["average_rating"] == 0
+    assert body[1]["review_count"] == 1 and body[1]["comment_count"] == 1
+    assert body[1]["average_rating"] == 9.0
+
+    game = client.get(f"/api/games/{game_id}").json()
+    assert game["review_count"] == 1 and game["comment_count"] == 1
+
+    assert client.get("/api/games/summary?ids=1,x").status_code == 400
+    assert client.get("/api/games/summary?ids=" + ",".join(map(str, range(101)))).status_code == 400
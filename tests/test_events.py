@@ -0,0 +1,109 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app import events, models
+from app.auth import create_access_token
+from app.events import EventBus, event_bus
+from app.review_index import review_index
+
+
+@pytest.fixture(autouse=True)
+def seeded(database):
+    with database.SyncSession() as db:
+        db.add_all([
+            models.User(username="publisher", email="publisher@example.com", hashed_password="x"),
+            models.Game(title="Evented"),
+        ])
+        db.commit()
+
+
+def publish(database, *batch):
+    with database.SyncSession() as db:
+        for event in batch:
+            db.add(models.OutboxEvent(event_type=type(event).__name__, payload=events.json.dumps(events.asdict(event))))
+        db.commit()
+
+
+def test_review_write_is_applied_to_index_through_outbox(client, database):
+    review_index.clear()
+    try:
+        asyncio.run(_reset(database, event_bus))
+        token = create_access_token({"sub": "publisher@example.com"}, expires_delta=timedelta(minutes=5))
+        client.headers["Authorization"] = f"Bearer {token}"
+        review = client.post("/api/reviews/", json={"game_id": 1, "content": "Outbox delivered review", "rating": 6})
+        assert review.status_code == 200
+
+        # Ответ вернулся после commit; индекс обновит потребитель
+        assert client.get("/api/reviews/search", params={"q": "outbox"}).json() == []
+        with database.SyncSession() as db:
+            assert db.scalar(select(func.count(models.OutboxEvent.id))) == 1
+
+        assert asyncio.run(event_bus.process_pending(database.Session)) == 1
+        hits = client.get("/api/reviews/search", params={"q": "outbox"}).json()
+        assert [hit["review"]["id"] for hit in hits] == [review.json()["id"]]
+
+        client.delete(f"/api/reviews/{review.json()['id']}")
+        asyncio.run(event_bus.process_pending(database.Session))
+        assert client.get("/api/reviews/search", params={"q": "outbox"}).json() == []
+    finally:
+        review_index.clear()
+
+
+async def _reset(database, bus):
+    async with database.Session() as db:
+        await bus.reset_position(db)
+
+
+def test_failed_batches_are_retried_and_poison_events_isolated(database):
+    bus = EventBus(retry_delay=0, max_attempts=2)
+    delivered, calls = [], []
+
+    @bus.subscribe(events.CommentCreated)
+    async def flaky(db, batch):
+        calls.append(len(batch))
+        if len(calls) == 1 or any(event.comment_id == 2 for event in batch):
+            raise RuntimeError("boom")
+        delivered.extend(event.comment_id for event in batch)
+
+    @bus.subscribe(events.CommentCreated, events.GameDeleted)
+    async def steady(db, batch):
+        delivered.extend(("steady", type(event).__name__) for event in batch)
+
+    asyncio.run(_reset(database, bus))
+    publish(database, events.CommentCreated(comment_id=1, review_id=1), events.GameDeleted(game_id=5))
+    publish(database, events.CommentCreated(comment_id=3, review_id=1))
+
+    assert asyncio.run(bus.process_pending(database.Session)) == 3
+    # Первая попытка упала, повтор прошёл; второй подписчик получил события один раз
+    assert calls == [2, 2]
+    assert delivered.count(1) == 1 and delivered.count(3) == 1
+    assert delivered.count(("steady", "GameDeleted")) == 1
+
+    delivered.clear()
+    publish(database, events.CommentCreated(comment_id=2, review_id=1), events.CommentCreated(comment_id=4, review_id=1))
+    asyncio.run(bus.process_pending(database.Session))
+    assert [id for id in delivered if isinstance(id, int)] == [4]
+    assert asyncio.run(bus.process_pending(database.Session)) == 0
+
+
+def test_late_commit_into_id_gap_is_delivered(database):
+    bus = EventBus()
+    seen = []
+
+    @bus.subscribe(events.GameDeleted)
+    async def collect(db, batch):
+        seen.extend(event.game_id for event in batch)
+
+    asyncio.run(_reset(database, bus))
+    with database.SyncSession() as db:
+        db.add(models.OutboxEvent(id=2, event_type="GameDeleted", payload='{"game_id": 2}'))
+        db.commit()
+    asyncio.run(bus.process_pending(database.Session))
+    with database.SyncSession() as db:
+        db.add(models.OutboxEvent(id=1, event_type="GameDeleted", payload='{"game_id": 1}'))
+        db.commit()
+    asyncio.run(bus.process_pending(database.Session))
+    assert seen == [2, 1]
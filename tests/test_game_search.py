@@ -0,0 +1,67 @@
+import asyncio
+
+from app import crud, game_search, schemas
+from app.database import create_tables
+
+GAMES = [
+    schemas.GameCreate(title="Elden Ring", genre="Action RPG", developer="FromSoftware"),
+    schemas.GameCreate(title="Dark Souls III", genre="Action RPG", developer="FromSoftware"),
+    schemas.GameCreate(title="Ring Fit Adventure", genre="Fitness", developer="Nintendo"),
+    schemas.GameCreate(title="Stardew Valley", genre="Simulation", developer="ConcernedApe"),
+    schemas.GameCreate(title="Tetris Effect", genre="Puzzle", developer="Ring Studio"),
+]
+
+
+def titles(games):
+    return [game.title for game in games]
+
+
+def test_search_ranks_prefix_matches_and_follows_writes(database):
+    async def scenario():
+        await create_tables(database.engine)
+
+        async with database.Session() as db:
+            created = [await crud.create_game(db, game, user_id=1) for game in GAMES]
+            assert await game_search._backend(db) == "fts5"
+
+            # Префиксный поиск (search-as-you-type)
+            assert set(titles(await crud.get_games(db, search="fromsof"))) == {"Elden Ring", "Dark Souls III"}
+            # Совпадение в названии весит больше, чем в жанре/разработчике
+            ranked = titles(await crud.get_games(db, search="ring"))
+            assert set(ranked[:2]) == {"Elden Ring", "Ring Fit Adventure"}
+            assert ranked[2:] == ["Tetris Effect"]
+            assert titles(await crud.get_games(db, search="elden ri")) == ["Elden Ring"]
+
+            await crud.update_game(db, created[3].id, schemas.GameBase(title="Stardew Valley", developer="FromSoftware"))
+            assert "Stardew Valley" in titles(await crud.get_games(db, search="fromsoftware"))
+
+            await crud.delete_game(db, created[0].id)
+            assert titles(await crud.get_games(db, search="elden")) == []
+
+            assert await crud.get_games(db, search="!!!") == []
+
+    asyncio.run(scenario())
+
+
+def test_counter_updates_do_not_touch_fts_index(database):
+    async def scenario():
+        async with database.engine.begin() as conn:
+            # Триггер старой версии (без списка колонок) заменяется при create_tables
+            await conn.exec_driver_sql(
+                "CREATE TRIGGER games_fts_au AFTER UPDATE ON games BEGIN SELECT 1; END"
+            )
+        await create_tables(database.engine)
+
+        async with database.engine.connect() as conn:
+            trigger = (await conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'games_fts_au'"
+            )).scalar()
+        assert "UPDATE OF title, genre, developer" in trigger
+
+        async with database.Session() as db:
+            game = await crud.create_game(db, GAMES[0], user_id=1)
+            await crud._bump_game(db, game.id, reviews=1)
+            await db.commit()
+            assert titles(await crud.get_games(db, search="elden")) == ["Elden Ring"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app import crud, models, schemas
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        users = [models.User(username=f"rater{i}", email=f"rater{i}@example.com", hashed_password="x") for i in range(3)]
+        game = models.Game(title="Stats Game")
+        db.add_all(users + [game])
+        db.commit()
+        return [user.id for user in users], game.id
+
+
+def test_statistics_follow_review_writes(database, seeded):
+    user_ids, game_id = seeded
+
+    async def scenario():
+        async with database.Session() as db:
+            assert (await crud.get_game_statistics(db, game_id))["total_reviews"] == 0
+
+            reviews = []
+            for user_id, rating in zip(user_ids, (10, 6, 8)):
+                review = schemas.ReviewCreate(game_id=game_id, content="Long enough review", rating=rating)
+                reviews.append(await crud.create_review(db, review, user_id=user_id))
+
+            stats = await crud.get_game_statistics(db, game_id)
+            assert stats["total_reviews"] == 3
+            assert stats["average_rating"] == 8.0
+            assert stats["rating_histogram"][10] == 1 and stats["rating_histogram"][6] == 1
+
+            await crud.update_review(
+                db, reviews[1].id, schemas.ReviewBase(content="Changed my mind here", rating=9), user_id=user_ids[1]
+            )
+            stats = await crud.get_game_statistics(db, game_id)
+            assert stats["average_rating"] == 9.0
+            assert stats["rating_histogram"][6] == 0 and stats["rating_histogram"][9] == 1
+
+            await crud.delete_review(db, reviews[0].id, user_id=user_ids[0])
+            stats = await crud.get_game_statistics(db, game_id)
+            assert stats["total_reviews"] == 2
+            assert stats["average_rating"] == 8.5
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_fixes_drift(database, seeded):
+    user_ids, game_id = seeded
+
+    async def scenario():
+        async with database.Session() as db:
+            for user_id, rating in zip(user_ids, (4, 5, 9)):
+                review = schemas.ReviewCreate(game_id=game_id, content="Long enough review", rating=rating)
+                await crud.create_review(db, review, user_id=user_id)
+
+            # Портим агрегаты, как если бы запись прошла мимо crud
+            await db.execute(
+                update(models.GameRatingStats)
+                .where(models.GameRatingStats.game_id == game_id)
+                .values(review_count=100, rating_sum=1, rating_4=0)
+            )
+            await db.commit()
+
+            assert await crud.rebuild_game_statistics(db) == 1
+            db.expire_all()
+            stats = await crud.get_game_statistics(db, game_id)
+            assert stats["total_reviews"] == 3
+            assert stats["average_rating"] == 6.0
+            assert stats["rating_histogram"][4] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+import json
+import logging
+import re
+
+import fastapi.routing
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import instrumentation, metrics, models
+
+
+@pytest.fixture
+def client(client, database):
+    with database.SyncSession() as db:
+        user = models.User(username="timer", email="timer@example.com", hashed_password="x")
+        game = models.Game(title="Timed")
+        db.add_all([user, game])
+        db.flush()
+        db.add(models.Review(game_id=game.id, user_id=user.id, content="Instrumented review", rating=7))
+        db.commit()
+    return client
+
+
+def test_server_timing_counts_queries_of_the_request(client):
+    response = client.get("/api/games/1/reviews")
+    timing = response.headers["server-timing"]
+    queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing).group(1))
+    assert queries >= 1
+    assert re.search(r"serialize;dur=[\d.]+", timing) and re.search(r"handler;dur=[\d.]+", timing)
+
+    # response_model-путь тоже учитывается в serialize (через TimedRoute, без подмены FastAPI)
+    timing = client.get("/api/games/1").headers["server-timing"]
+    assert float(re.search(r"serialize;dur=([\d.]+)", timing).group(1)) > 0
+    assert fastapi.routing.serialize_response.__module__ == "fastapi.routing"
+
+    exposition = metrics.render_latest()
+    assert 'http_request_db_queries_count{method="GET",route="/api/games/{game_id}/reviews"}' in exposition
+    assert "http_request_serialization_seconds_bucket" in exposition
+
+
+def test_slow_queries_are_logged_with_route_and_parameters(client, monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        client.get("/api/games/1")
+
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.name == "app.slow_queries"]
+    slow = [record for record in records if record["event"] == "slow_query"]
+    assert slow and slow[0]["route"] == "/api/games/{game_id}" and slow[0]["method"] == "GET"
+    assert "FROM games" in slow[0]["statement"] and "1" in slow[0]["parameters"]
+
+
+def test_failed_statement_does_not_leak_its_start_time(database):
+    with database.sync_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info.get("query_started") == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_started"] == []
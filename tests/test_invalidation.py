@@ -0,0 +1,121 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.auth import Principal, cache_principal, principal_cache
+from app.invalidation import InvalidationChannel, PostgresBackend, SocketBackend, invalidation_channel
+from app.response_cache import response_cache
+
+
+def test_socket_backend_broadcasts_to_other_workers(tmp_path):
+    async def scenario():
+        first, second, third = InvalidationChannel(), InvalidationChannel(), InvalidationChannel()
+        received = {"first": [], "second": [], "third": []}
+        for name, channel in (("first", first), ("second", second), ("third", third)):
+            channel.handler("tags")(lambda *tags, name=name: received[name].append(tags))
+            await channel.start("", backend=SocketBackend(str(tmp_path), name=name))
+        try:
+            # Сообщения одного шага цикла уходят одним пакетом
+            first.publish("tags", "game:1")
+            first.publish("tags", "review:2", "game-reviews:1")
+            await asyncio.sleep(0.05)
+            # Остановленный воркер убирает свой сокет и больше не получает сообщений
+            await third.stop()
+            second.publish("tags", "game:3")
+            await asyncio.sleep(0.05)
+        finally:
+            await first.stop()
+            await second.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received["first"] == [("game:3",)]
+    assert received["second"] == [("game:1",), ("review:2", "game-reviews:1")]
+    assert received["third"] == [("game:1",), ("review:2", "game-reviews:1")]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_remote_messages_invalidate_local_caches():
+    invalidation_channel.origin = "this-worker"
+    generation = response_cache.backend.generation("game:42")
+    cache_principal("token", Principal(7, "remote", "remote@example.com", True, datetime.utcnow()))
+
+    invalidation_channel.receive(json.dumps({"origin": "this-worker", "messages": [["tags", "game:42"]]}))
+    assert response_cache.backend.generation("game:42") == generation
+
+    invalidation_channel.receive(json.dumps({
+        "origin": "other-worker", "messages": [["tags", "game:42"], ["user", 7], ["unknown"]],
+    }))
+    assert response_cache.backend.generation("game:42") != generation
+    assert principal_cache.get("token") is None
+    invalidation_channel.origin = None
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.listeners = []
+        self.on_terminate = []
+
+    def add_termination_listener(self, callback):
+        self.on_terminate.append(callback)
+
+    async def add_listener(self, channel, callback):
+        self.listeners.append(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    def drop(self):
+        self.closed = True
+        for callback in self.on_terminate:
+            callback(self)
+
+    def terminate(self):
+        self.closed = True
+
+    async def close(self):
+        self.closed = True
+
+
+def test_postgres_listener_reconnects_and_resyncs(monkeypatch):
+    from app import invalidation
+
+    monkeypatch.setattr(invalidation, "INVALIDATION_PG_RECONNECT_MIN_SECONDS", 0.01)
+
+    async def scenario():
+        backend = PostgresBackend("postgresql://user@localhost/db")
+        connections, attempts = [], []
+
+        async def open_connection():
+            attempts.append(len(attempts))
+            if len(attempts) == 2:
+                raise OSError("database is restarting")
+            connections.append(FakeConnection())
+            return connections[-1]
+
+        backend._open = open_connection
+        channel = InvalidationChannel()
+        resynced, received = [], []
+        channel.on_resync(lambda: resynced.append(True))
+        channel.handler("tags")(lambda *tags: received.append(tags))
+        await channel.start("", backend=backend)
+        try:
+            connections[0].drop()
+            await asyncio.sleep(0.1)
+            # Первая попытка не удалась, вторая восстановила LISTEN на новом соединении
+            assert len(attempts) == 3 and len(connections) == 2
+            assert resynced == [True]
+            packet = json.dumps({"origin": "other", "messages": [["tags", "game:1"]]})
+            connections[1].listeners[0](connections[1], 1, "cache_invalidation", packet)
+            assert received == [("game:1",)]
+        finally:
+            await channel.stop()
+
+    asyncio.run(scenario())
+
+
+def test_resync_outdates_entries_being_built():
+    generations = response_cache.generations(["game:7"])
+    invalidation_channel.resync()
+    assert response_cache.generations(["game:7"]) != generations
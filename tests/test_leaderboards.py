@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, models, schemas
+from app.events import ReviewCreated
+from app.leaderboards import Leaderboards, apply_events, leaderboards
+
+
+@pytest.fixture
+def seeded(database):
+    """Три игры: много средних оценок, одна отличная (мало обзоров), старые обзоры."""
+    old = datetime.utcnow() - timedelta(days=30)
+    with database.SyncSession() as db:
+        users = [models.User(username=f"voter{i}", email=f"voter{i}@example.com", hashed_password="x") for i in range(6)]
+        games = [
+            models.Game(title="Popular", genre="RPG"),
+            models.Game(title="Hidden Gem", genre="RPG"),
+            models.Game(title="Classic", genre="Strategy"),
+        ]
+        db.add_all(users + games)
+        db.flush()
+        reviews = [(games[0], user, 6, None) for user in users]
+        reviews += [(games[1], users[0], 10, None)]
+        reviews += [(games[2], user, 9, old) for user in users[:4]]
+        for game, user, rating, created_at in reviews:
+            db.add(models.Review(game_id=game.id, user_id=user.id, content="Seeded review text",
+                                 rating=rating, created_at=created_at or datetime.utcnow()))
+        db.commit()
+        return [game.id for game in games], [user.id for user in users]
+
+
+async def _rebuild_stats(database):
+    async with database.Session() as db:
+        await crud.rebuild_game_statistics(db)
+
+
+def test_boards_rank_by_bayesian_average_volume_and_recent_window(database, seeded):
+    (popular, gem, classic), _ = seeded
+    boards = Leaderboards(trending_days=7, prior_weight=5)
+
+    async def scenario():
+        await _rebuild_stats(database)
+        async with database.Session() as db:
+            await boards.refresh(db)
+
+    asyncio.run(scenario())
+    ids = lambda board, genre=None: [entry.game_id for entry in boards.top(board, 10, genre)]
+    # Одна оценка 10 не перевешивает четыре девятки
+    assert ids("top_rated") == [classic, gem, popular]
+    assert ids("most_reviewed") == [popular, classic, gem]
+    # Обзоры Classic старше окна
+    assert ids("trending") == [popular, gem]
+    assert ids("top_rated", "RPG") == [gem, popular]
+    assert boards.genres() == ["RPG", "Strategy"]
+    assert boards.totals == {"games": 3, "users": 6, "reviews": 11}
+
+
+def test_review_events_update_boards_incrementally(client, database, seeded):
+    (popular, gem, classic), user_ids = seeded
+
+    async def scenario():
+        await _rebuild_stats(database)
+        async with database.Session() as db:
+            await leaderboards.refresh(db)
+            created = []
+            for user_id in user_ids[1:]:
+                review = schemas.ReviewCreate(game_id=gem, content="Another great review", rating=10)
+                db_review = await crud.create_review(db, review, user_id=user_id)
+                created.append(ReviewCreated(review_id=db_review.id, game_id=gem, user_id=user_id, rating=10))
+            await apply_events(db, created)
+
+    try:
+        asyncio.run(scenario())
+        home = client.get("/api/games/leaderboards", params={"limit": 2}).json()
+        assert [entry["game_id"] for entry in home["top_rated"]] == [gem, classic]
+        assert home["most_reviewed"][0]["game_id"] == gem
+        assert home["trending"][0] == {
+            "game_id": gem, "title": "Hidden Gem", "genre": "RPG", "review_count": 6,
+            "average_rating": 10.0, "score": home["trending"][0]["score"], "recent_reviews": 6,
+        }
+        assert home["totals"]["games"] == 3
+
+        strategy = client.get("/api/games/leaderboards/top_rated", params={"genre": "Strategy"}).json()
+        assert [entry["game_id"] for entry in strategy["entries"]] == [classic]
+        assert client.get("/api/games/leaderboards/unknown").status_code == 404
+    finally:
+        leaderboards.clear()
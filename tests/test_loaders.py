@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.loaders import DataLoader
+
+
+class Source:
+    def __init__(self, rows, fail=False):
+        self.rows = rows
+        self.fail = fail
+        self.calls = []
+
+    async def __call__(self, keys):
+        self.calls.append(list(keys))
+        if self.fail:
+            raise RuntimeError("database is down")
+        return {key: self.rows[key] for key in keys if key in self.rows}
+
+
+def test_loads_of_one_tick_are_batched_and_memoized():
+    source = Source({1: "one", 2: "two", 3: "three"})
+
+    async def scenario():
+        loader = DataLoader(source)
+        values = await asyncio.gather(loader.load(2), loader.load(1), loader.load(2), loader.load(404))
+        assert values == ["two", "one", "two", None]
+        assert await loader.load_many([3, 1]) == ["three", "one"]
+        assert await loader.load(2) == "two"
+
+    asyncio.run(scenario())
+    # Повторные ключи и уже загруженные значения не запрашиваются снова
+    assert source.calls == [[2, 1, 404], [3]]
+
+
+def test_batches_are_split_by_max_size():
+    source = Source({key: key * 10 for key in range(5)})
+
+    async def scenario():
+        loader = DataLoader(source, max_batch_size=2)
+        return await loader.load_many(range(5))
+
+    assert asyncio.run(scenario()) == [0, 10, 20, 30, 40]
+    assert source.calls == [[0, 1], [2, 3], [4]]
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    source = Source({1: "one"}, fail=True)
+
+    async def scenario():
+        loader = DataLoader(source)
+        results = await asyncio.gather(loader.load(1), loader.load(1), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        source.fail = False
+        assert await loader.load(1) == "one"
+
+    asyncio.run(scenario())
+    assert source.calls == [[1], [1]]
+
+
+def test_prime_and_clear():
+    source = Source({1: "stored"})
+
+    async def scenario():
+        loader = DataLoader(source)
+        loader.prime(1, "primed")
+        assert await loader.load(1) == "primed"
+        loader.clear(1)
+        assert await loader.load(1) == "stored"
+
+    asyncio.run(scenario())
+    assert source.calls == [[1]]
+
+
+@pytest.mark.parametrize("value", ["1,x", ",", ""])
+def test_parse_ids_rejects_bad_input(value):
+    from fastapi import HTTPException
+
+    from app.pagination import parse_ids
+
+    with pytest.raises(HTTPException):
+        parse_ids(value)
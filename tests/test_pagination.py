@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.pagination import decode_cursor, encode_cursor
+
+REVIEWS = 23
+
+
+@pytest.fixture
+def game_id(database):
+    with database.SyncSession() as db:
+        user = models.User(username="pager", email="pager@example.com", hashed_password="x")
+        game = models.Game(title="Paged Game")
+        db.add_all([user, game])
+        db.flush()
+        # Одинаковый created_at у группы строк проверяет разрешение ничьих по id
+        same_moment = datetime(2024, 1, 1, 12, 0, 0)
+        db.add_all(
+            models.Review(
+                game_id=game.id, user_id=user.id, content="Paged review text", rating=5,
+                created_at=same_moment if i % 3 else datetime(2024, 1, 1, 12, 0, i),
+            )
+            for i in range(REVIEWS)
+        )
+        db.commit()
+        return game.id
+
+
+def test_cursor_roundtrip():
+    cursor = decode_cursor(encode_cursor(datetime(2024, 5, 1, 8, 30), 42, backwards=True))
+    assert (cursor.created_at, cursor.id, cursor.backwards) == (datetime(2024, 5, 1, 8, 30), 42, True)
+
+
+def test_keyset_crawl_matches_offset_order(client, game_id):
+    url = f"/api/games/{game_id}/reviews"
+    expected = [review["id"] for review in client.get(url, params={"limit": 100}).json()]
+    assert len(expected) == REVIEWS
+
+    seen, pages, params = [], [], {"limit": 5}
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append(response)
+        seen.extend(review["id"] for review in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+        params = {"limit": 5, "cursor": next_cursor}
+
+    assert seen == expected
+    assert len(pages) == 5
+
+    # Назад от последней страницы получаем предпоследнюю
+    previous = client.get(url, params={"limit": 5, "cursor": pages[-1].headers["X-Prev-Cursor"]})
+    assert previous.json() == pages[-2].json()
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/reviews/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
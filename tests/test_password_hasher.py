@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+from passlib.hash import bcrypt
+
+from app import crud, models
+from app.auth import BCRYPT_ROUNDS, pwd_context
+from app.password_hasher import PasswordHasher, PasswordHasherBusy
+
+def test_saturated_pool_rejects_instead_of_queueing():
+    hasher = PasswordHasher(workers=0, queue_size=1)
+
+    async def scenario():
+        slow = [asyncio.ensure_future(hasher._run("hash", time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run("hash", time.sleep, 0)
+        await asyncio.gather(*slow)
+        assert hasher.in_flight == 0
+        # После освобождения очереди операции снова принимаются
+        await hasher._run("hash", time.sleep, 0)
+
+    asyncio.run(scenario())
+
+
+def test_login_rehashes_outdated_hash(database):
+    async def scenario():
+        async with database.Session() as db:
+            weak_hash = bcrypt.using(rounds=4).hash("secret-password")
+            db.add(models.User(username="legacy", email="legacy@example.com", hashed_password=weak_hash))
+            await db.commit()
+
+            assert await crud.authenticate_user(db, "legacy@example.com", "wrong-password") is None
+            user = await crud.authenticate_user(db, "legacy@example.com", "secret-password")
+            assert user is not None
+            assert user.hashed_password != weak_hash
+            assert bcrypt.from_string(user.hashed_password).rounds == BCRYPT_ROUNDS
+            assert not pwd_context.needs_update(user.hashed_password)
+
+    asyncio.run(scenario())
@@ -0,0 +1,119 @@
+"""Число SQL-запросов на списочных эндпоинтах не должно зависеть от размера страницы (N+1)."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, models
+
+ROWS = 60
+
+
+@contextmanager
+def count_queries(database):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        # Каждый обзор и комментарий — от своего автора, чтобы ленивая загрузка давала N запросов
+        users = [
+            models.User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+            for i in range(ROWS)
+        ]
+        games = [models.Game(title=f"Query Count Game {i}", genre="RPG") for i in range(ROWS)]
+        db.add_all(users + games)
+        db.flush()
+        game = games[0]
+        reviews = [
+            models.Review(game_id=game.id, user_id=user.id, content="Some review text", rating=7)
+            for user in users
+        ]
+        db.add_all(reviews)
+        db.flush()
+        db.add_all(
+            models.Comment(review_id=reviews[0].id, user_id=user.id, content="comment")
+            for user in users
+        )
+        db.commit()
+        return {"game_id": game.id, "review_id": reviews[0].id}
+
+
+LIST_ENDPOINTS = [
+    "/api/games/",
+    "/api/users/",
+    "/api/reviews/",
+    "/api/games/{game_id}/reviews",
+    "/api/reviews/{review_id}/comments",
+]
+
+
+@pytest.mark.parametrize("endpoint", LIST_ENDPOINTS)
+def test_query_count_does_not_grow_with_page_size(client, database, seeded, endpoint):
+    url = endpoint.format(**seeded)
+
+    counts = {}
+    for limit in (5, 50):
+        with count_queries(database) as statements:
+            response = client.get(url, params={"limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        counts[limit] = len(statements)
+
+    assert counts[5] == counts[50], f"{url}: {counts}"
+    assert counts[50] <= 2, f"{url}: {counts}"
+
+
+@pytest.mark.parametrize("endpoint", ["/api/games/", "/api/users/", "/api/reviews/"])
+def test_ids_lookup_is_one_batch(client, database, seeded, endpoint):
+    counts = {}
+    for size in (5, 50):
+        ids = list(range(size, 0, -1))
+        with count_queries(database) as statements:
+            response = client.get(endpoint, params={"ids": ",".join(map(str, ids))})
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == ids
+        counts[size] = len(statements)
+
+    assert counts[5] == counts[50], f"{endpoint}: {counts}"
+    assert counts[50] <= 2, f"{endpoint}: {counts}"
+
+
+@pytest.mark.parametrize("strategy", sorted(crud.LOADER_STRATEGIES))
+@pytest.mark.parametrize("endpoint", ["/api/reviews/", "/api/reviews/{review_id}/comments"])
+def test_orm_paths_follow_loader_strategy(client, database, seeded, monkeypatch, endpoint, strategy):
+    # Потоковая выдача читает объекты ORM: автор грузится выбранной стратегией
+    monkeypatch.setattr(crud, "DEFAULT_LOADER_STRATEGY", strategy)
+    url = endpoint.format(**seeded)
+
+    counts = {}
+    for limit in (5, 50):
+        with count_queries(database) as statements:
+            response = client.get(url, params={"limit": limit, "stream": "json"})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        counts[limit] = len(statements)
+
+    assert counts[5] == counts[50], f"{url}: {counts}"
+    assert counts[50] <= 2, f"{url}: {counts}"
+
+
+def test_endpoint_strategy_overrides_default(monkeypatch):
+    monkeypatch.setattr(crud, "ENDPOINT_LOADER_STRATEGIES", {"search_reviews": "joined"})
+    assert crud.loader_strategy("search_reviews") == "joined"
+    assert crud.loader_strategy("read_reviews") == crud.DEFAULT_LOADER_STRATEGY
+
+
+def test_unknown_loader_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        crud.load_related(models.Review.author, "lazy")
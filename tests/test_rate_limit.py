@@ -0,0 +1,110 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.rate_limit import (
+    InMemoryStore, Limit, RateLimit, RateLimiter, RateLimitHeadersMiddleware, page_cost, parse_limits
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_parse_limits():
+    assert parse_limits("5/second, 100/minute, 1000/5minutes") == (
+        Limit(5, 1), Limit(100, 60), Limit(1000, 300)
+    )
+    with pytest.raises(ValueError):
+        Limit.parse("5 per minute")
+
+
+def test_burst_then_sustained_rate(clock):
+    store = InMemoryStore(clock=clock)
+    limits = parse_limits("3/second,6/minute")
+
+    assert [store.hit("k", limits).allowed for _ in range(4)] == [True, True, True, False]
+    # Ведро всплеска пополнилось, но устойчивый лимит (6 в минуту) ещё держит
+    clock.now += 1
+    assert [store.hit("k", limits).allowed for _ in range(4)] == [True, True, True, False]
+    clock.now += 1
+    rejected = store.hit("k", limits)
+    assert not rejected.allowed and rejected.remaining == 0
+    assert rejected.retry_after == pytest.approx(60 / 6 - 2, rel=0.01)
+    # Отказ не расходует токены
+    clock.now += 10
+    assert store.hit("k", limits).allowed
+    assert store.hit("other", limits).remaining == 2
+
+
+def test_store_evicts_least_recently_used_keys(clock):
+    store = InMemoryStore(max_keys=10, clock=clock)
+    limits = parse_limits("1/minute")
+    for i in range(10):
+        clock.now += 1
+        store.hit(f"k{i}", limits)
+    store.hit("new", limits)
+    assert len(store) == 10
+    assert store.hit("k9", limits).allowed is False
+    assert store.hit("k0", limits).allowed is True
+
+    # Обращение переносит ведро в конец очереди вытеснения
+    store.hit("k1", limits)
+    store.hit("newer", limits)
+    assert store.hit("k1", limits).allowed is False
+    assert store.hit("k2", limits).allowed is True
+
+
+def test_dependency_sets_headers_and_rejects_with_retry_after(clock):
+    limiter = RateLimiter(InMemoryStore(clock=clock), enabled=True)
+    rule = RateLimit("test:list", "2/second", "10/minute", cost=page_cost(default_limit=10, page=10), limiter=limiter)
+    app = FastAPI()
+    app.add_middleware(RateLimitHeadersMiddleware)
+
+    @app.get("/items", dependencies=[Depends(rule)])
+    async def items():
+        return []
+
+    client = TestClient(app)
+    first = client.get("/items")
+    assert first.status_code == 200
+    assert first.headers["ratelimit-limit"] == "2" and first.headers["ratelimit-remaining"] == "1"
+    assert first.headers["ratelimit-policy"] == "2;w=1, 10;w=60"
+
+    # limit=20 стоит два токена, а остался один
+    rejected = client.get("/items", params={"limit": 20})
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "1"
+    assert rejected.headers["ratelimit-remaining"] == "1"
+
+    clock.now += 1
+    assert client.get("/items", params={"limit": 20}).status_code == 200
+    limiter.enabled = False
+    assert client.get("/items", params={"limit": 20}).status_code == 200
+
+
+def test_cost_above_bucket_capacity_is_capped(clock):
+    limiter = RateLimiter(InMemoryStore(clock=clock), enabled=True)
+    rule = RateLimit("test:huge", "5/second", "50/minute", cost=page_cost(), limiter=limiter)
+    app = FastAPI()
+
+    @app.get("/items", dependencies=[Depends(rule)])
+    async def items():
+        return []
+
+    client = TestClient(app)
+    # limit=100000 стоил бы 1000 токенов — больше любого ведра; берётся вся ёмкость всплеска
+    assert client.get("/items", params={"limit": 100000}).status_code == 200
+    rejected = client.get("/items", params={"limit": 100000})
+    assert rejected.status_code == 429
+    clock.now += int(rejected.headers["retry-after"])
+    assert client.get("/items", params={"limit": 100000}).status_code == 200
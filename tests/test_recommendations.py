@@ -0,0 +1,123 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app import crud, events, models, schemas
+from app.auth import create_access_token
+from app.recommendations import (
+    ItemSimilarity, apply_events, build_from_db, build_snapshot, centered_ratings, init_recommendations,
+    item_similarity, neighbor_rows,
+)
+
+# Игры 1 и 2 любят одни и те же игроки, игру 3 — другие
+RATINGS = {
+    1: {1: 9, 2: 10, 3: 3},
+    2: {1: 10, 2: 9, 3: 2},
+    3: {1: 2, 2: 3, 3: 9},
+    4: {1: 8, 3: 4},
+}
+
+
+def _lists(model):
+    return {game_id: model.similar(game_id) for game_id in (1, 2, 3)}
+
+
+def _assert_same_lists(model, expected):
+    for game_id, row in _lists(expected).items():
+        assert [other_id for other_id, _ in model.similar(game_id)] == [other_id for other_id, _ in row]
+        assert [score for _, score in model.similar(game_id)] == pytest.approx([score for _, score in row])
+
+
+def test_neighbor_lists_and_recommendations():
+    centered = centered_ratings(RATINGS)
+    norms = {}
+    for values in centered.values():
+        for game_id, value in values.items():
+            norms[game_id] = norms.get(game_id, 0.0) + value * value
+    model = ItemSimilarity(neighbors=5)
+    model.update(neighbor_rows(norms, centered, norms, neighbors=5))
+
+    assert [game_id for game_id, _ in model.similar(1)] == [2]
+    # Отрицательное сходство в списки не попадает
+    assert model.similar(3) == []
+
+    # Пользователь 4 ещё не оценивал игру 2, а игру 1 оценил выше своей средней
+    assert [game_id for game_id, _ in model.recommend(RATINGS[4])] == [2]
+    assert model.recommend(RATINGS[1]) == []
+
+
+@pytest.fixture
+def client(client, database):
+    with database.SyncSession() as db:
+        db.add_all([models.Game(id=id, title=f"Game {id}") for id in (1, 2, 3)])
+        db.add_all([
+            models.User(id=id, username=f"player{id}", email=f"player{id}@example.com", hashed_password="x")
+            for id in RATINGS
+        ])
+        db.add_all([
+            models.Review(game_id=game_id, user_id=user_id, content="Recommendation seed", rating=rating)
+            for user_id, ratings in RATINGS.items() for game_id, rating in ratings.items()
+        ])
+        db.commit()
+
+    async def build():
+        async with database.Session() as db:
+            await build_from_db(db)
+
+    asyncio.run(build())
+    yield client
+    item_similarity.clear()
+
+
+def test_incremental_refresh_matches_full_build(client, database):
+    async def scenario():
+        async with database.Session() as db:
+            db.add(models.Review(game_id=2, user_id=4, content="Recommendation seed", rating=3))
+            await db.execute(update(models.Review).where(models.Review.user_id == 3, models.Review.game_id == 1).values(rating=10))
+            await db.execute(delete(models.Review).where(models.Review.user_id == 2, models.Review.game_id == 3))
+            await db.commit()
+            await apply_events(db, [
+                events.ReviewCreated(review_id=0, game_id=2, user_id=4, rating=3),
+                events.ReviewUpdated(review_id=0, game_id=1, rating=10, old_rating=2, user_id=3),
+                events.ReviewDeleted(review_id=0, game_id=3, rating=2, user_id=2),
+            ])
+            _assert_same_lists(item_similarity, await build_from_db(db, ItemSimilarity()))
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_catches_up_from_outbox(client, database, tmp_path):
+    path = str(tmp_path / "recommendations.json")
+
+    async def scenario():
+        async with database.Session() as db:
+            await build_snapshot(db, path)
+            await crud.create_review(db, schemas.ReviewCreate(game_id=2, content="Recommendation seed", rating=2), user_id=4)
+            expected = await build_from_db(db, ItemSimilarity())
+
+            # Воркер: снимок + события outbox после его позиции
+            worker = await init_recommendations(db, ItemSimilarity(), path)
+            assert worker.meta["outbox_id"] == expected.meta["outbox_id"] > 0
+            _assert_same_lists(worker, expected)
+
+            # Журнал очищен раньше, чем снимок его догнал: полная сборка
+            await db.execute(delete(models.OutboxEvent))
+            await db.commit()
+            rebuilt = await build_snapshot(db, path)
+            _assert_same_lists(rebuilt, expected)
+
+    asyncio.run(scenario())
+
+
+def test_similar_games_and_personal_recommendations(client):
+    similar = client.get("/api/games/1/similar").json()
+    assert [hit["game"]["title"] for hit in similar] == ["Game 2"]
+    assert 0 < similar[0]["score"] <= 1
+    assert client.get("/api/games/999/similar").status_code == 404
+
+    token = create_access_token({"sub": "player4@example.com"}, expires_delta=timedelta(minutes=5))
+    recommended = client.get("/api/users/me/recommendations", headers={"Authorization": f"Bearer {token}"})
+    assert [hit["game"]["id"] for hit in recommended.json()] == [2]
+    assert client.get("/api/users/me/recommendations").status_code == 401
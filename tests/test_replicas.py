@@ -0,0 +1,109 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import database as database_module
+from app import models
+from app.auth import create_access_token
+from app.database import Replica, ReplicaSet, get_db, remember_requester
+from app.main import app
+
+
+def make_replica(name: str, url: str) -> Replica:
+    engine = create_async_engine(url, poolclass=NullPool)
+    return Replica(name, engine, async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+
+
+@pytest.fixture
+def replica_db(database_factory):
+    return database_factory("replica")
+
+
+@pytest.fixture
+def client(client, database, replica_db, monkeypatch):
+    # Реплика «отстаёт»: в ней другая версия каталога, по которой видно, откуда пришло чтение
+    for target, title in ((database, "Primary only"), (replica_db, "Replica copy")):
+        with target.SyncSession() as db:
+            db.add_all([
+                models.User(username="writer", email="writer@example.com", hashed_password="x"),
+                models.Game(title=title),
+            ])
+            db.commit()
+
+    replica_set = ReplicaSet([make_replica("replica-1", replica_db.url)], eject_seconds=60)
+    monkeypatch.setattr(database_module, "replicas", replica_set)
+    monkeypatch.setattr(database_module, "_sticky", {})
+
+    async def override_get_db(request: Request):
+        async with database.Session() as db:
+            remember_requester(db, request)
+            yield db
+
+    # Сессии основной БД должны запоминать записавшего клиента, как get_db
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    return client, replica_set
+
+
+def titles(client, **kwargs):
+    return sorted(game["title"] for game in client.get("/api/games/", **kwargs).json())
+
+
+def test_reads_go_to_replica_and_writers_read_their_writes(client):
+    client, _ = client
+    token = create_access_token({"sub": "writer@example.com"}, expires_delta=timedelta(minutes=5))
+    writer = {"Authorization": f"Bearer {token}"}
+    other = {"Authorization": "Bearer someone-else"}
+
+    assert titles(client) == ["Replica copy"]
+    assert titles(client, headers=writer) == ["Replica copy"]
+
+    assert client.post("/api/games/", json={"title": "Just written"}, headers=writer).status_code == 200
+    # Записавший клиент читает из основной БД, остальные — по-прежнему из реплики
+    assert titles(client, headers=writer) == ["Just written", "Primary only"]
+    assert titles(client, headers=other) == ["Replica copy"]
+
+    database_module._sticky.clear()
+    assert titles(client, headers=writer) == ["Replica copy"]
+
+
+def test_cached_stats_never_come_from_a_lagging_replica(client, replica_db):
+    client, _ = client
+    token = create_access_token({"sub": "writer@example.com"}, expires_delta=timedelta(minutes=5))
+    writer = {"Authorization": f"Bearer {token}"}
+    other = {"Authorization": "Bearer someone-else"}
+    review = {"game_id": 1, "content": "Written to the primary only", "rating": 8}
+
+    assert client.post("/api/reviews/", json=review, headers=writer).status_code == 200
+    # Реплика ещё не получила обзор: её ответ не должен попасть в кэш
+    assert client.get("/api/games/1/stats", headers=other).json()["total_reviews"] == 0
+    assert client.get("/api/games/1/stats", headers=writer).json()["total_reviews"] == 1
+    assert client.get("/api/games/1/stats", headers=other).json()["total_reviews"] == 0
+
+    # Реплика догнала основную БД — читатели сразу видят новые данные, а не кэш
+    with replica_db.SyncSession() as db:
+        db.add(models.Review(game_id=1, user_id=1, content="Written to the primary only", rating=8))
+        db.add(models.GameRatingStats(game_id=1, review_count=1, rating_sum=8, rating_8=1))
+        db.commit()
+    assert client.get("/api/games/1/stats", headers=other).json()["total_reviews"] == 1
+
+
+def test_unhealthy_replica_is_ejected_and_returns(client):
+    client, replica_set = client
+    healthy = replica_set.replicas[0]
+    broken = make_replica("replica-2", "sqlite+aiosqlite:////nonexistent-dir/replica.db")
+    replica_set.replicas.append(broken)
+
+    asyncio.run(replica_set.check_all())
+    assert healthy.healthy and not broken.healthy
+    assert {replica_set.choose().name for _ in range(4)} == {"replica-1"}
+
+    # Без здоровых реплик чтение идёт в основную БД
+    healthy.ejected_until = float("inf")
+    assert titles(client) == ["Primary only"]
+    asyncio.run(replica_set.check(healthy))
+    assert healthy.healthy
+    assert titles(client) == ["Replica copy"]
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import models
+from app.auth import create_access_token
+from app.response_cache import CachedResponse, InMemoryBackend, ResponseCache
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        user = models.User(username="etag", email="etag@example.com", hashed_password="x")
+        game = models.Game(title="Cached Game")
+        db.add_all([user, game])
+        db.commit()
+        return {"game_id": game.id}
+
+
+def count_statements(database, client, url, **kwargs):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(database.engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url, **kwargs)
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", listener)
+    return response, len(statements)
+
+
+def test_repeat_read_is_served_from_cache_with_etag(client, database, seeded):
+    url = f"/api/games/{seeded['game_id']}"
+    first, queries = count_statements(database, client, url)
+    assert first.status_code == 200 and queries > 0
+    etag = first.headers["etag"]
+
+    second, queries = count_statements(database, client, url)
+    assert queries == 0
+    assert second.content == first.content and second.headers["etag"] == etag
+
+    not_modified, queries = count_statements(database, client, url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and queries == 0
+    assert not_modified.content == b""
+
+
+def test_missing_resource_is_not_cached(client, database):
+    assert client.get("/api/games/999999").status_code == 404
+    _, queries = count_statements(database, client, "/api/games/999999")
+    assert queries > 0
+
+
+def test_review_write_invalidates_game_reads(client, seeded):
+    game_id = seeded["game_id"]
+    token = create_access_token({"sub": "etag@example.com"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    stats = client.get(f"/api/games/{game_id}/stats")
+    reviews = client.get(f"/api/games/{game_id}/reviews")
+    assert stats.json()["total_reviews"] == 0 and reviews.json() == []
+
+    created = client.post(
+        "/api/reviews/",
+        json={"game_id": game_id, "content": "Cache invalidation works", "rating": 8},
+        headers=headers,
+    )
+    assert created.status_code == 200
+
+    fresh = client.get(f"/api/games/{game_id}/stats", headers={"If-None-Match": stats.headers["etag"]})
+    assert fresh.status_code == 200 and fresh.json()["total_reviews"] == 1
+    assert len(client.get(f"/api/games/{game_id}/reviews").json()) == 1
+
+    review_id = created.json()["id"]
+    assert client.get(f"/api/reviews/{review_id}").json()["rating"] == 8
+    client.put(
+        f"/api/reviews/{review_id}",
+        json={"content": "Cache invalidation works", "rating": 3},
+        headers=headers,
+    )
+    assert client.get(f"/api/reviews/{review_id}").json()["rating"] == 3
+
+
+def test_tag_generations_stay_bounded():
+    backend = InMemoryBackend(max_entries=10, ttl=30)
+    cache = ResponseCache(backend)
+    generations = cache.generations(["game:1"])
+    backend.set("/api/games/1", CachedResponse(200, (), b"{}", b'"etag"', generations))
+    assert cache.lookup("/api/games/1") is not None
+
+    for review_id in range(10_000):
+        cache.invalidate(f"review:{review_id}")
+    assert len(backend._generations) <= 40
+    # Поколение тега записи вытеснено: оно считается изменившимся, а запись — устаревшей
+    assert cache.lookup("/api/games/1") is None
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+from sqlalchemy import delete
+
+from app import events, models
+from app.review_index import COMMENT, REVIEW, ReviewIndex, SnapshotWriter, build_from_db, catch_up, init_review_index
+
+
+def make_index():
+    index = ReviewIndex()
+    index.add(REVIEW, 1, 1, "Great open world, the boss fights are brutal but fair")
+    index.add(REVIEW, 2, 2, "Short story, boring quests, boring boss")
+    index.add(REVIEW, 3, 3, "Relaxing farming game with a cozy soundtrack")
+    index.add(COMMENT, 10, 3, "The soundtrack is the best part")
+    return index
+
+
+def ids(hits):
+    return [(hit.kind, hit.id) for hit in hits]
+
+
+def test_bm25_ranking_and_incremental_updates():
+    index = make_index()
+    assert ids(index.search("boring boss")) == [(REVIEW, 2), (REVIEW, 1)]
+    assert set(ids(index.search("soundtrack"))) == {(REVIEW, 3), (COMMENT, 10)}
+    assert {hit.review_id for hit in index.search("soundtrack")} == {3}
+
+    index.add(REVIEW, 2, 2, "Changed: actually a cozy little game")
+    assert ids(index.search("boring")) == []
+    assert (REVIEW, 2) in ids(index.search("cozy"))
+
+    index.remove(REVIEW, 1)
+    assert ids(index.search("brutal")) == []
+    assert len(index) == 3
+
+
+def test_snapshot_roundtrip_keeps_results_and_accepts_writes(tmp_path):
+    path = str(tmp_path / "reviews.bin")
+    index = make_index()
+    expected = index.search("boss soundtrack")
+    index.save(path, meta={"max_review_id": 3})
+
+    loaded = ReviewIndex()
+    loaded.load(path)
+    assert loaded.search("boss soundtrack") == expected
+    assert loaded.meta == {"max_review_id": 3}
+
+    # Изменения поверх mmap-сегмента
+    loaded.remove(REVIEW, 2)
+    loaded.add(REVIEW, 4, 4, "Boss rush mode is brutal")
+    assert ids(loaded.search("boss")) == [(REVIEW, 4), (REVIEW, 1)]
+
+    loaded.save(path)
+    reloaded = ReviewIndex()
+    reloaded.load(path)
+    assert ids(reloaded.search("boss")) == [(REVIEW, 4), (REVIEW, 1)]
+
+
+def test_compact_writes_without_holding_the_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "compact.bin")
+    index = make_index()
+    index.compact(path)
+    index.add(REVIEW, 4, 4, "Boss rush mode is brutal")
+
+    writing, release = threading.Event(), threading.Event()
+    write = ReviewIndex._write
+
+    def slow_write(*args):
+        writing.set()
+        assert release.wait(5)
+        write(*args)
+
+    monkeypatch.setattr(ReviewIndex, "_write", staticmethod(slow_write))
+    worker = threading.Thread(target=index.compact, args=(path,))
+    worker.start()
+    try:
+        assert writing.wait(5)
+        # Пока пишется сегмент, поиск и изменения не ждут блокировку
+        assert ids(index.search("brutal")) == [(REVIEW, 4), (REVIEW, 1)]
+        index.remove(REVIEW, 1)
+        index.add(REVIEW, 5, 5, "Cozy boss music")
+    finally:
+        release.set()
+        worker.join()
+
+    # Изменения за время записи применены поверх нового сегмента и ждут следующего снимка
+    assert index.changes == 2
+    assert {hit.id for hit in index.search("boss")} == {2, 4, 5}
+    assert ids(index.search("brutal")) == [(REVIEW, 4)]
+    on_disk = ReviewIndex()
+    on_disk.load(path)
+    assert {hit.id for hit in on_disk.search("brutal")} == {1, 4}
+
+
+def test_build_and_catch_up_from_database(database, tmp_path):
+    path = str(tmp_path / "db_reviews.bin")
+
+    async def scenario():
+        async with database.Session() as db:
+            user = models.User(username="indexer", email="indexer@example.com", hashed_password="x")
+            game = models.Game(title="Indexed Game")
+            db.add_all([user, game])
+            await db.flush()
+            first = models.Review(game_id=game.id, user_id=user.id, content="Wonderful pixel art", rating=9)
+            second = models.Review(game_id=game.id, user_id=user.id, content="Terrible controls", rating=2)
+            db.add_all([first, second])
+            await db.commit()
+
+            index = ReviewIndex()
+            await build_from_db(db, index, path)
+            assert ids(index.search("pixel")) == [(REVIEW, first.id)]
+
+            # Изменения после снимка: новый комментарий, правка и удаление обзора
+            comment = models.Comment(review_id=first.id, user_id=user.id, content="Pixel art indeed")
+            db.add(comment)
+            await db.flush()
+            first.content = "Wonderful pixel art and chiptune music"
+            await db.delete(second)
+            events.publish(db, events.CommentCreated(comment_id=comment.id, review_id=first.id))
+            events.publish(db, events.ReviewUpdated(review_id=first.id, game_id=game.id, rating=9, old_rating=9))
+            events.publish(db, events.ReviewDeleted(review_id=second.id, game_id=game.id, rating=2))
+            await db.commit()
+
+            restarted = ReviewIndex()
+            await init_review_index(db, restarted, path)
+            assert ids(restarted.search("terrible")) == []
+            assert ids(restarted.search("chiptune")) == [(REVIEW, first.id)]
+            assert {hit.kind for hit in restarted.search("pixel")} == {REVIEW, COMMENT}
+
+            # Снимок с новой позицией: следующий старт не повторяет события
+            writer = SnapshotWriter(restarted, path)
+            assert await writer.save(position=restarted.meta["outbox_id"])
+            assert not restarted.changes
+            again = ReviewIndex()
+            again.load(path)
+            assert await catch_up(db, again) and not again.changes
+            assert ids(again.search("chiptune")) == [(REVIEW, first.id)]
+
+            # Журнал очищен раньше, чем снимок его догнал: индекс строится заново
+            db.add(models.Review(game_id=game.id, user_id=user.id, content="Unannounced sequel", rating=7))
+            await db.execute(delete(models.OutboxEvent))
+            await db.commit()
+            rebuilt = ReviewIndex()
+            await init_review_index(db, rebuilt, path)
+            assert len(ids(rebuilt.search("sequel"))) == 1
+
+    asyncio.run(scenario())
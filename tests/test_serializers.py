@@ -0,0 +1,56 @@
+"""Быстрый путь сериализации списков должен давать те же байты, что и response_model."""
+import asyncio
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import crud, models, schemas
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        user = models.User(username="юзер", email="bytes@example.com", hashed_password="x",
+                           created_at=datetime(2024, 1, 1, 12, 0, 0))
+        game = models.Game(title='Игра "в кавычках"', description="строка\nс переводом / и  ",
+                           release_year=2020, created_at=datetime(2024, 1, 2, 3, 4, 5, 678901))
+        bare = models.Game(title="Bare")
+        db.add_all([user, game, bare])
+        db.flush()
+        review = models.Review(game_id=game.id, user_id=user.id, content="Отличная игра!\t\U0001F3AE", rating=10)
+        db.add(review)
+        db.flush()
+        db.add(models.Comment(review_id=review.id, user_id=user.id, content="\x01 control"))
+        db.commit()
+        return {"game_id": game.id, "review_id": review.id}
+
+
+def schema_body(database, schema, load):
+    """Тело ответа так, как его строит FastAPI через response_model."""
+    async def scenario():
+        async with database.Session() as db:
+            return await load(db)
+
+    rows = asyncio.run(scenario())
+    adapter = TypeAdapter(List[schema])
+    content = adapter.dump_python(adapter.validate_python(list(rows), from_attributes=True), mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def test_fast_path_is_byte_identical(client, database, seeded):
+    cases = [
+        ("/api/games/", schemas.GameResponse, lambda db: crud.get_games(db)),
+        ("/api/reviews/", schemas.ReviewResponse, lambda db: crud.get_reviews(db)),
+        (f"/api/games/{seeded['game_id']}/reviews", schemas.ReviewResponse,
+         lambda db: crud.get_reviews(db, game_id=seeded["game_id"])),
+        (f"/api/reviews/{seeded['review_id']}/comments", schemas.CommentResponse,
+         lambda db: crud.get_comments_by_review(db, seeded["review_id"])),
+    ]
+    for url, schema, load in cases:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == schema_body(database, schema, load), url
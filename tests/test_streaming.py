@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+
+import pytest
+from app import models, pagination
+from app.pagination import encode_cursor
+
+ROWS = 25
+
+
+@pytest.fixture
+def seeded(database):
+    with database.SyncSession() as db:
+        users = [models.User(username=f"streamer{i}", email=f"streamer{i}@example.com", hashed_password="x") for i in range(3)]
+        games = [models.Game(title=f"Streamed {i}") for i in range(ROWS)]
+        db.add_all(users + games)
+        db.flush()
+        reviews = [
+            models.Review(game_id=games[0].id, user_id=users[i % 3].id, content="Streamed review text", rating=7)
+            for i in range(ROWS)
+        ]
+        db.add_all(reviews)
+        db.flush()
+        db.add_all(
+            models.Comment(review_id=reviews[0].id, user_id=users[i % 3].id, content=f"comment {i}")
+            for i in range(ROWS)
+        )
+        db.commit()
+        return {"review_id": reviews[0].id}
+
+
+@pytest.fixture
+def client(client, seeded, monkeypatch):
+    # Маленькие пачки: выдача собирается из нескольких частей
+    monkeypatch.setattr(pagination, "STREAM_BATCH_SIZE", 4)
+    return client
+
+
+@pytest.mark.parametrize("endpoint", ["/api/games/", "/api/reviews/", "/api/reviews/{review_id}/comments"])
+def test_streamed_rows_match_regular_response(client, seeded, endpoint):
+    url = endpoint.format(**seeded)
+    params = {"limit": 20, "skip": 2}
+    expected = client.get(url, params=params).json()
+    assert len(expected) == 20
+
+    ndjson = client.get(url, params={**params, "stream": "ndjson"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == expected
+
+    array = client.get(url, params={**params, "stream": "json"})
+    assert array.json() == expected
+
+
+def test_streaming_continues_from_forward_cursor_only(client):
+    first = client.get("/api/games/", params={"limit": 10})
+    rest = client.get("/api/games/", params={"cursor": first.headers["X-Next-Cursor"], "limit": 100, "stream": "json"})
+    assert [game["title"] for game in first.json() + rest.json()] == [f"Streamed {i}" for i in range(ROWS)]
+
+    game = first.json()[-1]
+    backwards = encode_cursor(datetime.fromisoformat(game["created_at"]), game["id"], backwards=True)
+    assert client.get("/api/games/", params={"cursor": backwards, "stream": "ndjson"}).status_code == 400
+    assert client.get("/api/games/", params={"limit": 0, "stream": "json"}).json() == []